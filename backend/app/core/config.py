@@ -36,6 +36,13 @@ class Settings(BaseSettings):
     # Model
     MODEL_PATH: str = "models/baseline_model.pkl"
     MODEL_TYPE: str = "tabular"
+    MODEL_VERSION: str = "1.0.0"  # recorded on forecasts when not using the registry
+    MODEL_FEATURE_SET: str = "window"  # tabular input layout: "window" or "engineered"
+    MODEL_REGISTRY_DIR: str = ""  # enables versioned loading and hot-swap
+    MODEL_REGISTRY_POLL_SECONDS: float = 0  # 0 disables the registry watcher
+    MODEL_MMAP: bool = False  # memory-map model weights shared across workers
+    TORCH_NUM_THREADS: int = 0  # 0 keeps the torch default
+    TORCH_INTEROP_THREADS: int = 0
     
     class Config:
         env_file = ".env"
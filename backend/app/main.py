@@ -9,8 +9,9 @@ from contextlib import asynccontextmanager
 import uvicorn
 
 from app.db.database import engine, Base, get_db
-from app.routers import auth, hospitals, forecasts, events, agents, recommendations
+from app.routers import auth, hospitals, forecasts, events, agents, recommendations, model_registry
 from app.core.config import settings
+from app.services.forecast_service import start_registry_watcher, warmup_inference_service
 
 
 # Create database tables
@@ -19,6 +20,8 @@ async def lifespan(app: FastAPI):
     """Lifespan events."""
     # Startup
     Base.metadata.create_all(bind=engine)
+    warmup_inference_service()
+    start_registry_watcher(settings.MODEL_REGISTRY_POLL_SECONDS)
     yield
     # Shutdown
     pass
@@ -47,6 +50,7 @@ app.include_router(forecasts.router, prefix="/api/v1/forecasts", tags=["Forecast
 app.include_router(events.router, prefix="/api/v1/events", tags=["Events"])
 app.include_router(agents.router, prefix="/api/v1/agents", tags=["Agents"])
 app.include_router(recommendations.router, prefix="/api/v1/recommendations", tags=["Recommendations"])
+app.include_router(model_registry.router, prefix="/api/v1/models", tags=["Models"])
 
 
 @app.get("/")
@@ -85,7 +85,7 @@ async def predict_hospital_surge(
         "predicted_arrivals": forecast_result["predicted_arrivals"],
         "confidence": forecast_result["confidence"],
         "risk_category": forecast_result["risk_category"],
-        "model_version": "1.0.0"
+        "model_version": forecast_result["model_version"]
     }
     
     saved_forecast = crud.create_forecast(db, forecast_data)
@@ -0,0 +1,84 @@
+"""
+Model registry router.
+"""
+
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+
+from app.db import models
+from app.schemas import model_registry
+from app.core.security import get_current_active_user, require_role
+from app.services.forecast_service import (
+    get_inference_service,
+    get_model_registry,
+    reload_inference_service
+)
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def _reload_in_background(version: Optional[str], activate: bool):
+    """Load, warm, activate and swap in a model without blocking the request."""
+    try:
+        reload_inference_service(version, activate=activate)
+    except Exception:
+        # CURRENT is untouched, so other replicas never pick up the version
+        logger.exception("Model reload to version %s failed; it was not activated", version)
+
+
+@router.get("/current", response_model=model_registry.ModelInfo)
+async def get_current_model(
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Get the model version currently serving forecasts."""
+    service = get_inference_service()
+    registry = get_model_registry()
+    
+    return model_registry.ModelInfo(
+        version=service.version,
+        model_type=service.model_type,
+        active_version=registry.current_version() if registry else None,
+        available_versions=registry.list_versions() if registry else []
+    )
+
+
+@router.post(
+    "/reload",
+    response_model=model_registry.ModelReloadResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def reload_model(
+    request: model_registry.ModelReloadRequest,
+    background_tasks: BackgroundTasks,
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    """
+    Hot-swap a model version in once loaded and warmed.
+    
+    The registry's active version is only switched after the new model has
+    loaded and warmed on this replica; failures are logged and leave the
+    current model and CURRENT in place.
+    """
+    registry = get_model_registry()
+    
+    if request.version is not None:
+        if registry is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No model registry configured"
+            )
+        try:
+            registry.get(request.version)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Model version not found"
+            )
+    
+    version = request.version or (registry.current_version() if registry else None)
+    background_tasks.add_task(_reload_in_background, version, request.version is not None)
+    
+    return model_registry.ModelReloadResponse(status="reloading", version=version)
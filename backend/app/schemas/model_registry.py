@@ -0,0 +1,28 @@
+"""
+Model registry schemas.
+"""
+
+from pydantic import BaseModel
+from typing import Optional, List
+
+
+class ModelInfo(BaseModel):
+    """Currently served model."""
+    version: Optional[str] = None
+    model_type: str
+    active_version: Optional[str] = None  # registry CURRENT, may be mid-swap
+    available_versions: List[str] = []
+    
+    class Config:
+        protected_namespaces = ()
+
+
+class ModelReloadRequest(BaseModel):
+    """Request to load a model version."""
+    version: Optional[str] = None  # default: the registry's active version
+
+
+class ModelReloadResponse(BaseModel):
+    """Accepted reload request."""
+    status: str
+    version: Optional[str] = None
@@ -2,18 +2,70 @@
 Forecast service for generating predictions.
 """
 
+import logging
 import sys
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 # Add ml directory to path
 sys.path.append(str(Path(__file__).parent.parent.parent.parent / "ml" / "inference"))
 
-from serve import get_inference_service
+from serve import (
+    ServingConfig,
+    classify_risk,
+    configure_inference_service,
+    get_inference_service,
+    get_model_registry,
+    reload_inference_service,
+    start_registry_watcher
+)
+from app.core.config import Settings, settings
 from app.db import models
 
+logger = logging.getLogger(__name__)
+
+
+def configure_inference(app_settings: Settings = settings):
+    """Configure the inference service from the backend settings."""
+    configure_inference_service(ServingConfig(
+        model_path=app_settings.MODEL_PATH,
+        model_type=app_settings.MODEL_TYPE,
+        model_version=app_settings.MODEL_VERSION,
+        feature_set=app_settings.MODEL_FEATURE_SET,
+        registry_dir=app_settings.MODEL_REGISTRY_DIR,
+        mmap=app_settings.MODEL_MMAP,
+        torch_num_threads=app_settings.TORCH_NUM_THREADS,
+        torch_interop_threads=app_settings.TORCH_INTEROP_THREADS
+    ))
+
+
+# Before anything (including gunicorn's preload) loads the model
+configure_inference()
+
+
+def warmup_inference_service() -> bool:
+    """Load and warm the inference model before the first request."""
+    try:
+        get_inference_service().warmup()
+    except Exception:
+        logger.exception("Inference model warmup failed")
+        return False
+    return True
+
+
+def _naive_utc(timestamp: datetime) -> datetime:
+    """Naive UTC datetime, as training uses; naive inputs are taken as UTC."""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Model input layout: 24 hourly rows x 12 features
+SEQUENCE_LENGTH = 24
+FEATURE_DIM = 12
+
 
 class ForecastService:
     """Service for generating hospital forecasts."""
@@ -22,6 +74,62 @@ class ForecastService:
         """Initialize forecast service."""
         self.inference_service = get_inference_service()
     
+    def build_features(
+        self,
+        hospital: models.Hospital,
+        observations: List[models.Observation]
+    ) -> np.ndarray:
+        """
+        Build the (SEQUENCE_LENGTH, FEATURE_DIM) model input for a hospital.
+        
+        Uses the last SEQUENCE_LENGTH observations, oldest first as in
+        training, whatever order they are given in. A shorter history is
+        right-aligned and the missing leading hours repeat the oldest
+        observation; static hospital fields fill every row.
+        """
+        features = np.zeros((SEQUENCE_LENGTH, FEATURE_DIM), dtype=np.float32)
+        features[:, 6:11] = (
+            hospital.bed_count,
+            hospital.icu_count,
+            hospital.oxygen_capacity or 0,
+            hospital.doctors_count or 0,
+            hospital.nurses_count or 0
+        )
+        recent = sorted(
+            observations,
+            key=lambda obs: datetime.min if obs.timestamp is None else _naive_utc(obs.timestamp)
+        )[-SEQUENCE_LENGTH:]
+        if not recent:
+            return features
+        
+        features[-len(recent):, :6] = [
+            (
+                obs.new_arrivals or 0,
+                obs.current_patients or 0,
+                obs.avg_age or 50.0,
+                obs.aqi or 50.0,
+                obs.temperature or 20.0,
+                obs.humidity or 50.0
+            )
+            for obs in recent
+        ]
+        features[:-len(recent), :6] = features[-len(recent), :6]
+        # Column 11 (event_attendance) stays 0 until event features are served
+        
+        return features
+    
+    def origin_time(self, observations: List[models.Observation]) -> np.datetime64:
+        """
+        Hour of the last observation (the current UTC hour if there is none).
+        
+        Engineered tabular features take their hour-of-day and day-of-week
+        from this time, as they do in training.
+        """
+        timestamps = [
+            _naive_utc(obs.timestamp) for obs in observations if obs.timestamp is not None
+        ]
+        return np.datetime64(max(timestamps, default=datetime.utcnow()), "h")
+    
     def predict(
         self,
         hospital: models.Hospital,
@@ -41,55 +149,53 @@ class ForecastService:
         Returns:
             Dictionary with forecast results
         """
-        # Prepare features from observations
-        if len(observations) < 24:
-            # Pad with zeros if insufficient data
-            observations = list(observations) + [None] * (24 - len(observations))
+        features_array = self.build_features(hospital, observations)[np.newaxis]
+        
+        result = self.inference_service.predict_array(
+            features_array, origin_times=self.origin_time(observations)
+        )
+        risk_category = classify_risk(result.predictions)[0]
         
-        # Extract features
-        features = []
-        for obs in observations[-24:]:  # Last 24 hours
-            if obs:
-                feature_vector = [
-                    obs.new_arrivals or 0,
-                    obs.current_patients or 0,
-                    obs.avg_age or 50.0,
-                    obs.aqi or 50.0,
-                    obs.temperature or 20.0,
-                    obs.humidity or 50.0,
-                    hospital.bed_count,
-                    hospital.icu_count,
-                    hospital.oxygen_capacity or 0,
-                    hospital.doctors_count or 0,
-                    hospital.nurses_count or 0,
-                    0  # event_attendance placeholder
-                ]
-            else:
-                # Zero padding
-                feature_vector = [0.0] * 12
-            features.append(feature_vector)
+        return {
+            "predicted_arrivals": float(result.predictions[0]),
+            "confidence": float(result.confidence[0]),
+            "risk_category": str(risk_category),
+            "forecast_horizon": horizon_hours,
+            "model_version": result.version
+        }
+    
+    def predict_batch(
+        self,
+        hospitals: List[models.Hospital],
+        observations: List[List[models.Observation]],
+        horizon_hours: int = 24
+    ) -> Dict[str, Any]:
+        """
+        Forecast many hospitals with a single model call.
         
-        # Convert to numpy array
-        features_array = np.array([features], dtype=np.float32)
+        Args:
+            hospitals: Hospital model instances
+            observations: Recent observations for each hospital, in the same order
+            horizon_hours: Forecast horizon in hours
         
-        # Get prediction
-        prediction_result = self.inference_service.predict(features_array)
-        predicted_arrivals = prediction_result["predictions"][0]
-        confidence = prediction_result.get("confidence", [0.8])[0]
+        Returns:
+            Dictionary of arrays aligned with ``hospitals``
+        """
+        features_array = np.empty(
+            (len(hospitals), SEQUENCE_LENGTH, FEATURE_DIM), dtype=np.float32
+        )
+        origin_times = np.empty(len(hospitals), dtype="datetime64[h]")
+        for i, (hospital, hospital_observations) in enumerate(zip(hospitals, observations)):
+            features_array[i] = self.build_features(hospital, hospital_observations)
+            origin_times[i] = self.origin_time(hospital_observations)
         
-        # Determine risk category
-        if predicted_arrivals < 5:
-            risk_category = "low"
-        elif predicted_arrivals < 15:
-            risk_category = "medium"
-        else:
-            risk_category = "high"
+        result = self.inference_service.predict_array(features_array, origin_times=origin_times)
         
         return {
-            "predicted_arrivals": float(predicted_arrivals),
-            "confidence": float(confidence),
-            "risk_category": risk_category,
-            "forecast_horizon": horizon_hours
+            "hospital_ids": [hospital.id for hospital in hospitals],
+            "predicted_arrivals": result.predictions,
+            "confidence": result.confidence,
+            "risk_category": classify_risk(result.predictions),
+            "forecast_horizon": horizon_hours,
+            "model_version": result.version
         }
-
-
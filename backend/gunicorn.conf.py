@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration for FestSafe AI.
+
+Preloads the app and the inference model in the master process, so forked
+workers share the model's memory pages copy-on-write instead of each loading
+a private copy. Set MODEL_MMAP=1 as well to memory-map compiled (.npz)
+artifacts, which also shares pages across reloads and separate pods on the
+same node.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def on_starting(server):
+    """Load the model once in the master before workers are forked."""
+    from app.services.forecast_service import get_inference_service
+
+    get_inference_service()
+
+    # Keep the cyclic GC from touching (and so copying) preloaded objects
+    gc.freeze()
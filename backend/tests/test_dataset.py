@@ -0,0 +1,387 @@
+"""
+Tests for the training dataset builder.
+"""
+
+import shutil
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from torch.utils.data import default_collate
+
+from app.db import models
+from app.db.database import Base
+
+sys.path.append(str(Path(__file__).parent.parent.parent / "ml" / "training"))
+
+from data_simulator import DataSimulator, simulate_sharded
+from dataset import (
+    EVENT_RADIUS_DEG,
+    FEATURE_COLS,
+    HOSPITAL_FEATURE_COLS,
+    HospitalForecastDataset,
+    ShardedSampler,
+    compute_event_features,
+    create_dataloader,
+    dataset_cache_key,
+    load_cached_dataset,
+    load_data,
+    load_dataset
+)
+
+
+def make_frames(hours=(60, 72, 30), n_events=0, seed=0):
+    """Shuffled simulator-shaped frames; the last hospital is too short for a window."""
+    rng = np.random.default_rng(seed)
+    n_hospitals = len(hours)
+    hospitals_df = pd.DataFrame({
+        "id": [str(uuid.UUID(int=int(i))) for i in rng.integers(0, 2**63, n_hospitals)],
+        "bed_count": rng.integers(50, 500, n_hospitals),
+        "icu_count": rng.integers(5, 50, n_hospitals),
+        "oxygen_capacity": rng.integers(100, 1000, n_hospitals),
+        "doctors": rng.integers(10, 100, n_hospitals),
+        "nurses": rng.integers(20, 200, n_hospitals),
+        "lat": rng.uniform(37.7, 37.8, n_hospitals),
+        "lon": rng.uniform(-122.5, -122.4, n_hospitals)
+    })
+
+    start = pd.Timestamp("2024-01-01")
+    hour_index = np.concatenate([np.arange(n) for n in hours])
+    n_rows = len(hour_index)
+    observations_df = pd.DataFrame({
+        "timestamp": (start + pd.to_timedelta(hour_index, unit="h")).strftime("%Y-%m-%dT%H:%M:%S"),
+        "hospital_id": np.repeat(hospitals_df["id"].to_numpy(), hours),
+        "current_patients": rng.integers(20, 450, n_rows),
+        "new_arrivals": rng.poisson(2, n_rows),
+        "avg_age": rng.uniform(35, 75, n_rows).round(1),
+        "aqi": rng.uniform(20, 150, n_rows).round(1),
+        "temperature": rng.uniform(15, 35, n_rows).round(1),
+        "humidity": rng.uniform(30, 90, n_rows).round(1)
+    }).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+    event_starts = start + pd.to_timedelta(rng.integers(0, max(hours), n_events), unit="h")
+    events_df = pd.DataFrame({
+        "start_ts": event_starts.strftime("%Y-%m-%dT%H:%M:%S"),
+        "end_ts": (event_starts + pd.to_timedelta(rng.integers(1, 24, n_events), unit="h"))
+            .strftime("%Y-%m-%dT%H:%M:%S"),
+        "expected_attendance": rng.integers(1000, 100000, n_events),
+        "lat": rng.uniform(37.7, 37.8, n_events),
+        "lon": rng.uniform(-122.5, -122.4, n_events)
+    })
+
+    return observations_df, hospitals_df, events_df
+
+
+def write_data_dir(path, frames):
+    """Write frames as the simulator's CSV files."""
+    path.mkdir(parents=True, exist_ok=True)
+    for name, df in zip(["observations", "hospitals", "events"], frames):
+        df.to_csv(path / f"{name}.csv", index=False)
+    return path
+
+
+def legacy_windows(observations_df, hospitals_df, sequence_length, forecast_horizon):
+    """The original per-window builder (no events): one iloc slice per sample."""
+    data = observations_df.assign(timestamp=pd.to_datetime(observations_df["timestamp"]))
+    data = data.merge(
+        hospitals_df[["id"] + HOSPITAL_FEATURE_COLS], left_on="hospital_id", right_on="id"
+    )
+    data["event_attendance"] = 0
+    data = data.sort_values(["hospital_id", "timestamp"]).reset_index(drop=True)
+
+    X, y, hospital_ids, timestamps = [], [], [], []
+    for hospital_id in data["hospital_id"].unique():
+        hospital_data = data[data["hospital_id"] == hospital_id]
+        for i in range(len(hospital_data) - sequence_length - forecast_horizon):
+            X.append(hospital_data.iloc[i:i + sequence_length][FEATURE_COLS].to_numpy(np.float32))
+            y.append(hospital_data.iloc[i + sequence_length + forecast_horizon - 1]["new_arrivals"])
+            hospital_ids.append(hospital_id)
+            timestamps.append(hospital_data.iloc[i + sequence_length]["timestamp"])
+
+    return np.stack(X), np.asarray(y, dtype=np.float32), hospital_ids, np.asarray(
+        timestamps, dtype="datetime64[ns]"
+    )
+
+
+@pytest.mark.parametrize("sequence_length, forecast_horizon", [(24, 24), (6, 3)])
+def test_windows_match_legacy_builder(sequence_length, forecast_horizon):
+    """Windows, targets, hospitals and times match the per-window builder."""
+    observations_df, hospitals_df, events_df = make_frames()
+    dataset = HospitalForecastDataset(
+        observations_df.copy(), hospitals_df, events_df,
+        sequence_length=sequence_length, forecast_horizon=forecast_horizon
+    )
+
+    X_expected, y_expected, ids_expected, times_expected = legacy_windows(
+        observations_df, hospitals_df, sequence_length, forecast_horizon
+    )
+    X, y = dataset.get_arrays()
+
+    assert len(dataset) == len(y_expected)
+    assert np.array_equal(X, X_expected)
+    assert np.array_equal(y, y_expected)
+    assert dataset.get_hospital_ids().tolist() == ids_expected
+    assert np.array_equal(dataset.get_timestamps(), times_expected)
+    for i in (0, len(dataset) - 1):
+        features, target = dataset[i]
+        assert np.array_equal(features.numpy(), X_expected[i])
+        assert target.item() == y_expected[i]
+
+
+def mask_join(observations_df, hospitals_df, events_df, weighted=False):
+    """Per-event mask loop over every observation, the reference for the interval join."""
+    expected = np.zeros(len(observations_df))
+    timestamps = pd.to_datetime(observations_df["timestamp"])
+    locations = hospitals_df.set_index("id").loc[observations_df["hospital_id"]]
+    for _, event in events_df.iterrows():
+        distance = np.hypot(
+            locations["lat"] - event["lat"], locations["lon"] - event["lon"]
+        ).to_numpy()
+        mask = (
+            (timestamps >= event["start_ts"]) & (timestamps <= event["end_ts"])
+        ).to_numpy() & (distance < EVENT_RADIUS_DEG)
+        weight = 1 - distance[mask] / EVENT_RADIUS_DEG if weighted else 1
+        expected[mask] += weight * event["expected_attendance"]
+    return expected
+
+
+def nearby_events(hospital, start, offsets, hours, attendance):
+    """Events starting at ``start`` due north of a hospital, ``offsets`` radii away."""
+    return pd.DataFrame({
+        "start_ts": [start] * len(offsets),
+        "end_ts": [start + pd.Timedelta(hours=h) for h in hours],
+        "expected_attendance": attendance,
+        "lat": [hospital["lat"] + EVENT_RADIUS_DEG * offset for offset in offsets],
+        "lon": [hospital["lon"]] * len(offsets)
+    })
+
+
+def test_event_features_match_mask_join():
+    """The interval join sums overlapping nearby events like a per-event mask loop."""
+    observations_df, hospitals_df, events_df = make_frames(n_events=12, seed=3)
+    hospital = hospitals_df.iloc[0]
+    start = pd.Timestamp("2024-01-01T10:00:00")
+    extra = pd.DataFrame({
+        "start_ts": [start, start + pd.Timedelta(hours=5), start],
+        "end_ts": [start + pd.Timedelta(hours=h) for h in (10, 20, 30)],
+        "expected_attendance": [5000, 7000, 9000],
+        # Two overlapping events on the hospital, one just outside the radius
+        "lat": [hospital["lat"], hospital["lat"], hospital["lat"] + EVENT_RADIUS_DEG * 1.001],
+        "lon": [hospital["lon"], hospital["lon"], hospital["lon"]]
+    })
+    events_df = pd.concat([events_df, extra], ignore_index=True)
+    events_df["start_ts"] = pd.to_datetime(events_df["start_ts"])
+    events_df["end_ts"] = pd.to_datetime(events_df["end_ts"])
+    timestamps = pd.to_datetime(observations_df["timestamp"])
+
+    actual = compute_event_features(observations_df, hospitals_df, events_df)
+
+    assert np.array_equal(actual, mask_join(observations_df, hospitals_df, events_df))
+
+    def row(hours):
+        return np.flatnonzero(
+            (observations_df["hospital_id"] == hospital["id"])
+            & (timestamps == start + pd.Timedelta(hours=hours))
+        )[0]
+
+    wider = compute_event_features(
+        observations_df, hospitals_df, events_df, radius=EVENT_RADIUS_DEG * 1.01
+    )
+    assert actual[row(7)] >= 5000 + 7000
+    assert wider[row(25)] - actual[row(25)] == 9000
+
+
+def test_weighted_event_features_decay_with_distance():
+    """Weighted attendance falls linearly to 0 at the radius and clears once events end."""
+    observations_df, hospitals_df, events_df = make_frames(n_events=12, seed=3)
+    hospital = hospitals_df.iloc[0]
+    start = pd.Timestamp("2024-01-01T10:00:00")
+    extra = nearby_events(hospital, start, [0.0, 0.3, 0.7, 1.0], [10, 20, 20, 20], 10000)
+    events_df = pd.concat([events_df, extra], ignore_index=True)
+    events_df["start_ts"] = pd.to_datetime(events_df["start_ts"])
+    events_df["end_ts"] = pd.to_datetime(events_df["end_ts"])
+
+    actual = compute_event_features(observations_df, hospitals_df, events_df, weighted=True)
+
+    assert np.allclose(actual, mask_join(observations_df, hospitals_df, events_df, weighted=True))
+
+    # The same events alone, on a history with no other events
+    observations_df, hospitals_df, _ = make_frames(seed=3)
+    timestamps = pd.to_datetime(observations_df["timestamp"])
+    weighted = compute_event_features(observations_df, hospitals_df, extra, weighted=True)
+    summed = compute_event_features(observations_df, hospitals_df, extra)
+
+    def at(values, hours):
+        return values[
+            (observations_df["hospital_id"] == hospital["id"]).to_numpy()
+            & (timestamps == start + pd.Timedelta(hours=hours)).to_numpy()
+        ][0]
+
+    # Distances 0, 0.3 and 0.7 radii weigh 1, 0.7 and 0.3; the event on the radius adds 0
+    assert at(weighted, 5) == pytest.approx(10000 * (1 + 0.7 + 0.3))
+    assert at(summed, 5) == 30000
+    assert at(weighted, 15) == pytest.approx(10000 * (0.7 + 0.3))
+    # Exactly 0 (no float residue) once every nearby event has ended
+    assert at(weighted, 25) == 0
+    assert (weighted <= summed).all()
+
+
+def test_dataset_cache_round_trip(tmp_path):
+    """Cached entries reload memory-mapped with the same arrays."""
+    data_dir = write_data_dir(tmp_path / "data", make_frames(n_events=4))
+    built = HospitalForecastDataset(*make_frames(n_events=4), sequence_length=6, forecast_horizon=3)
+
+    cached = load_cached_dataset(str(data_dir), str(tmp_path / "cache"), 6, 3)
+    reloaded = load_cached_dataset(str(data_dir), str(tmp_path / "cache"), 6, 3)
+
+    assert isinstance(reloaded.features, np.memmap)
+    assert reloaded.cache_path == cached.cache_path
+    for name in ["features", "targets", "timestamps", "window_starts", "window_hospitals"]:
+        assert np.array_equal(getattr(reloaded, name), getattr(built, name))
+    assert reloaded.hospital_ids.tolist() == built.hospital_ids.tolist()
+    assert np.array_equal(reloaded.get_arrays()[0], built.get_arrays()[0])
+
+
+def test_dataset_cache_key_tracks_inputs(tmp_path):
+    """Changing an input file or the window configuration changes the key."""
+    observations_df, hospitals_df, events_df = make_frames(n_events=4)
+    data_dir = write_data_dir(tmp_path / "data", (observations_df, hospitals_df, events_df))
+    key = dataset_cache_key(str(data_dir), 24, 24)
+
+    assert dataset_cache_key(str(data_dir), 24, 24) == key
+    assert dataset_cache_key(str(data_dir), 24, 12) != key
+
+    events_df.loc[0, "expected_attendance"] += 1
+    write_data_dir(data_dir, (observations_df, hospitals_df, events_df))
+    assert dataset_cache_key(str(data_dir), 24, 24) != key
+
+
+def test_dataloader_batches_match_collated_items():
+    """Batched gathers yield what default-collated __getitem__ calls would."""
+    dataset = HospitalForecastDataset(*make_frames(), sequence_length=6, forecast_horizon=3)
+    indices = np.arange(5, len(dataset) - 5)
+
+    loader = create_dataloader(dataset, indices, batch_size=8)
+    batches = list(loader)
+
+    assert len(batches) == -(-len(indices) // 8)
+    for batch, start in zip(batches, range(0, len(indices), 8)):
+        expected = default_collate([dataset[i] for i in indices[start:start + 8]])
+        assert torch.equal(batch[0], expected[0])
+        assert torch.equal(batch[1], expected[1])
+
+
+@pytest.mark.parametrize("n_indices, num_replicas", [(10, 3), (12, 4), (5, 8)])
+def test_sharded_sampler_covers_every_index(n_indices, num_replicas):
+    """Shards have equal lengths, cover every index and reshuffle per epoch."""
+    indices = np.arange(100, 100 + n_indices)
+    samplers = [ShardedSampler(indices, num_replicas, rank, seed=7) for rank in range(num_replicas)]
+
+    epochs = [[list(sampler) for sampler in samplers] for _ in range(2)]
+
+    for shards in epochs:
+        assert {len(shard) for shard in shards} == {len(samplers[0])}
+        assert len(samplers[0]) == -(-n_indices // num_replicas)
+        assert set(np.concatenate(shards)) == set(indices)
+    assert epochs[0] != epochs[1]
+    with pytest.raises(ValueError):
+        ShardedSampler(indices, num_replicas, num_replicas)
+
+
+def test_from_database_matches_frames(tmp_path):
+    """Streaming from the backend schema builds the same arrays as the frames."""
+    observations_df, hospitals_df, events_df = make_frames(n_events=6, seed=1)
+    expected = HospitalForecastDataset(
+        observations_df.copy(), hospitals_df, events_df.copy(),
+        sequence_length=6, forecast_horizon=3
+    )
+
+    database_url = f"sqlite:///{tmp_path / 'backend.db'}"
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all(
+            models.Hospital(
+                id=uuid.UUID(h["id"]), name=f"Hospital {i}", latitude=h["lat"],
+                longitude=h["lon"], bed_count=h["bed_count"], icu_count=h["icu_count"],
+                oxygen_capacity=h["oxygen_capacity"], doctors_count=h["doctors"],
+                nurses_count=h["nurses"]
+            )
+            for i, h in enumerate(hospitals_df.to_dict("records"))
+        )
+        db.add_all(
+            models.Event(
+                name=f"Event {i}", latitude=e["lat"], longitude=e["lon"],
+                start_ts=pd.Timestamp(e["start_ts"]).to_pydatetime(),
+                end_ts=pd.Timestamp(e["end_ts"]).to_pydatetime(),
+                expected_attendance=int(e["expected_attendance"])
+            )
+            for i, e in enumerate(events_df.to_dict("records"))
+        )
+        db.add_all(
+            models.Observation(
+                hospital_id=uuid.UUID(o["hospital_id"]),
+                timestamp=pd.Timestamp(o["timestamp"]).to_pydatetime(),
+                **{col: o[col] for col in [
+                    "current_patients", "new_arrivals", "avg_age", "aqi", "temperature", "humidity"
+                ]}
+            )
+            for o in observations_df.to_dict("records")
+        )
+        db.commit()
+    engine.dispose()
+
+    # A small chunk size splits hospitals across fetches
+    dataset = HospitalForecastDataset.from_database(
+        database_url, sequence_length=6, forecast_horizon=3, chunk_size=25
+    )
+
+    for name in ["features", "targets", "timestamps", "window_starts", "window_hospitals"]:
+        assert np.array_equal(getattr(dataset, name), getattr(expected, name))
+    assert dataset.hospital_ids.tolist() == expected.hospital_ids.tolist()
+    assert expected.features[:, FEATURE_COLS.index("event_attendance")].any()
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "ndjson"])
+def test_sharded_output_loads_like_unsharded(tmp_path, fmt):
+    """Manifest shards load into the same dataset as one concatenated file."""
+    simulator = DataSimulator(seed=5)
+    start_date = datetime(2024, 5, 1)
+    simulator.generate_hospitals(5)
+    simulator.generate_events(3, start_date, days_ahead=3)
+    sharded_dir = tmp_path / "sharded"
+    manifest = simulate_sharded(
+        simulator, sharded_dir, fmt, start_date, days=3, seed=5, shard_hospitals=2
+    )
+    assert len(manifest["shards"]) == 3
+
+    # The same observations as a single CSV file
+    unsharded_dir = tmp_path / "unsharded"
+    unsharded_dir.mkdir()
+    observations_df, hospitals_df, events_df = load_data(
+        str(sharded_dir), {"observations": None}
+    )
+    observations_df.to_csv(unsharded_dir / "observations.csv", index=False)
+    hospitals_df.to_csv(unsharded_dir / "hospitals.csv", index=False)
+    events_df.to_csv(unsharded_dir / "events.csv", index=False)
+
+    sharded = load_dataset(str(sharded_dir), 6, 3)
+    unsharded = load_dataset(str(unsharded_dir), 6, 3)
+
+    assert len(sharded) > 0
+    for name in ["features", "targets", "timestamps", "window_starts", "window_hospitals"]:
+        assert np.array_equal(getattr(sharded, name), getattr(unsharded, name))
+    assert sharded.hospital_ids.tolist() == unsharded.hospital_ids.tolist()
+
+    # Every shard is part of the cache key
+    key = dataset_cache_key(str(sharded_dir), 6, 3)
+    last_shard = sharded_dir / manifest["shards"][-1]["file"]
+    shutil.copy(sharded_dir / manifest["shards"][0]["file"], last_shard)
+    assert dataset_cache_key(str(sharded_dir), 6, 3) != key
@@ -2,11 +2,81 @@
 Tests for forecast service.
 """
 
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
 import pytest
-from datetime import datetime, timedelta
+import torch
+from datetime import datetime, timedelta, timezone
 from app.services.forecast_service import ForecastService
 from app.db import models
 
+sys.path.append(str(Path(__file__).parent.parent.parent / "ml" / "training"))
+
+from dataset import HospitalForecastDataset
+from models.nn_model import HybridForecastModel, export_torchscript
+from serve import ModelInferenceService
+from tabular_features import FEATURE_COLS, engineer_features, split_static_inputs
+
+
+def make_history(n_hours, start=datetime(2024, 3, 1), seed=0):
+    """Simulator-shaped hospital and observation frames for one hospital."""
+    rng = np.random.default_rng(seed)
+    hospitals_df = pd.DataFrame({
+        "id": ["h-1"],
+        "bed_count": [240],
+        "icu_count": [24],
+        "oxygen_capacity": [600],
+        "doctors": [35],
+        "nurses": [90],
+        "lat": [37.75],
+        "lon": [-122.45]
+    })
+    observations_df = pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=n_hours, freq="h"),
+        "hospital_id": "h-1",
+        "new_arrivals": rng.poisson(4, n_hours),
+        "current_patients": rng.integers(20, 200, n_hours),
+        "avg_age": rng.uniform(35, 75, n_hours).round(1),
+        "aqi": rng.uniform(20, 150, n_hours).round(1),
+        "temperature": rng.uniform(15, 35, n_hours).round(1),
+        "humidity": rng.uniform(30, 90, n_hours).round(1)
+    })
+    return observations_df, hospitals_df
+
+
+def as_models(observations_df, hospitals_df):
+    """The same history as backend rows, newest first like crud.get_observations."""
+    row = hospitals_df.iloc[0]
+    hospital = models.Hospital(
+        id=row["id"],
+        name="Test Hospital",
+        latitude=row["lat"],
+        longitude=row["lon"],
+        bed_count=int(row["bed_count"]),
+        icu_count=int(row["icu_count"]),
+        oxygen_capacity=int(row["oxygen_capacity"]),
+        doctors_count=int(row["doctors"]),
+        nurses_count=int(row["nurses"])
+    )
+    observations = [
+        models.Observation(
+            hospital_id=row["id"],
+            timestamp=obs.timestamp.to_pydatetime(),
+            new_arrivals=int(obs.new_arrivals),
+            current_patients=int(obs.current_patients),
+            avg_age=obs.avg_age,
+            aqi=obs.aqi,
+            temperature=obs.temperature,
+            humidity=obs.humidity
+        )
+        for obs in observations_df.itertuples()
+    ]
+    return hospital, observations[::-1]
+
 
 def test_forecast_service_predict():
     """Test forecast service prediction."""
@@ -50,3 +120,61 @@ def test_forecast_service_predict():
     assert result["risk_category"] in ["low", "medium", "high"]
 
 
+def test_origin_time_normalises_aware_timestamps():
+    """Timezone-aware observation times become the naive UTC hour training uses."""
+    service = ForecastService()
+    ist = timezone(timedelta(hours=5, minutes=30))
+    observations = [
+        models.Observation(timestamp=datetime(2024, 3, 1, 8, 45, tzinfo=ist)),
+        models.Observation(timestamp=datetime(2024, 3, 1, 2, 10))
+    ]
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        origin = service.origin_time(observations)
+    
+    assert origin == np.datetime64("2024-03-01T03", "h")
+
+
+def test_serving_features_match_training_windows():
+    """A newest-first DB history gives the window and engineered features training built."""
+    observations_df, hospitals_df = make_history(60)
+    events_df = pd.DataFrame(columns=["start_ts", "end_ts", "expected_attendance", "lat", "lon"])
+    dataset = HospitalForecastDataset(observations_df, hospitals_df, events_df)
+    service = ForecastService()
+    index = 7
+    
+    hospital, observations = as_models(observations_df.iloc[index:index + 24], hospitals_df)
+    window = service.build_features(hospital, observations)
+    serving = engineer_features(window[np.newaxis], service.origin_time(observations))
+    
+    expected_window, _ = dataset.get_arrays(np.array([index]))
+    expected, _ = dataset.get_tabular_arrays(np.array([index]), feature_set="engineered")
+    assert np.array_equal(window, expected_window[0])
+    assert np.array_equal(serving, expected)
+
+
+def test_hybrid_model_serves_short_history(tmp_path):
+    """With under 24 observations the hybrid model still gets time order and static fields."""
+    torch.manual_seed(0)
+    model = HybridForecastModel(time_series_features=7, static_features=5).eval()
+    path = tmp_path / "model.torchscript"
+    export_torchscript(model, str(path), sequence_length=24, input_size=7, static_size=5)
+    
+    observations_df, hospitals_df = make_history(5)
+    hospital, observations = as_models(observations_df, hospitals_df)
+    service = ForecastService()
+    service.inference_service = ModelInferenceService(str(path), model_type="nn")
+    
+    window = service.build_features(hospital, observations)
+    time_series, static = split_static_inputs(window[np.newaxis])
+    dynamic_cols = FEATURE_COLS[:6]
+    assert static.tolist() == [[240, 24, 600, 35, 90]]
+    assert np.allclose(window[-5:, :6], observations_df[dynamic_cols].to_numpy())
+    # Missing leading hours repeat the oldest observation
+    assert np.allclose(window[:19, :6], observations_df[dynamic_cols].to_numpy()[0])
+    
+    result = service.predict(hospital, observations)
+    with torch.no_grad():
+        expected = model(torch.from_numpy(time_series), torch.from_numpy(static)).item()
+    assert result["predicted_arrivals"] == pytest.approx(expected, abs=1e-5)
@@ -0,0 +1,379 @@
+"""
+Tests for the model inference service.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+from fastapi import status
+
+from app.core.config import Settings
+from app.services.forecast_service import configure_inference
+from sklearn.ensemble import (
+    GradientBoostingRegressor,
+    HistGradientBoostingRegressor,
+    RandomForestRegressor
+)
+
+sys.path.append(str(Path(__file__).parent.parent.parent / "ml" / "inference"))
+sys.path.append(str(Path(__file__).parent.parent.parent / "ml" / "training"))
+
+from compiled_trees import CompiledTreeEnsemble, compile_ensemble
+from models.nn_model import (
+    HybridForecastModel,
+    LSTMForecastModel,
+    export_torchscript,
+    passes_quantization_gate,
+    quantize_dynamic
+)
+from registry import ModelRegistry
+import serve
+from serve import ModelInferenceService, ServingConfig, classify_risk
+from tabular_features import (
+    FEATURE_COLS,
+    engineer_features,
+    engineered_feature_names,
+    split_static_inputs
+)
+
+
+@pytest.fixture
+def training_data():
+    """Small synthetic regression problem."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 24 * 12)).astype(np.float32)
+    y = 3 * X[:, 0] + X[:, 7] ** 2 + rng.normal(size=400)
+    return X, y
+
+
+@pytest.fixture
+def gbr_estimator(training_data):
+    """Small gradient-boosted ensemble fitted on training_data."""
+    X, y = training_data
+    return GradientBoostingRegressor(n_estimators=5, random_state=42).fit(X, y)
+
+
+@pytest.fixture
+def compiled_gbr_artifact(gbr_estimator, tmp_path):
+    """gbr_estimator compiled and saved as a .npz serving artifact."""
+    path = tmp_path / "model.npz"
+    compile_ensemble(gbr_estimator).save(path)
+    return path
+
+
+@pytest.mark.parametrize("estimator", [
+    GradientBoostingRegressor(n_estimators=30, max_depth=4, random_state=42),
+    RandomForestRegressor(n_estimators=10, max_depth=6, random_state=42),
+    HistGradientBoostingRegressor(max_iter=30, random_state=42)
+])
+def test_compiled_ensemble_matches_sklearn(estimator, training_data, tmp_path):
+    """Compiled predictions are bit-identical to sklearn."""
+    X, y = training_data
+    estimator.fit(X, y)
+
+    path = tmp_path / "model.npz"
+    compile_ensemble(estimator).save(path)
+    compiled = CompiledTreeEnsemble.load(path)
+
+    X_test = np.random.default_rng(1).normal(size=(50, X.shape[1]))
+    assert np.array_equal(compiled.predict(X_test), estimator.predict(X_test))
+
+
+def test_compiled_hist_gradient_boosting_handles_missing_values(training_data, tmp_path):
+    """NaN features follow the learned missing-value branch like sklearn."""
+    X, y = training_data
+    X = X.copy()
+    X[::7, 0] = np.nan
+    estimator = HistGradientBoostingRegressor(max_iter=20, random_state=42).fit(X, y)
+
+    path = tmp_path / "model.npz"
+    compile_ensemble(estimator).save(path)
+    compiled = CompiledTreeEnsemble.load(path)
+
+    X_test = X[:50].copy()
+    X_test[::3, 7] = np.nan
+    assert np.array_equal(compiled.predict(X_test), estimator.predict(X_test))
+
+
+def test_compiled_ensemble_mmap_load(training_data, tmp_path):
+    """Memory-mapped artifacts predict the same as fully loaded ones."""
+    X, y = training_data
+    estimator = RandomForestRegressor(n_estimators=5, random_state=42).fit(X, y)
+
+    path = tmp_path / "model.npz"
+    compile_ensemble(estimator).save(path)
+    mapped = CompiledTreeEnsemble.load(path, mmap=True)
+
+    assert isinstance(mapped.value, np.memmap)
+    assert np.array_equal(mapped.predict(X[:20]), estimator.predict(X[:20]))
+
+
+def test_inference_service_loads_compiled_model(
+    training_data, gbr_estimator, compiled_gbr_artifact
+):
+    """ModelInferenceService serves .npz artifacts."""
+    X, _ = training_data
+    service = ModelInferenceService(str(compiled_gbr_artifact), model_type="tabular")
+
+    features = X[:3].reshape(3, 24, 12)
+    result = service.predict(features)
+
+    assert np.allclose(result["predictions"], gbr_estimator.predict(X[:3]))
+    assert len(result["confidence"]) == 3
+
+
+def test_engineer_features_layout():
+    """Lags, rolling stats, static fields and calendar land in their named columns."""
+    windows = np.zeros((2, 24, len(FEATURE_COLS)), dtype=np.float32)
+    windows[:, :, 0] = np.arange(24)  # new_arrivals 0..23, oldest first
+    windows[:, :, FEATURE_COLS.index("bed_count")] = 120
+    origin_times = np.array(["2024-01-01T05", "2024-01-06T23"], dtype="datetime64[h]")
+
+    features = engineer_features(windows, origin_times)
+    columns = dict(zip(engineered_feature_names(24), features[0]))
+
+    assert features.shape == (2, len(engineered_feature_names(24)))
+    assert columns["new_arrivals_lag1"] == 23
+    assert columns["new_arrivals_lag24"] == 0
+    assert columns["new_arrivals_mean6h"] == np.mean(np.arange(18, 24))
+    assert columns["new_arrivals_max24h"] == 23
+    assert columns["bed_count"] == 120
+    # 2024-01-01 was a Monday, 2024-01-06 a Saturday
+    assert features[:, -2:].tolist() == [[5, 0], [23, 5]]
+
+
+def test_inference_service_engineers_tabular_features(tmp_path):
+    """Engineered-feature models are served from raw windows."""
+    rng = np.random.default_rng(0)
+    windows = rng.normal(size=(200, 24, len(FEATURE_COLS))).astype(np.float32)
+    origin_times = np.datetime64("2024-03-01T00", "h") + np.arange(200)
+    X = engineer_features(windows, origin_times)
+    estimator = GradientBoostingRegressor(n_estimators=10, random_state=42).fit(
+        X, X[:, 0] + rng.normal(size=200)
+    )
+
+    path = tmp_path / "model.npz"
+    compile_ensemble(estimator).save(path)
+    service = ModelInferenceService(str(path), model_type="tabular", feature_set="engineered")
+
+    result = service.predict_array(windows[:5], origin_times=origin_times[:5])
+
+    assert np.array_equal(result.predictions, estimator.predict(X[:5]))
+    service.warmup()
+
+
+def test_inference_service_loads_torchscript_model(tmp_path):
+    """TorchScript artifacts serve the same predictions as the eager model."""
+    torch.manual_seed(0)
+    model = LSTMForecastModel(input_size=12).eval()
+
+    path = tmp_path / "model.torchscript"
+    export_torchscript(model, str(path), sequence_length=24, input_size=12)
+    service = ModelInferenceService(str(path), model_type="nn")
+
+    features = np.random.default_rng(0).normal(size=(4, 24, 12)).astype(np.float32)
+    result = service.predict(features)
+
+    with torch.no_grad():
+        expected = model(torch.from_numpy(features)).numpy().flatten()
+    assert np.allclose(result["predictions"], expected, atol=1e-6)
+
+
+def test_inference_service_splits_static_inputs_for_hybrid_model(tmp_path):
+    """Hybrid artifacts get time-series and static inputs split from the window."""
+    torch.manual_seed(0)
+    model = HybridForecastModel(time_series_features=7, static_features=5).eval()
+
+    path = tmp_path / "model.torchscript"
+    export_torchscript(model, str(path), sequence_length=24, input_size=7, static_size=5)
+    service = ModelInferenceService(str(path), model_type="nn")
+
+    features = np.random.default_rng(0).normal(size=(4, 24, 12)).astype(np.float32)
+    result = service.predict(features)
+
+    time_series, static = split_static_inputs(torch.from_numpy(features))
+    with torch.no_grad():
+        expected = model(time_series, static).numpy().flatten()
+    assert service.split_static
+    assert np.allclose(result["predictions"], expected, atol=1e-6)
+
+
+def test_inference_service_loads_quantized_model(tmp_path):
+    """int8 artifacts load on CPU and stay close to fp32 predictions."""
+    torch.manual_seed(0)
+    model = LSTMForecastModel(input_size=12).eval()
+    quantized = quantize_dynamic(model)
+
+    path = tmp_path / "model.int8.torchscript"
+    export_torchscript(quantized, str(path), sequence_length=24, input_size=12)
+    service = ModelInferenceService(str(path), model_type="nn")
+
+    features = np.random.default_rng(0).normal(size=(4, 24, 12)).astype(np.float32)
+    result = service.predict(features)
+
+    with torch.no_grad():
+        expected = model(torch.from_numpy(features)).numpy().flatten()
+    assert service.device.type == "cpu"
+    assert np.allclose(result["predictions"], expected, atol=1e-2)
+
+
+def test_quantization_gate():
+    """Gate rejects int8 models that lose too much accuracy."""
+    fp32 = {"mae": 2.0, "rmse": 3.0}
+
+    assert passes_quantization_gate(fp32, {"mae": 2.05, "rmse": 3.1}, 0.05)
+    assert not passes_quantization_gate(fp32, {"mae": 2.2, "rmse": 3.1}, 0.05)
+    assert not passes_quantization_gate(fp32, {"mae": 2.0, "rmse": 3.5}, 0.05)
+
+
+def test_registry_publish_and_activate(compiled_gbr_artifact, tmp_path):
+    """Published versions resolve to their artifact and metadata."""
+    registry = ModelRegistry(tmp_path / "registry")
+    registry.publish(compiled_gbr_artifact, "1.0.0", "tabular", metadata={"val_mae": 1.5})
+    assert registry.current_version() is None
+
+    registry.publish(compiled_gbr_artifact, "1.1.0", "tabular", activate=True)
+    entry = registry.get()
+
+    assert registry.list_versions() == ["1.0.0", "1.1.0"]
+    assert entry.version == "1.1.0"
+    assert Path(entry.path).exists()
+    assert registry.get("1.0.0").metadata["val_mae"] == 1.5
+
+    with pytest.raises(ValueError):
+        registry.publish(compiled_gbr_artifact, "1.1.0", "tabular")
+    with pytest.raises(ValueError):
+        registry.activate("9.9.9")
+
+
+@pytest.mark.parametrize("version", ["../outside", "..", "a/b", "/tmp/x", ".staging-1"])
+def test_registry_rejects_versions_outside_root(compiled_gbr_artifact, tmp_path, version):
+    """Version names cannot resolve outside the registry directory."""
+    outside = ModelRegistry(tmp_path)
+    outside.publish(compiled_gbr_artifact, "outside", "tabular")
+    registry = ModelRegistry(tmp_path / "registry")
+    registry.publish(compiled_gbr_artifact, "1.0.0", "tabular")
+
+    with pytest.raises(ValueError):
+        registry.get(version)
+    with pytest.raises(ValueError):
+        registry.activate(version)
+    with pytest.raises(ValueError):
+        registry.publish(compiled_gbr_artifact, version, "tabular")
+    assert registry.list_versions() == ["1.0.0"]
+
+
+def test_registry_publish_stores_extra_files(compiled_gbr_artifact, tmp_path):
+    """Extra files are copied next to the artifact and listed in the metadata."""
+    source = tmp_path / "source.joblib"
+    source.write_bytes(b"trainable model")
+
+    registry = ModelRegistry(tmp_path / "registry")
+    entry = registry.publish(compiled_gbr_artifact, "1.0.0", "tabular", extra_files=[source])
+
+    assert entry.metadata["extra_files"] == ["source.joblib"]
+    assert (Path(entry.path).parent / "source.joblib").read_bytes() == b"trainable model"
+
+
+def test_reload_inference_service_swaps_version(compiled_gbr_artifact, tmp_path, monkeypatch):
+    """Reload warms the new version and keeps the old one on failure."""
+    registry = ModelRegistry(tmp_path / "registry")
+    registry.publish(compiled_gbr_artifact, "1.0.0", "tabular", activate=True)
+    registry.publish(compiled_gbr_artifact, "1.1.0", "tabular")
+
+    monkeypatch.setattr(serve, "_serving_config", ServingConfig(registry_dir=str(registry.root)))
+    monkeypatch.setattr(serve, "_inference_service", None)
+
+    assert serve.get_inference_service().version == "1.0.0"
+
+    serve.reload_inference_service("1.1.0")
+    assert serve.get_inference_service().version == "1.1.0"
+
+    with pytest.raises(ValueError):
+        serve.reload_inference_service("2.0.0")
+    assert serve.get_inference_service().version == "1.1.0"
+
+
+def test_reload_activates_only_after_warmup(compiled_gbr_artifact, tmp_path, monkeypatch):
+    """A version that fails to load is never written to CURRENT."""
+    broken = tmp_path / "broken" / "model.npz"
+    broken.parent.mkdir()
+    broken.write_bytes(b"not a model")
+
+    registry = ModelRegistry(tmp_path / "registry")
+    registry.publish(compiled_gbr_artifact, "1.0.0", "tabular", activate=True)
+    registry.publish(broken, "1.1.0", "tabular")
+    registry.publish(compiled_gbr_artifact, "1.2.0", "tabular")
+
+    monkeypatch.setattr(serve, "_serving_config", ServingConfig(registry_dir=str(registry.root)))
+    monkeypatch.setattr(serve, "_inference_service", None)
+
+    with pytest.raises(Exception):
+        serve.reload_inference_service("1.1.0", activate=True)
+    assert registry.current_version() == "1.0.0"
+    assert serve.get_inference_service().version == "1.0.0"
+
+    serve.reload_inference_service("1.2.0", activate=True)
+    assert registry.current_version() == "1.2.0"
+    assert serve.get_inference_service().version == "1.2.0"
+
+
+def test_settings_configure_inference_service(compiled_gbr_artifact, tmp_path, monkeypatch):
+    """Model settings from .env reach the inference service, with pydantic bool parsing."""
+    registry = ModelRegistry(tmp_path / "registry")
+    registry.publish(compiled_gbr_artifact, "1.0.0", "tabular", activate=True)
+    env_file = tmp_path / ".env"
+    env_file.write_text(f"MODEL_REGISTRY_DIR={registry.root}\nMODEL_MMAP=true\n")
+
+    monkeypatch.setattr(serve, "_serving_config", serve._serving_config)
+    configure_inference(Settings(_env_file=env_file))
+    service = serve._create_inference_service()
+
+    assert serve.get_model_registry().root == registry.root
+    assert service.version == "1.0.0"
+    assert service.mmap
+
+
+def test_get_current_model(client, auth_headers):
+    """Current model endpoint reports the served version."""
+    response = client.get("/api/v1/models/current", headers=auth_headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["version"] == serve.get_inference_service().version
+
+
+def test_reload_model_requires_admin(client, auth_headers):
+    """Only admins can hot-swap models."""
+    response = client.post("/api/v1/models/reload", json={}, headers=auth_headers)
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_classify_risk_bands():
+    """Risk bands are [0, low) low, [low, high) medium, [high, inf) high."""
+    predictions = np.array([0.0, 4.99, 5.0, 14.99, 15.0, 80.0])
+
+    assert classify_risk(predictions).tolist() == [
+        "low", "low", "medium", "medium", "high", "high"
+    ]
+    assert classify_risk(predictions, 1.0, 50.0).tolist() == [
+        "low", "medium", "medium", "medium", "medium", "high"
+    ]
+
+
+def test_predict_surge_risk_array_fast_path(training_data, compiled_gbr_artifact):
+    """as_arrays returns NumPy arrays with the same values as the list path."""
+    X, _ = training_data
+    service = ModelInferenceService(str(compiled_gbr_artifact), model_type="tabular")
+
+    as_lists = service.predict_surge_risk(X[:20], threshold_low=0.0, threshold_high=2.0)
+    as_arrays = service.predict_surge_risk(
+        X[:20], threshold_low=0.0, threshold_high=2.0, as_arrays=True
+    )
+
+    assert isinstance(as_arrays["predictions"], np.ndarray)
+    assert as_arrays["risk_categories"].tolist() == as_lists["risk_categories"]
+    assert as_arrays["predictions"].tolist() == as_lists["predictions"]
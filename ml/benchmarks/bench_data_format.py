@@ -0,0 +1,105 @@
+"""
+Benchmark CSV against Parquet for simulator output and training input.
+
+Writes the same simulator-shaped tables as CSV (the save_to_csv layout) and
+as Parquet (write_parquet), then compares file sizes and how long load_data
+takes to return the columns training needs.
+
+Usage:
+    python bench_data_format.py --hospitals 100 --days 90
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / "training"))
+
+from bench_dataset import make_frames
+from data_simulator import write_parquet
+from dataset import load_data
+
+
+COMPLAINT_CODES = ["R50.9", "R06.02", "R51", "R10.9", "I10", "E11.9", "J44.9", "I50.9"]
+
+
+def add_simulator_columns(observations_df: pd.DataFrame, seed: int = 42) -> pd.DataFrame:
+    """Add the per-row id, complaint codes and created_at the simulator writes."""
+    rng = np.random.default_rng(seed)
+    n = len(observations_df)
+    counts = np.minimum(observations_df["new_arrivals"].to_numpy(), 5)
+    codes = rng.integers(0, len(COMPLAINT_CODES), counts.sum())
+    splits = np.split(np.asarray(COMPLAINT_CODES, dtype=object)[codes], np.cumsum(counts)[:-1])
+
+    observations_df = observations_df.copy()
+    observations_df["id"] = [str(uuid.UUID(int=int(i))) for i in rng.integers(0, 2**63, n)]
+    observations_df["primary_complaint_codes"] = [list(s) for s in splits]
+    observations_df["created_at"] = pd.Timestamp.now().isoformat()
+    return observations_df
+
+
+def time_load(data_dir: Path, repeats: int) -> float:
+    """Best-of-N load_data time in seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load_data(str(data_dir))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def dir_size_mb(path: Path) -> float:
+    return sum(f.stat().st_size for f in path.iterdir()) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV vs Parquet data files")
+    parser.add_argument("--hospitals", type=int, default=100)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+
+    args = parser.parse_args()
+
+    observations_df, hospitals_df, events_df = make_frames(
+        args.hospitals, args.days, args.events
+    )
+    observations_df = add_simulator_columns(observations_df)
+    print(f"{len(observations_df):,} observation rows")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_dir = Path(tmp) / "csv"
+        parquet_dir = Path(tmp) / "parquet"
+        csv_dir.mkdir()
+
+        start = time.perf_counter()
+        hospitals_df.to_csv(csv_dir / "hospitals.csv", index=False)
+        events_df.to_csv(csv_dir / "events.csv", index=False)
+        csv_observations = observations_df.copy()
+        csv_observations["primary_complaint_codes"] = (
+            csv_observations["primary_complaint_codes"].str.join(",")
+        )
+        csv_observations.to_csv(csv_dir / "observations.csv", index=False)
+        csv_write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        write_parquet(parquet_dir, hospitals_df, events_df, observations_df)
+        parquet_write = time.perf_counter() - start
+
+        csv_load = time_load(csv_dir, args.repeats)
+        parquet_load = time_load(parquet_dir, args.repeats)
+
+        print(f"{'format':>8} {'size MiB':>9} {'write s':>8} {'load s':>7}")
+        print(f"{'csv':>8} {dir_size_mb(csv_dir):>9.1f} {csv_write:>8.2f} {csv_load:>7.2f}")
+        print(f"{'parquet':>8} {dir_size_mb(parquet_dir):>9.1f} "
+              f"{parquet_write:>8.2f} {parquet_load:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
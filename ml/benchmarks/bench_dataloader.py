@@ -0,0 +1,85 @@
+"""
+Benchmark LSTM training input pipelines.
+
+Compares, over one epoch of a synthetic dataset:
+- default: DataLoader over a Subset with per-sample __getitem__ and
+  default_collate (what train.py used)
+- batched: create_dataloader(), one vectorised gather per batch, with
+  0..N worker processes
+
+Each pipeline is timed on its own ("load") and feeding a training step of
+the baseline LSTM ("train"), reported as samples/sec.
+
+Usage:
+    python bench_dataloader.py --hospitals 50 --days 60 --workers 0 2
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Subset
+
+sys.path.append(str(Path(__file__).parent.parent / "training"))
+
+from bench_dataset import make_frames
+from dataset import HospitalForecastDataset, create_dataloader
+from models.nn_model import LSTMForecastModel, train_epoch
+
+
+def samples_per_sec(loader, n_samples: int, model=None) -> float:
+    """Iterate one epoch, optionally with a training step per batch."""
+    start = time.perf_counter()
+    if model is None:
+        for _ in loader:
+            pass
+    else:
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+        train_epoch(model, loader, nn.MSELoss(), optimizer, torch.device("cpu"))
+    return n_samples / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DataLoader pipelines")
+    parser.add_argument("--hospitals", type=int, default=50)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2])
+    parser.add_argument("--prefetch-factor", type=int, default=2)
+
+    args = parser.parse_args()
+
+    dataset = HospitalForecastDataset(*make_frames(args.hospitals, args.days))
+    indices = np.random.default_rng(0).permutation(len(dataset))[:int(0.8 * len(dataset))]
+    print(f"{len(indices):,} training windows, batch size {args.batch_size}, "
+          f"{torch.get_num_threads()} torch threads")
+
+    loaders = {
+        "default": DataLoader(
+            Subset(dataset, indices), batch_size=args.batch_size, shuffle=True
+        )
+    }
+    for workers in args.workers:
+        loaders[f"batched/{workers}w"] = create_dataloader(
+            dataset,
+            indices,
+            batch_size=args.batch_size,
+            shuffle=True,
+            num_workers=workers,
+            prefetch_factor=args.prefetch_factor
+        )
+
+    print(f"{'pipeline':>12} {'load/s':>10} {'train/s':>10}")
+    for name, loader in loaders.items():
+        torch.manual_seed(0)
+        load_rate = samples_per_sec(loader, len(indices))
+        train_rate = samples_per_sec(loader, len(indices), LSTMForecastModel(input_size=12))
+        print(f"{name:>12} {load_rate:>10,.0f} {train_rate:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
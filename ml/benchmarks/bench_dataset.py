@@ -0,0 +1,217 @@
+"""
+Benchmark HospitalForecastDataset construction at scale.
+
+Builds simulator-shaped frames directly with NumPy (the simulator itself is
+too slow at this size), then times the dataset builder. The legacy per-window
+builder is timed on a subset of hospitals and extrapolated, since running it
+on the full dataset takes hours. The event interval join is timed against
+the legacy per-event mask loop. Train-set materialisation through
+get_arrays() is compared with the per-item list comprehension train.py used,
+and saving/reopening the dataset cache is timed against the build.
+
+Usage:
+    python bench_dataset.py --hospitals 500 --days 365 --events 200 --legacy-hospitals 5
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / "training"))
+
+from dataset import FEATURE_COLS, HospitalForecastDataset, compute_event_features
+
+
+def make_frames(n_hospitals: int, days: int, n_events: int = 10, seed: int = 42):
+    """Create observations, hospitals and events frames in the simulator's CSV layout."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-01-01")
+    hours = days * 24
+
+    hospitals_df = pd.DataFrame({
+        "id": [str(uuid.UUID(int=int(i))) for i in rng.integers(0, 2**63, n_hospitals)],
+        "bed_count": rng.integers(50, 500, n_hospitals),
+        "icu_count": rng.integers(5, 50, n_hospitals),
+        "oxygen_capacity": rng.integers(100, 1000, n_hospitals),
+        "doctors": rng.integers(10, 100, n_hospitals),
+        "nurses": rng.integers(20, 200, n_hospitals),
+        "lat": rng.uniform(37.7, 37.8, n_hospitals),
+        "lon": rng.uniform(-122.5, -122.4, n_hospitals)
+    })
+
+    n_rows = n_hospitals * hours
+    timestamps = start + pd.to_timedelta(np.tile(np.arange(hours), n_hospitals), unit="h")
+    observations_df = pd.DataFrame({
+        "timestamp": timestamps.strftime("%Y-%m-%dT%H:%M:%S"),
+        "hospital_id": np.repeat(hospitals_df["id"].to_numpy(), hours),
+        "current_patients": rng.integers(20, 450, n_rows),
+        "new_arrivals": rng.poisson(2, n_rows),
+        "avg_age": rng.uniform(35, 75, n_rows).round(1),
+        "aqi": rng.uniform(20, 150, n_rows).round(1),
+        "temperature": rng.uniform(15, 35, n_rows).round(1),
+        "humidity": rng.uniform(30, 90, n_rows).round(1)
+    })
+
+    event_starts = start + pd.to_timedelta(rng.integers(0, days, n_events), unit="D")
+    events_df = pd.DataFrame({
+        "id": [str(uuid.uuid4()) for _ in range(n_events)],
+        "start_ts": event_starts.strftime("%Y-%m-%dT%H:%M:%S"),
+        "end_ts": (event_starts + pd.to_timedelta(rng.choice([1, 2, 3, 5], n_events), unit="D"))
+            .strftime("%Y-%m-%dT%H:%M:%S"),
+        "expected_attendance": rng.integers(1000, 100000, n_events),
+        "lat": rng.uniform(37.7, 37.8, n_events),
+        "lon": rng.uniform(-122.5, -122.4, n_events)
+    })
+
+    return observations_df, hospitals_df, events_df
+
+
+def legacy_create_sequences(data: pd.DataFrame, sequence_length: int, forecast_horizon: int):
+    """The original per-window builder: one iloc slice, copy and dict per sample."""
+    sequences = []
+    for hospital_id in data["hospital_id"].unique():
+        hospital_data = data[data["hospital_id"] == hospital_id].copy()
+        for i in range(len(hospital_data) - sequence_length - forecast_horizon):
+            seq_data = hospital_data.iloc[i:i + sequence_length]
+            target_idx = i + sequence_length + forecast_horizon - 1
+            sequences.append({
+                "features": seq_data[FEATURE_COLS].values.astype(np.float32),
+                "target": float(hospital_data.iloc[target_idx]["new_arrivals"]),
+                "hospital_id": hospital_id,
+                "timestamp": hospital_data.iloc[i + sequence_length]["timestamp"]
+            })
+    return sequences
+
+
+def legacy_event_features(df: pd.DataFrame, events_df: pd.DataFrame) -> pd.Series:
+    """The original event join: a full boolean mask per event, last event wins."""
+    attendance = pd.Series(0, index=df.index)
+    for _, event in events_df.iterrows():
+        mask = (df["timestamp"] >= event["start_ts"]) & (df["timestamp"] <= event["end_ts"])
+        if mask.any():
+            attendance.loc[mask] = event["expected_attendance"]
+    return attendance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dataset construction")
+    parser.add_argument("--hospitals", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--legacy-hospitals", type=int, default=5,
+                        help="Hospitals to time the legacy builder on (0 to skip)")
+    parser.add_argument("--materialise", type=int, default=200000,
+                        help="Windows to gather when timing train-set materialisation")
+    parser.add_argument("--sequence-length", type=int, default=24)
+    parser.add_argument("--forecast-horizon", type=int, default=24)
+
+    args = parser.parse_args()
+
+    print(f"Generating {args.hospitals} hospitals x {args.days} days...")
+    observations_df, hospitals_df, events_df = make_frames(
+        args.hospitals, args.days, args.events
+    )
+    print(f"{len(observations_df):,} observation rows, {len(events_df)} events")
+
+    timed = observations_df[["timestamp", "hospital_id"]].copy()
+    timed["timestamp"] = pd.to_datetime(timed["timestamp"])
+    timed_events = events_df.copy()
+    timed_events["start_ts"] = pd.to_datetime(timed_events["start_ts"])
+    timed_events["end_ts"] = pd.to_datetime(timed_events["end_ts"])
+
+    start = time.perf_counter()
+    compute_event_features(timed, hospitals_df, timed_events)
+    join_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    legacy_event_features(timed, timed_events)
+    legacy_join_elapsed = time.perf_counter() - start
+    print(f"event join: interval join {join_elapsed:.2f}s, "
+          f"legacy mask loop {legacy_join_elapsed:.2f}s")
+
+    # Copy the inputs outside the traced region so only the builder is measured
+    observations_input, events_input = observations_df.copy(), events_df.copy()
+    tracemalloc.start()
+    start = time.perf_counter()
+    dataset = HospitalForecastDataset(
+        observations_input,
+        hospitals_df,
+        events_input,
+        sequence_length=args.sequence_length,
+        forecast_horizon=args.forecast_horizon
+    )
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del observations_input, events_input
+
+    window_bytes = (
+        dataset.features.nbytes + dataset.targets.nbytes
+        + dataset.window_starts.nbytes + dataset.window_hospitals.nbytes
+    )
+    print(f"dataset: {len(dataset):,} windows in {elapsed:.1f}s, "
+          f"peak {peak / 2**20:.0f} MiB, window storage {window_bytes / 2**20:.0f} MiB")
+
+    # Reopening from the on-disk cache instead of rebuilding
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        dataset.save(Path(tmp) / "entry")
+        save_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        cached = HospitalForecastDataset.load(Path(tmp) / "entry")
+        cached.get_arrays(np.arange(min(len(cached), 1000)))
+        load_elapsed = time.perf_counter() - start
+        del cached
+    print(f"cache: save {save_elapsed:.2f}s, mmap reopen {load_elapsed:.3f}s")
+
+    # Train-set materialisation for the tabular path on a sample of windows
+    sample = np.random.default_rng(0).permutation(len(dataset))[:args.materialise]
+    tracemalloc.start()
+    start = time.perf_counter()
+    X, y = dataset.get_arrays(sample, flatten=True)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"get_arrays: {len(sample):,} windows in {elapsed:.2f}s, "
+          f"peak {peak / 2**20:.0f} MiB (X is {X.nbytes / 2**20:.0f} MiB)")
+    del X, y
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    X = np.array([dataset[i][0].numpy() for i in sample])
+    y = np.array([dataset[i][1].item() for i in sample])
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"per-item:   {len(sample):,} windows in {elapsed:.2f}s, "
+          f"peak {peak / 2**20:.0f} MiB")
+    del X, y
+
+    if args.legacy_hospitals:
+        subset_ids = hospitals_df["id"].iloc[:args.legacy_hospitals]
+        subset = dataset._prepare_data(
+            observations_df[observations_df["hospital_id"].isin(subset_ids)],
+            hospitals_df,
+            events_df.copy()
+        )
+        start = time.perf_counter()
+        sequences = legacy_create_sequences(
+            subset, args.sequence_length, args.forecast_horizon
+        )
+        legacy_elapsed = time.perf_counter() - start
+        per_window = legacy_elapsed / len(sequences)
+        legacy_bytes = len(dataset) * sequences[0]["features"].nbytes
+        print(f"legacy:  {len(sequences):,} windows in {legacy_elapsed:.1f}s "
+              f"({per_window * 1e6:.0f} us/window), extrapolated to full dataset: "
+              f"{per_window * len(dataset) / 3600:.1f} h and "
+              f"{legacy_bytes / 2**30:.1f} GiB of window copies")
+
+
+if __name__ == "__main__":
+    main()
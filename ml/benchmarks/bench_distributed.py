@@ -0,0 +1,115 @@
+"""
+Benchmark data-parallel LSTM training on CPU.
+
+Runs one training epoch of the baseline LSTM with 1, 2, 4 and 8 gloo
+processes (DistributedDataParallel over ShardedSampler loaders, as
+train.py --nproc does) and reports samples/sec and speedup over one
+process. Each process gets cpu_count / processes torch threads, so the
+comparison is at a fixed core budget; speedups need as many idle cores as
+processes.
+
+Usage:
+    python bench_distributed.py --hospitals 50 --days 60 --processes 1 2 4 8
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+from torch.nn.parallel import DistributedDataParallel
+
+sys.path.append(str(Path(__file__).parent.parent / "training"))
+
+from bench_dataset import make_frames
+from dataset import HospitalForecastDataset, create_dataloader, shared_dataset_path
+from models.nn_model import LSTMForecastModel, train_epoch
+
+
+def _worker(
+    rank: int,
+    world_size: int,
+    dataset_path: str,
+    indices: np.ndarray,
+    batch_size: int,
+    result_path: str
+):
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    try:
+        dataset = HospitalForecastDataset.load(dataset_path)
+        loader = create_dataloader(
+            dataset, indices, batch_size=batch_size, shuffle=True,
+            seed=0, num_replicas=world_size, rank=rank
+        )
+        torch.manual_seed(0)
+        model = DistributedDataParallel(LSTMForecastModel(input_size=12))
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+
+        # Warm-up epoch, then time one epoch from a common start
+        train_epoch(model, loader, nn.MSELoss(), optimizer, torch.device("cpu"))
+        dist.barrier()
+        start = time.perf_counter()
+        train_epoch(model, loader, nn.MSELoss(), optimizer, torch.device("cpu"))
+        dist.barrier()
+        elapsed = time.perf_counter() - start
+
+        if rank == 0:
+            Path(result_path).write_text(str(elapsed))
+    finally:
+        dist.destroy_process_group()
+
+
+def epoch_seconds(dataset_path: Path, indices: np.ndarray, processes: int, batch_size: int) -> float:
+    """Wall time of one training epoch with the given number of processes."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = str(Path(tmp) / "elapsed")
+        mp.spawn(
+            _worker,
+            args=(processes, str(dataset_path), indices, batch_size, result_path),
+            nprocs=processes,
+            join=True
+        )
+        return float(Path(result_path).read_text())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data-parallel training")
+    parser.add_argument("--hospitals", type=int, default=50)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+
+    args = parser.parse_args()
+
+    dataset = HospitalForecastDataset(*make_frames(args.hospitals, args.days))
+    indices = np.random.default_rng(0).permutation(len(dataset))[:int(0.8 * len(dataset))]
+    print(f"{len(indices):,} training windows, batch size {args.batch_size} per process, "
+          f"{os.cpu_count()} CPUs")
+
+    print(f"{'processes':>9} {'epoch s':>9} {'samples/s':>10} {'speedup':>8}")
+    baseline = None
+    with shared_dataset_path(dataset) as dataset_path:
+        for processes in args.processes:
+            elapsed = epoch_seconds(dataset_path, indices, processes, args.batch_size)
+            baseline = baseline or elapsed
+            print(f"{processes:>9} {elapsed:>9.2f} {len(indices) / elapsed:>10,.0f} "
+                  f"{baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark eager versus TorchScript LSTM serving.
+
+Compares three paths at several batch sizes:
+- legacy: eager module under no_grad with a FloatTensor copy per batch
+- eager: ModelInferenceService serving the pickled module
+- script: ModelInferenceService serving the TorchScript artifact
+- int8: ModelInferenceService serving the dynamically quantized artifact
+
+Usage:
+    python bench_nn_serving.py --batch-sizes 1 8 64 256 --threads 1
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+sys.path.append(str(Path(__file__).parent.parent / "training"))
+sys.path.append(str(Path(__file__).parent.parent / "inference"))
+
+from models.nn_model import LSTMForecastModel, export_torchscript, quantize_dynamic
+from serve import ModelInferenceService, configure_torch_threads
+
+
+def time_call(fn, repeats: int, warmup: int = 5) -> float:
+    """Return mean wall-clock milliseconds per call."""
+    for _ in range(warmup):
+        fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LSTM serving paths")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64, 256])
+    parser.add_argument("--sequence-length", type=int, default=24)
+    parser.add_argument("--input-size", type=int, default=12)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads")
+    parser.add_argument("--interop-threads", type=int, default=None, help="Inter-op threads")
+
+    args = parser.parse_args()
+
+    configure_torch_threads(args.threads, args.interop_threads)
+    torch.manual_seed(0)
+
+    model = LSTMForecastModel(input_size=args.input_size).eval()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        eager_path = str(Path(tmp) / "lstm_model.pt")
+        script_path = str(Path(tmp) / "lstm_model.torchscript")
+        torch.save(model, eager_path)
+        int8_path = str(Path(tmp) / "lstm_model.int8.torchscript")
+        export_torchscript(model, script_path, args.sequence_length, args.input_size)
+        export_torchscript(
+            quantize_dynamic(model), int8_path, args.sequence_length, args.input_size
+        )
+        sizes = {
+            name: Path(path).stat().st_size / 1024
+            for name, path in (("fp32", script_path), ("int8", int8_path))
+        }
+
+        eager_service = ModelInferenceService(eager_path, model_type="nn")
+        script_service = ModelInferenceService(script_path, model_type="nn")
+        int8_service = ModelInferenceService(int8_path, model_type="nn")
+
+    def legacy_predict(features: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            return model(torch.FloatTensor(features)).numpy().flatten()
+
+    def service_predict(service: ModelInferenceService, features: np.ndarray) -> np.ndarray:
+        return np.array(service.predict(features, return_confidence=False)["predictions"])
+
+    print(f"torch {torch.__version__}, intra-op threads {torch.get_num_threads()}, "
+          f"inter-op threads {torch.get_num_interop_threads()}")
+    print(f"artifact size: fp32 {sizes['fp32']:.1f} KiB, int8 {sizes['int8']:.1f} KiB")
+    print(f"{'batch':>6} {'legacy ms':>10} {'eager ms':>10} {'script ms':>10} "
+          f"{'int8 ms':>10} {'speedup':>8} {'max diff':>10}")
+
+    rng = np.random.default_rng(0)
+    for batch_size in args.batch_sizes:
+        features = rng.normal(
+            size=(batch_size, args.sequence_length, args.input_size)
+        ).astype(np.float32)
+
+        legacy_ms = time_call(lambda: legacy_predict(features), args.repeats)
+        eager_ms = time_call(lambda: service_predict(eager_service, features), args.repeats)
+        script_ms = time_call(lambda: service_predict(script_service, features), args.repeats)
+        int8_ms = time_call(lambda: service_predict(int8_service, features), args.repeats)
+        diff = np.abs(
+            legacy_predict(features) - service_predict(script_service, features)
+        ).max()
+
+        print(f"{batch_size:>6} {legacy_ms:>10.3f} {eager_ms:>10.3f} {script_ms:>10.3f} "
+              f"{int8_ms:>10.3f} {legacy_ms / script_ms:>7.2f}x {diff:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark engineered tabular features against the flattened window.
+
+Fits each tabular model type on both input layouts of the same simulator
+data and reports feature width, feature-building time, fit time, compiled
+artifact size, batch-1 and batch-1000 serving latency (from raw windows,
+feature engineering included) and validation MAE on a time-based holdout.
+
+Usage:
+    python bench_tabular_features.py --n-train 20000 --model-types gradient_boosting
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent / "training"))
+sys.path.append(str(Path(__file__).parent.parent / "inference"))
+
+from bench_dataset import make_frames
+from compiled_trees import compile_ensemble
+from dataset import HospitalForecastDataset
+from models.tabular_model import TabularForecastModel
+from serve import ModelInferenceService
+from tabular_features import FEATURE_SETS
+
+
+MODEL_TYPES = ["gradient_boosting", "hist_gradient_boosting", "random_forest"]
+
+
+def time_call(fn, repeats: int) -> float:
+    """Best-of-N call time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tabular feature layouts")
+    parser.add_argument("--n-train", type=int, default=10000, help="Training windows")
+    parser.add_argument("--val-size", type=int, default=5000)
+    parser.add_argument("--model-types", nargs="+", choices=MODEL_TYPES,
+                        default=["gradient_boosting", "hist_gradient_boosting"])
+    parser.add_argument("--n-estimators", type=int, default=100)
+
+    args = parser.parse_args()
+
+    days = 60
+    n_windows = args.n_train + args.val_size
+    n_hospitals = int(np.ceil(n_windows / (days * 24 - 48))) + 1
+    dataset = HospitalForecastDataset(*make_frames(n_hospitals, days))
+
+    # Time-based holdout: the latest targets are validation
+    order = np.argsort(dataset.get_target_timestamps(), kind="stable")
+    train_idx = order[:-args.val_size][-args.n_train:]
+    val_idx = order[-args.val_size:]
+
+    # Serving receives raw windows plus each window's last observed hour
+    val_starts = dataset.window_starts[val_idx]
+    raw_val = np.ascontiguousarray(dataset.windows[val_starts[:1000]])
+    origin_times = dataset.timestamps[val_starts[:1000] + dataset.sequence_length - 1]
+
+    print(f"{len(train_idx):,} training / {len(val_idx):,} validation windows")
+    print(f"{'model':>22} {'features':>10} {'width':>6} {'build s':>8} {'fit s':>7} "
+          f"{'size KiB':>9} {'b1 ms':>7} {'b1000 ms':>9} {'val MAE':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for model_type in args.model_types:
+            for feature_set in FEATURE_SETS:
+                start = time.perf_counter()
+                X_train, y_train = dataset.get_tabular_arrays(train_idx, feature_set)
+                X_val, y_val = dataset.get_tabular_arrays(val_idx, feature_set)
+                build_seconds = time.perf_counter() - start
+
+                model = TabularForecastModel(
+                    model_type=model_type,
+                    n_estimators=args.n_estimators,
+                    random_state=42
+                )
+                start = time.perf_counter()
+                model.train(X_train, y_train)
+                fit_seconds = time.perf_counter() - start
+                mae = model.evaluate(X_val, y_val)["mae"]
+
+                path = Path(tmp) / f"{model_type}-{feature_set}.npz"
+                compile_ensemble(model.model).save(path)
+                service = ModelInferenceService(
+                    str(path), model_type="tabular", feature_set=feature_set
+                )
+                b1 = time_call(
+                    lambda: service.predict_array(raw_val[:1], origin_times=origin_times[:1]),
+                    repeats=50
+                )
+                b1000 = time_call(
+                    lambda: service.predict_array(raw_val, origin_times=origin_times),
+                    repeats=5
+                )
+
+                print(f"{model_type:>22} {feature_set:>10} {X_train.shape[1]:>6} "
+                      f"{build_seconds:>8.2f} {fit_seconds:>7.1f} "
+                      f"{path.stat().st_size / 1024:>9.0f} {b1:>7.2f} {b1000:>9.1f} "
+                      f"{mae:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
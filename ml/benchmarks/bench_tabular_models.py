@@ -0,0 +1,92 @@
+"""
+Benchmark fit and predict time of the tabular model types.
+
+Builds simulator-shaped data, takes the flattened 24h x 12-feature windows
+the tabular path trains on, and for each training-set size fits every
+TabularForecastModel type with the baseline hyperparameters. Reports fit
+time, batch-1 and batch-1000 predict time through the compiled artifact,
+and validation MAE on a time-based holdout.
+
+Usage:
+    python bench_tabular_models.py --sizes 10000 50000 100000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent / "training"))
+sys.path.append(str(Path(__file__).parent.parent / "inference"))
+
+from bench_dataset import make_frames
+from compiled_trees import compile_ensemble
+from dataset import HospitalForecastDataset
+from models.tabular_model import TabularForecastModel
+
+
+MODEL_TYPES = ["gradient_boosting", "hist_gradient_boosting", "random_forest"]
+
+
+def time_predict(model, X: np.ndarray, repeats: int) -> float:
+    """Best-of-N predict time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tabular model types")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000],
+                        help="Training-set sizes (windows)")
+    parser.add_argument("--model-types", nargs="+", choices=MODEL_TYPES, default=MODEL_TYPES)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--val-size", type=int, default=5000)
+
+    args = parser.parse_args()
+
+    # Enough hospital-days for the largest size plus the holdout
+    n_windows = max(args.sizes) + args.val_size
+    days = 60
+    n_hospitals = int(np.ceil(n_windows / (days * 24 - 48))) + 1
+    dataset = HospitalForecastDataset(*make_frames(n_hospitals, days))
+
+    # Time-based holdout: the latest targets are validation
+    order = np.argsort(dataset.get_target_timestamps(), kind="stable")
+    val_idx = order[-args.val_size:]
+    X_val, y_val = dataset.get_arrays(val_idx, flatten=True)
+    print(f"{len(dataset):,} windows, {X_val.shape[1]} features, "
+          f"holdout {len(val_idx):,}")
+
+    print(f"{'model':>22} {'n_train':>8} {'fit s':>8} {'pred b1 ms':>10} "
+          f"{'pred b1000 ms':>13} {'val MAE':>8}")
+    for size in args.sizes:
+        train_idx = order[:-args.val_size][-size:]
+        X_train, y_train = dataset.get_arrays(train_idx, flatten=True)
+
+        for model_type in args.model_types:
+            model = TabularForecastModel(
+                model_type=model_type,
+                n_estimators=args.n_estimators,
+                random_state=42
+            )
+            start = time.perf_counter()
+            model.train(X_train, y_train)
+            fit_seconds = time.perf_counter() - start
+
+            compiled = compile_ensemble(model.model)
+            b1 = time_predict(compiled, X_val[:1], repeats=50)
+            b1000 = time_predict(compiled, X_val[:1000], repeats=5)
+            mae = model.evaluate(X_val, y_val)["mae"]
+
+            print(f"{model_type:>22} {size:>8,} {fit_seconds:>8.1f} {b1:>10.2f} "
+                  f"{b1000:>13.1f} {mae:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
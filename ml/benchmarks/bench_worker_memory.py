@@ -0,0 +1,145 @@
+"""
+Benchmark per-worker memory for the model loading modes.
+
+Trains a RandomForest on synthetic data, then starts N worker processes per
+mode. Each worker loads the model, runs a prediction and reports its memory
+while every worker is still alive:
+- private: each worker joblib.load()s its own copy (the default)
+- compiled: each worker loads the compiled .npz artifact
+- mmap: each worker memory-maps the compiled .npz artifact
+- preload: the parent loads the pickle once, then forks the workers
+
+RSS counts shared pages in full for every process. PSS splits shared pages
+between the processes that map them, and USS counts only private pages, so
+PSS/USS show what each extra worker really costs. Linux only (reads
+/proc/self/smaps_rollup).
+
+Usage:
+    python bench_worker_memory.py --workers 4 --trees 200
+"""
+
+import argparse
+import gc
+import multiprocessing as mp
+import sys
+import tempfile
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.append(str(Path(__file__).parent.parent / "inference"))
+
+from compiled_trees import CompiledTreeEnsemble, compile_ensemble
+
+
+MODES = ["private", "compiled", "mmap", "preload"]
+
+
+def read_memory_mb() -> dict:
+    """Read RSS, PSS and USS of the current process in MiB."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"]
+    }
+
+
+def load_model(mode: str, pickle_path: str, npz_path: str):
+    """Load the model the way a worker would in each mode."""
+    if mode == "private":
+        return joblib.load(pickle_path)
+    if mode == "compiled":
+        return CompiledTreeEnsemble.load(npz_path)
+    if mode == "mmap":
+        return CompiledTreeEnsemble.load(npz_path, mmap=True)
+    raise ValueError(mode)
+
+
+def worker(mode, pickle_path, npz_path, X, barrier, results, preloaded=None):
+    """Load (unless preloaded), predict, and report memory with all workers alive."""
+    model = preloaded if preloaded is not None else load_model(mode, pickle_path, npz_path)
+    model.predict(X)
+    barrier.wait()
+    results.put(read_memory_mb())
+    barrier.wait()
+
+
+def run_mode(mode: str, n_workers: int, pickle_path: str, npz_path: str, X: np.ndarray):
+    """Run one mode and return the per-worker memory readings."""
+    ctx = mp.get_context("fork")
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+
+    preloaded = None
+    if mode == "preload":
+        preloaded = joblib.load(pickle_path)
+        gc.freeze()
+
+    processes = [
+        ctx.Process(
+            target=worker,
+            args=(mode, pickle_path, npz_path, X, barrier, results, preloaded)
+        )
+        for _ in range(n_workers)
+    ]
+    for p in processes:
+        p.start()
+    readings = [results.get() for _ in range(n_workers)]
+    for p in processes:
+        p.join()
+
+    if preloaded is not None:
+        gc.unfreeze()
+    return readings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-worker model memory")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--features", type=int, default=288)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(args.samples, args.features)).astype(np.float32)
+    y = X[:, 0] * 3 + X[:, 1] ** 2 + rng.normal(size=args.samples)
+
+    print(f"Training RandomForest ({args.trees} trees, {args.samples} samples)...")
+    model = RandomForestRegressor(n_estimators=args.trees, n_jobs=-1, random_state=42)
+    model.fit(X, y)
+    model.n_jobs = 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = str(Path(tmp) / "model.pkl")
+        npz_path = str(Path(tmp) / "model.npz")
+        joblib.dump(model, pickle_path)
+        compiled = compile_ensemble(model)
+        compiled.save(npz_path)
+        del model, compiled
+        gc.collect()
+
+        print(f"pickle {Path(pickle_path).stat().st_size / 2**20:.1f} MiB, "
+              f"compiled {Path(npz_path).stat().st_size / 2**20:.1f} MiB")
+        print(f"{'mode':>9} {'RSS MiB':>9} {'PSS MiB':>9} {'USS MiB':>9}  (mean per worker, "
+              f"{args.workers} workers)")
+
+        X_batch = X[:64]
+        for mode in args.modes:
+            readings = run_mode(mode, args.workers, pickle_path, npz_path, X_batch)
+            mean = {k: np.mean([r[k] for r in readings]) for k in ("rss", "pss", "uss")}
+            print(f"{mode:>9} {mean['rss']:>9.1f} {mean['pss']:>9.1f} {mean['uss']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Compiled tree-ensemble predictor for FestSafe AI.
+
+Flattens a fitted sklearn GradientBoostingRegressor,
+HistGradientBoostingRegressor or RandomForestRegressor into plain NumPy
+node arrays so that serving only needs NumPy and a small
+artifact instead of the whole pickled estimator.
+"""
+
+import argparse
+import struct
+import zipfile
+from pathlib import Path
+from typing import Dict, Any, Union
+
+import numpy as np
+
+
+# Artifact format version, bumped whenever the stored arrays change
+FORMAT_VERSION = 1
+
+
+class CompiledTreeEnsemble:
+    """Vectorised predictor over a flattened tree ensemble.
+
+    All trees live in one set of node arrays. Leaves point back at
+    themselves, so every tree can be walked in lock-step for ``max_depth``
+    steps without branching on leaf status.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        missing_left: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        n_features: int,
+        scale: float = 1.0,
+        init: float = 0.0,
+        input_dtype: str = "float32"
+    ):
+        """
+        Args:
+            kind: "gradient_boosting" or "random_forest"
+            feature: Split feature per node
+            threshold: Split threshold per node
+            left: Left child per node (self for leaves)
+            right: Right child per node (self for leaves)
+            value: Leaf value per node
+            missing_left: Whether NaN goes left at each node
+            roots: Root node index of each tree
+            max_depth: Maximum tree depth in the ensemble
+            n_features: Number of input features
+            scale: Learning rate (gradient boosting only)
+            init: Initial raw prediction (gradient boosting only)
+            input_dtype: Precision inputs are compared in, matching the
+                source estimator (float64 for hist gradient boosting)
+        """
+        if kind not in ("gradient_boosting", "random_forest"):
+            raise ValueError(f"Unknown ensemble kind: {kind}")
+
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.missing_left = missing_left
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.scale = float(scale)
+        self.init = float(init)
+        self.input_dtype = np.dtype(input_dtype)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the node arrays."""
+        return sum(
+            arr.nbytes for arr in (
+                self.feature, self.threshold, self.left, self.right,
+                self.value, self.missing_left, self.roots
+            )
+        )
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf reached in every tree, shape (n_samples, n_trees)."""
+        # Compare in the same precision as the source estimator (sklearn trees
+        # cast inputs to float32, hist gradient boosting to float64)
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        if X.ndim > 2:
+            X = X.reshape(X.shape[0], -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Expected {self.n_features} features, got {X.shape[1]}"
+            )
+
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            nan = np.isnan(x)
+            if nan.any():
+                go_left = np.where(nan, self.missing_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Make predictions matching the source estimator bit for bit."""
+        leaf_values = self.value[self.apply(X)]
+
+        # np.cumsum adds strictly left to right, which reproduces sklearn's
+        # per-tree accumulation order exactly (np.sum would not).
+        if self.kind == "gradient_boosting":
+            terms = np.empty((leaf_values.shape[0], self.n_trees + 1))
+            terms[:, 0] = self.init
+            np.multiply(self.scale, leaf_values, out=terms[:, 1:])
+            return np.cumsum(terms, axis=1)[:, -1]
+
+        totals = np.cumsum(leaf_values, axis=1)[:, -1]
+        return totals / self.n_trees
+
+    def save(self, path: Union[str, Path]):
+        """Save the compiled ensemble as an uncompressed .npz artifact."""
+        np.savez(
+            path,
+            format_version=np.int64(FORMAT_VERSION),
+            kind=np.array(self.kind),
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            missing_left=self.missing_left,
+            roots=self.roots,
+            max_depth=np.int64(self.max_depth),
+            n_features=np.int64(self.n_features),
+            scale=np.float64(self.scale),
+            init=np.float64(self.init),
+            input_dtype=np.array(self.input_dtype.name)
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = False) -> "CompiledTreeEnsemble":
+        """
+        Load a compiled ensemble artifact.
+
+        Args:
+            path: .npz artifact written by save()
+            mmap: Memory-map the node arrays read-only instead of copying them,
+                so every process loading the same file shares one page-cache copy
+        """
+        if mmap:
+            return cls._from_arrays(_mmap_npz(path))
+        with np.load(path, allow_pickle=False) as data:
+            return cls._from_arrays(data)
+
+    @classmethod
+    def _from_arrays(cls, data) -> "CompiledTreeEnsemble":
+        """Build an ensemble from a mapping of saved arrays."""
+        version = int(data["format_version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported compiled model format {version}, "
+                f"expected {FORMAT_VERSION}"
+            )
+        return cls(
+            kind=str(data["kind"]),
+            feature=data["feature"],
+            threshold=data["threshold"],
+            left=data["left"],
+            right=data["right"],
+            value=data["value"],
+            missing_left=data["missing_left"],
+            roots=data["roots"],
+            max_depth=int(data["max_depth"]),
+            n_features=int(data["n_features"]),
+            scale=float(data["scale"]),
+            init=float(data["init"]),
+            # Artifacts written before input_dtype was stored are float32
+            input_dtype=str(data["input_dtype"]) if "input_dtype" in data else "float32"
+        )
+
+
+def _mmap_npz(path: Union[str, Path]) -> Dict[str, np.ndarray]:
+    """Memory-map every array stored in an uncompressed .npz archive."""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} is compressed and cannot be memory-mapped")
+
+            # Skip the zip local file header to reach the raw .npy bytes
+            f.seek(info.header_offset)
+            name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path} contains object arrays")
+
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if len(shape) == 0:
+                # Scalars are tiny; read them directly
+                arrays[name] = np.frombuffer(f.read(dtype.itemsize), dtype=dtype).reshape(())
+            else:
+                arrays[name] = np.memmap(
+                    path,
+                    dtype=dtype,
+                    mode="r",
+                    offset=f.tell(),
+                    shape=shape,
+                    order="F" if fortran_order else "C"
+                )
+    return arrays
+
+
+def _flatten_trees(trees) -> Dict[str, Any]:
+    """Concatenate sklearn tree structures into shared node arrays."""
+    features, thresholds, lefts, rights = [], [], [], []
+    values, missing_lefts, roots = [], [], []
+    max_depth = 0
+    offset = 0
+
+    for tree in trees:
+        t = tree.tree_
+        n = t.node_count
+        node_ids = np.arange(n, dtype=np.int32)
+        is_leaf = t.children_left == -1
+
+        features.append(np.where(is_leaf, 0, t.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, t.threshold).astype(np.float64))
+        lefts.append(np.where(is_leaf, node_ids, t.children_left).astype(np.int32) + offset)
+        rights.append(np.where(is_leaf, node_ids, t.children_right).astype(np.int32) + offset)
+        values.append(t.value[:, 0, 0].astype(np.float64))
+
+        missing = getattr(t, "missing_go_to_left", None)
+        if missing is None:
+            missing = np.zeros(n, dtype=bool)
+        missing_lefts.append(np.asarray(missing, dtype=bool))
+
+        roots.append(offset)
+        max_depth = max(max_depth, t.max_depth)
+        offset += n
+
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "missing_left": np.concatenate(missing_lefts),
+        "roots": np.array(roots, dtype=np.int32),
+        "max_depth": max_depth
+    }
+
+
+def _flatten_hist_predictors(predictors) -> Dict[str, Any]:
+    """Concatenate HistGradientBoosting tree predictors into shared node arrays."""
+    features, thresholds, lefts, rights = [], [], [], []
+    values, missing_lefts, roots = [], [], []
+    max_depth = 0
+    offset = 0
+
+    for predictor in predictors:
+        nodes = predictor.nodes
+        if nodes["is_categorical"].any():
+            raise ValueError("Categorical splits are not supported")
+        n = len(nodes)
+        node_ids = np.arange(n, dtype=np.int32)
+        is_leaf = nodes["is_leaf"].astype(bool)
+
+        features.append(np.where(is_leaf, 0, nodes["feature_idx"]).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, nodes["num_threshold"]).astype(np.float64))
+        lefts.append(np.where(is_leaf, node_ids, nodes["left"]).astype(np.int32) + offset)
+        rights.append(np.where(is_leaf, node_ids, nodes["right"]).astype(np.int32) + offset)
+        # Leaf values already include the learning rate
+        values.append(np.where(is_leaf, nodes["value"], 0.0).astype(np.float64))
+        missing_lefts.append(nodes["missing_go_to_left"].astype(bool))
+
+        roots.append(offset)
+        max_depth = max(max_depth, int(nodes["depth"].max()))
+        offset += n
+
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "missing_left": np.concatenate(missing_lefts),
+        "roots": np.array(roots, dtype=np.int32),
+        "max_depth": max_depth
+    }
+
+
+def compile_ensemble(estimator) -> CompiledTreeEnsemble:
+    """
+    Compile a fitted GradientBoostingRegressor, HistGradientBoostingRegressor
+    or RandomForestRegressor.
+    """
+    from sklearn.ensemble import (
+        GradientBoostingRegressor,
+        HistGradientBoostingRegressor,
+        RandomForestRegressor
+    )
+
+    if isinstance(estimator, GradientBoostingRegressor):
+        if estimator.estimators_.shape[1] != 1:
+            raise ValueError("Only single-output gradient boosting is supported")
+        n_features = estimator.n_features_in_
+        # Constant output of the init estimator, computed the same way sklearn does
+        init = estimator._raw_predict_init(
+            np.zeros((1, n_features), dtype=np.float32)
+        )[0, 0]
+        return CompiledTreeEnsemble(
+            kind="gradient_boosting",
+            n_features=n_features,
+            scale=estimator.learning_rate,
+            init=init,
+            **_flatten_trees(estimator.estimators_[:, 0])
+        )
+
+    if isinstance(estimator, HistGradientBoostingRegressor):
+        if estimator.n_trees_per_iteration_ != 1:
+            raise ValueError("Only single-output hist gradient boosting is supported")
+        if type(estimator._loss.link).__name__ != "IdentityLink":
+            raise ValueError(f"Loss {estimator.loss!r} is not supported")
+        if estimator.is_categorical_ is not None and estimator.is_categorical_.any():
+            raise ValueError("Categorical features are not supported")
+        return CompiledTreeEnsemble(
+            kind="gradient_boosting",
+            n_features=estimator.n_features_in_,
+            scale=1.0,
+            init=estimator._baseline_prediction[0, 0],
+            input_dtype="float64",
+            **_flatten_hist_predictors(p[0] for p in estimator._predictors)
+        )
+
+    if isinstance(estimator, RandomForestRegressor):
+        if estimator.n_outputs_ != 1:
+            raise ValueError("Only single-output random forests are supported")
+        return CompiledTreeEnsemble(
+            kind="random_forest",
+            n_features=estimator.n_features_in_,
+            **_flatten_trees(estimator.estimators_)
+        )
+
+    raise ValueError(f"Cannot compile estimator of type {type(estimator).__name__}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a pickled tree ensemble")
+    parser.add_argument("model_path", type=str, help="joblib-pickled sklearn estimator")
+    parser.add_argument("output_path", type=str, help="Output .npz artifact")
+
+    args = parser.parse_args()
+
+    import joblib
+
+    compiled = compile_ensemble(joblib.load(args.model_path))
+    compiled.save(args.output_path)
+
+    print(f"Compiled {compiled.n_trees} trees ({compiled.nbytes / 1024:.1f} KiB) "
+          f"to {args.output_path}")
+
+
+if __name__ == "__main__":
+    main()
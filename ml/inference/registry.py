@@ -0,0 +1,214 @@
+"""
+Local directory-based model registry for FestSafe AI.
+
+Layout::
+
+    <root>/
+        CURRENT              # name of the active version
+        1.0.0/
+            metadata.json    # model_type, artifact file name, extra metadata
+            model.npz
+            source.joblib    # optional extra files, e.g. the trainable model
+        1.1.0/
+            ...
+
+Versions are published by copying into a temporary directory and renaming
+it into place, and CURRENT is swapped with os.replace, so readers never see
+a half-written version.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+
+CURRENT_FILE = "CURRENT"
+METADATA_FILE = "metadata.json"
+
+
+@dataclass
+class ModelVersion:
+    """A published model version."""
+    version: str
+    model_type: str
+    path: str
+    metadata: Dict[str, Any]
+
+
+class ModelRegistry:
+    """Versioned model store on a local or shared filesystem."""
+
+    def __init__(self, root: Union[str, Path]):
+        """
+        Args:
+            root: Registry directory
+        """
+        self.root = Path(root)
+
+    def list_versions(self) -> List[str]:
+        """List published versions, oldest first."""
+        if not self.root.exists():
+            return []
+        versions = [
+            p for p in self.root.iterdir()
+            if p.is_dir() and not p.name.startswith(".") and (p / METADATA_FILE).exists()
+        ]
+        return [p.name for p in sorted(versions, key=lambda p: p.stat().st_mtime)]
+
+    def current_version(self) -> Optional[str]:
+        """Return the active version, if any."""
+        try:
+            return (self.root / CURRENT_FILE).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _version_dir(self, version: str) -> Path:
+        """
+        Directory of a version, rejecting names that would leave the registry.
+
+        Versions arrive from API requests, so "../x", absolute paths and
+        hidden names (staging directories) are refused before touching disk.
+        """
+        if not version or version.startswith(".") or "/" in version or "\\" in version:
+            raise ValueError(f"Invalid model version: {version!r}")
+
+        version_dir = self.root / version
+        if version_dir.resolve().parent != self.root.resolve():
+            raise ValueError(f"Invalid model version: {version!r}")
+        return version_dir
+
+    def get(self, version: Optional[str] = None) -> ModelVersion:
+        """Resolve a version (default: the active one)."""
+        version = version or self.current_version()
+        if version is None:
+            raise ValueError(f"No active model version in registry {self.root}")
+
+        version_dir = self._version_dir(version)
+        metadata_path = version_dir / METADATA_FILE
+        if not metadata_path.exists():
+            raise ValueError(f"Unknown model version: {version}")
+
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+
+        return ModelVersion(
+            version=version,
+            model_type=metadata["model_type"],
+            path=str(version_dir / metadata["artifact"]),
+            metadata=metadata
+        )
+
+    def publish(
+        self,
+        artifact_path: Union[str, Path],
+        version: str,
+        model_type: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        activate: bool = False,
+        extra_files: Optional[List[Union[str, Path]]] = None
+    ) -> ModelVersion:
+        """
+        Publish a model artifact as a new version.
+
+        Args:
+            artifact_path: Model file to copy into the registry
+            version: Version name, e.g. "1.1.0"
+            model_type: "tabular" or "nn"
+            metadata: Extra metadata (metrics, training cutoff, ...)
+            activate: Make this the active version
+            extra_files: More files to store next to the artifact; their
+                names are recorded as ``extra_files`` in the metadata
+
+        Returns:
+            The published version
+        """
+        artifact_path = Path(artifact_path)
+        extra_files = [Path(p) for p in extra_files or []]
+        version_dir = self._version_dir(version)
+        if version_dir.exists():
+            raise ValueError(f"Model version already exists: {version}")
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging_dir = self.root / f".staging-{version}-{uuid.uuid4().hex}"
+        staging_dir.mkdir()
+
+        try:
+            shutil.copy2(artifact_path, staging_dir / artifact_path.name)
+            for path in extra_files:
+                shutil.copy2(path, staging_dir / path.name)
+            with open(staging_dir / METADATA_FILE, "w") as f:
+                json.dump({
+                    **(metadata or {}),
+                    "version": version,
+                    "model_type": model_type,
+                    "artifact": artifact_path.name,
+                    "extra_files": [path.name for path in extra_files],
+                    "published_at": datetime.utcnow().isoformat()
+                }, f)
+            os.rename(staging_dir, version_dir)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+
+        return self.get(version)
+
+    def activate(self, version: str):
+        """Atomically point CURRENT at a published version."""
+        self.get(version)  # Validate the name and that it is published
+
+        tmp_path = self.root / f".{CURRENT_FILE}-{uuid.uuid4().hex}"
+        tmp_path.write_text(version)
+        os.replace(tmp_path, self.root / CURRENT_FILE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local model registry")
+    parser.add_argument("--root", type=str, default="models/registry", help="Registry directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    publish_parser = subparsers.add_parser("publish", help="Publish a model artifact")
+    publish_parser.add_argument("artifact", type=str, help="Model artifact path")
+    publish_parser.add_argument("--version", type=str, required=True)
+    publish_parser.add_argument("--model-type", choices=["tabular", "nn"], required=True)
+    publish_parser.add_argument("--feature-set", choices=["window", "engineered"], default="window",
+                                help="Input layout of tabular models")
+    publish_parser.add_argument("--activate", action="store_true", help="Make it the active version")
+
+    activate_parser = subparsers.add_parser("activate", help="Activate a published version")
+    activate_parser.add_argument("version", type=str)
+
+    subparsers.add_parser("list", help="List published versions")
+
+    args = parser.parse_args()
+    registry = ModelRegistry(args.root)
+
+    if args.command == "publish":
+        entry = registry.publish(
+            args.artifact,
+            args.version,
+            args.model_type,
+            metadata={"feature_set": args.feature_set},
+            activate=args.activate
+        )
+        print(f"Published {entry.version} ({entry.model_type}) to {entry.path}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"Activated {args.version}")
+    else:
+        current = registry.current_version()
+        for version in registry.list_versions():
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,13 @@
 Model inference service for FestSafe AI.
 """
 
-import os
+import inspect
+import logging
 import pickle
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
 import joblib
 import torch
 import numpy as np
@@ -13,17 +18,116 @@ import mlflow
 import mlflow.pytorch
 import mlflow.sklearn
 
+from compiled_trees import CompiledTreeEnsemble
+from registry import ModelRegistry
+from tabular_features import FEATURE_SETS, engineer_features, split_static_inputs
+
+logger = logging.getLogger(__name__)
+
+
+def configure_torch_threads(
+    num_threads: Optional[int] = None,
+    num_interop_threads: Optional[int] = None
+):
+    """
+    Configure PyTorch CPU thread pools.
+    
+    Inter-op threads can only be set before the first parallel op runs, so
+    this should be called once at process start-up.
+    
+    Args:
+        num_threads: Intra-op threads used inside a single operator
+        num_interop_threads: Inter-op threads used across independent operators
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError:
+            # Already initialised in this process; keep the existing pool
+            pass
+
+
+# Surge risk bands on predicted arrivals: [0, low) low, [low, high) medium, [high, inf) high
+RISK_THRESHOLD_LOW = 5.0
+RISK_THRESHOLD_HIGH = 15.0
+RISK_CATEGORIES = np.array(["low", "medium", "high"])
+
+
+def classify_risk(
+    predictions: np.ndarray,
+    threshold_low: float = RISK_THRESHOLD_LOW,
+    threshold_high: float = RISK_THRESHOLD_HIGH
+) -> np.ndarray:
+    """Map predicted arrivals to risk categories in one vectorised pass."""
+    return RISK_CATEGORIES[np.digitize(predictions, [threshold_low, threshold_high])]
+
+
+def takes_static_input(model: torch.nn.Module) -> bool:
+    """Whether a network's forward takes separate (time_series, static) inputs."""
+    if isinstance(model, torch.jit.ScriptModule):
+        # The schema includes self
+        return len(model.forward.schema.arguments) == 3
+    return len(inspect.signature(model.forward).parameters) == 2
+
+
+@dataclass
+class PredictionResult:
+    """Array-native model output."""
+    predictions: np.ndarray
+    model_type: str
+    confidence: Optional[np.ndarray] = None
+    version: Optional[str] = None
+    
+    def __len__(self) -> int:
+        return len(self.predictions)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the JSON-friendly dictionary returned by predict()."""
+        result = {
+            "predictions": self.predictions.tolist(),
+            "model_type": self.model_type
+        }
+        
+        if self.confidence is not None:
+            result["confidence"] = self.confidence.tolist()
+        
+        return result
+
 
 class ModelInferenceService:
     """Service for model inference."""
     
-    def __init__(self, model_path: Optional[str] = None, model_type: str = "tabular"):
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        model_type: str = "tabular",
+        version: Optional[str] = None,
+        mmap: bool = False,
+        feature_set: str = "window"
+    ):
         """
         Args:
-            model_path: Path to saved model or MLflow run ID
+            model_path: Path to saved model or MLflow run ID. For tabular
+                models a ``.npz`` path loads a compiled tree ensemble; for
+                nn models a ``.torchscript`` path loads a TorchScript artifact
+                and ``.int8.torchscript`` its dynamically quantized variant.
             model_type: "tabular" or "nn"
+            version: Model version recorded on forecasts
+            mmap: Memory-map model weights read-only so that worker processes
+                loading the same file share one copy through the page cache
+            feature_set: Input layout of tabular models: "window" (flattened
+                hourly window) or "engineered" (engineer_features)
         """
+        if feature_set not in FEATURE_SETS:
+            raise ValueError(f"Unknown feature set: {feature_set}")
+        
         self.model_type = model_type
+        self.version = version
+        self.mmap = mmap
+        self.feature_set = feature_set
+        self.split_static = False
         self.model = None
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         
@@ -41,72 +145,130 @@ class ModelInferenceService:
                 self.model = mlflow.pytorch.load_model(f"runs:/{run_id}/model")
         else:
             # Load from file
-            if self.model_type == "tabular":
-                self.model = joblib.load(model_path)
+            if self.model_type == "tabular" and model_path.endswith(".npz"):
+                self.model = CompiledTreeEnsemble.load(model_path, mmap=self.mmap)
+            elif self.model_type == "tabular":
+                # Only takes effect for uncompressed joblib dumps
+                self.model = joblib.load(model_path, mmap_mode="r" if self.mmap else None)
+            elif model_path.endswith(".torchscript"):
+                if model_path.endswith(".int8.torchscript"):
+                    # Quantized kernels only run on CPU
+                    self.device = torch.device("cpu")
+                self.model = torch.jit.load(model_path, map_location=self.device)
+                self.model.eval()
             else:
-                self.model = torch.load(model_path, map_location=self.device)
+                self.model = torch.load(
+                    model_path,
+                    map_location=self.device,
+                    weights_only=False,
+                    mmap=self.mmap
+                )
                 self.model.eval()
+        
+        if self.model_type != "tabular":
+            # HybridForecastModel takes the static hospital fields separately
+            self.split_static = takes_static_input(self.model)
     
-    def predict(
+    def warmup(
+        self,
+        sequence_length: int = 24,
+        feature_dim: int = 12,
+        batch_sizes: tuple = (1, 8)
+    ):
+        """Run dummy predictions so lazy initialisation happens before traffic."""
+        for batch_size in batch_sizes:
+            self.predict_array(
+                np.zeros((batch_size, sequence_length, feature_dim), dtype=np.float32)
+            )
+    
+    def predict_array(
         self,
         features: np.ndarray,
-        return_confidence: bool = True
-    ) -> Dict[str, Any]:
+        return_confidence: bool = True,
+        origin_times: Optional[np.ndarray] = None
+    ) -> PredictionResult:
         """
-        Make predictions.
+        Make predictions without leaving NumPy.
         
         Args:
             features: Input features (batch, sequence_length, feature_dim) for NN
                      or (batch, flattened_features) for tabular
             return_confidence: Whether to return confidence intervals
+            origin_times: Last observed hour of each window, used by
+                engineered tabular features (default: the current UTC hour)
         
         Returns:
-            Dictionary with predictions and optional confidence
+            Array-native prediction result
         """
         if self.model is None:
             raise ValueError("Model not loaded. Call load_model() first.")
         
         if self.model_type == "tabular":
-            # Flatten if needed
-            if len(features.shape) > 2:
+            if len(features.shape) > 2 and self.feature_set == "engineered":
+                if origin_times is None:
+                    origin_times = np.datetime64(datetime.utcnow(), "h")
+                features = engineer_features(features, origin_times)
+            elif len(features.shape) > 2:
+                # Flatten if needed
                 features = features.reshape(features.shape[0], -1)
             
-            predictions = self.model.predict(features)
+            predictions = np.asarray(self.model.predict(features), dtype=np.float64)
             
             # Simple confidence based on prediction variance
             if return_confidence:
                 # For ensemble or uncertainty estimation, use prediction intervals
                 # Here we use a simple heuristic
-                confidence = np.ones_like(predictions) * 0.8  # Placeholder
+                confidence = np.full_like(predictions, 0.8)  # Placeholder
             else:
                 confidence = None
         else:
-            # Neural network
-            with torch.no_grad():
-                features_tensor = torch.FloatTensor(features).to(self.device)
-                predictions = self.model(features_tensor).cpu().numpy().flatten()
+            # Neural network (from_numpy shares memory with the input array)
+            features = np.ascontiguousarray(features, dtype=np.float32)
+            with torch.inference_mode():
+                features_tensor = torch.from_numpy(features).to(self.device)
+                if self.split_static:
+                    outputs = self.model(*split_static_inputs(features_tensor))
+                else:
+                    outputs = self.model(features_tensor)
+                predictions = outputs.cpu().numpy().ravel()
             
             if return_confidence:
                 # Placeholder confidence
-                confidence = np.ones_like(predictions) * 0.75
+                confidence = np.full_like(predictions, 0.75)
             else:
                 confidence = None
         
-        result = {
-            "predictions": predictions.tolist(),
-            "model_type": self.model_type
-        }
+        return PredictionResult(
+            predictions=predictions,
+            model_type=self.model_type,
+            confidence=confidence,
+            version=self.version
+        )
+    
+    def predict(
+        self,
+        features: np.ndarray,
+        return_confidence: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Make predictions.
         
-        if confidence is not None:
-            result["confidence"] = confidence.tolist()
+        Args:
+            features: Input features (batch, sequence_length, feature_dim) for NN
+                     or (batch, flattened_features) for tabular
+            return_confidence: Whether to return confidence intervals
         
-        return result
+        Returns:
+            Dictionary with predictions and optional confidence
+        """
+        return self.predict_array(features, return_confidence).to_dict()
     
     def predict_surge_risk(
         self,
         features: np.ndarray,
-        threshold_low: float = 5.0,
-        threshold_high: float = 15.0
+        threshold_low: float = RISK_THRESHOLD_LOW,
+        threshold_high: float = RISK_THRESHOLD_HIGH,
+        as_arrays: bool = False
     ) -> Dict[str, Any]:
         """
         Predict surge risk category.
@@ -115,26 +277,24 @@ class ModelInferenceService:
             features: Input features
             threshold_low: Threshold for low risk
             threshold_high: Threshold for high risk
+            as_arrays: Return NumPy arrays instead of lists (for large batches)
         
         Returns:
             Risk category and details
         """
-        pred_result = self.predict(features, return_confidence=True)
-        predictions = np.array(pred_result["predictions"])
+        result = self.predict_array(features, return_confidence=True)
+        risk_categories = classify_risk(result.predictions, threshold_low, threshold_high)
         
-        risk_categories = []
-        for pred in predictions:
-            if pred < threshold_low:
-                risk_categories.append("low")
-            elif pred < threshold_high:
-                risk_categories.append("medium")
-            else:
-                risk_categories.append("high")
+        if as_arrays:
+            predictions, confidence = result.predictions, result.confidence
+        else:
+            risk_categories = risk_categories.tolist()
+            predictions, confidence = result.predictions.tolist(), result.confidence.tolist()
         
         return {
             "risk_categories": risk_categories,
-            "predictions": pred_result["predictions"],
-            "confidence": pred_result.get("confidence", []),
+            "predictions": predictions,
+            "confidence": confidence,
             "thresholds": {
                 "low": threshold_low,
                 "high": threshold_high
@@ -142,8 +302,67 @@ class ModelInferenceService:
         }
 
 
+@dataclass
+class ServingConfig:
+    """
+    How the singleton inference service finds and loads its model.
+    
+    The backend fills this from its settings (environment and ``.env``) with
+    configure_inference_service before the first model load.
+    """
+    model_path: str = "models/baseline_model.pkl"
+    model_type: str = "tabular"
+    model_version: str = "1.0.0"
+    feature_set: str = "window"
+    registry_dir: str = ""  # enables versioned loading and hot-swap
+    mmap: bool = False
+    torch_num_threads: int = 0  # 0 keeps the torch default
+    torch_interop_threads: int = 0
+
+
 # Singleton instance
+_serving_config = ServingConfig()
 _inference_service: Optional[ModelInferenceService] = None
+_service_lock = threading.Lock()
+_reload_lock = threading.Lock()
+# Version a reload is currently loading, so the watcher does not load it twice
+_loading_version: Optional[str] = None
+
+
+def configure_inference_service(config: ServingConfig):
+    """Set the serving config; it applies from the next model load."""
+    global _serving_config
+    _serving_config = config
+
+
+def get_model_registry() -> Optional[ModelRegistry]:
+    """Return the configured model registry, if any."""
+    registry_dir = _serving_config.registry_dir
+    return ModelRegistry(registry_dir) if registry_dir else None
+
+
+def _create_inference_service(version: Optional[str] = None) -> ModelInferenceService:
+    """Build an inference service from the registry or the configured model path."""
+    config = _serving_config
+    
+    registry = get_model_registry()
+    if registry is not None:
+        entry = registry.get(version)
+        return ModelInferenceService(
+            entry.path,
+            entry.model_type,
+            version=entry.version,
+            mmap=config.mmap,
+            feature_set=entry.metadata.get("feature_set", "window")
+        )
+    
+    return ModelInferenceService(
+        config.model_path,
+        config.model_type,
+        version=config.model_version,
+        mmap=config.mmap,
+        feature_set=config.feature_set
+    )
 
 
 def get_inference_service() -> ModelInferenceService:
@@ -151,10 +370,88 @@ def get_inference_service() -> ModelInferenceService:
     global _inference_service
     
     if _inference_service is None:
-        model_path = os.getenv("MODEL_PATH", "models/baseline_model.pkl")
-        model_type = os.getenv("MODEL_TYPE", "tabular")
-        _inference_service = ModelInferenceService(model_path, model_type)
+        with _service_lock:
+            if _inference_service is None:
+                configure_torch_threads(
+                    _serving_config.torch_num_threads,
+                    _serving_config.torch_interop_threads
+                )
+                _inference_service = _create_inference_service()
     
     return _inference_service
 
 
+def reload_inference_service(
+    version: Optional[str] = None,
+    activate: bool = False
+) -> ModelInferenceService:
+    """
+    Load and warm a model version, then swap it in.
+    
+    The current service keeps serving until the new one is fully warmed; the
+    swap is a single reference assignment, so in-flight requests finish on
+    the model they started with. If loading or warmup fails the current
+    service stays active and the error propagates.
+    
+    Args:
+        version: Registry version to load (default: the active one)
+        activate: Point the registry's CURRENT at ``version`` once it has
+            loaded and warmed, so a broken artifact is never activated
+    
+    Returns:
+        The newly active service
+    """
+    global _inference_service, _loading_version
+    
+    with _reload_lock:
+        _loading_version = version
+        try:
+            service = _create_inference_service(version)
+            service.warmup()
+            if activate:
+                get_model_registry().activate(service.version)
+            _inference_service = service
+        finally:
+            _loading_version = None
+    
+    logger.info("Swapped in model version %s", service.version)
+    return service
+
+
+def start_registry_watcher(interval_seconds: float) -> Optional[threading.Thread]:
+    """
+    Poll the registry's active version and hot-swap when it changes.
+    
+    Lets every replica follow a shared registry without restarts.
+    
+    Args:
+        interval_seconds: Polling interval
+    
+    Returns:
+        The watcher thread, or None if no registry is configured
+    """
+    registry = get_model_registry()
+    if registry is None or interval_seconds <= 0:
+        return None
+    
+    def watch():
+        failed_version = None
+        while True:
+            time.sleep(interval_seconds)
+            current = registry.current_version()
+            service = _inference_service
+            if current in (None, failed_version, _loading_version):
+                continue
+            # Already loaded, e.g. by the /models/reload that activated it
+            if service is not None and service.version == current:
+                continue
+            try:
+                reload_inference_service(current)
+            except Exception:
+                # Don't retry a broken version until CURRENT changes again
+                failed_version = current
+                logger.exception("Failed to load model version %s", current)
+    
+    thread = threading.Thread(target=watch, name="model-registry-watcher", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,119 @@
+"""
+Engineered tabular features for FestSafe AI.
+
+Tree models do not need the raw 24-hour window: flattening it repeats every
+static hospital field once per hour and spends most columns on hours that
+barely matter. ``engineer_features`` condenses each window into recent lags,
+rolling statistics, calendar fields and the static fields (once). Training
+(dataset.py) and serving (ModelInferenceService) both call it, so the two
+layouts cannot drift apart.
+
+``split_static_inputs`` separates the same windows into the time-series and
+static inputs of HybridForecastModel, again for both training and serving.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+# Window columns, in order (sequence_length rows per window)
+FEATURE_COLS = [
+    "new_arrivals", "current_patients", "avg_age",
+    "aqi", "temperature", "humidity",
+    "bed_count", "icu_count", "oxygen_capacity",
+    "doctors", "nurses", "event_attendance"
+]
+
+# Tabular model input layouts
+FEATURE_SETS = ["window", "engineered"]
+
+# Columns that change hour to hour (the hybrid model's time-series input)
+DYNAMIC_COLS = [
+    "new_arrivals", "current_patients", "avg_age",
+    "aqi", "temperature", "humidity", "event_attendance"
+]
+
+# Columns that are constant per hospital, kept once per sample
+STATIC_COLS = ["bed_count", "icu_count", "oxygen_capacity", "doctors", "nurses"]
+
+# Columns given individual lags, and the lags in hours (1 = last observed hour)
+LAG_COLS = ["new_arrivals", "current_patients"]
+LAGS = [1, 2, 3, 6, 12, 24]
+
+# Hours covered by the short rolling mean; the long one spans the window
+SHORT_WINDOW = 6
+
+
+DYNAMIC_INDEX = [FEATURE_COLS.index(col) for col in DYNAMIC_COLS]
+STATIC_INDEX = [FEATURE_COLS.index(col) for col in STATIC_COLS]
+
+
+def _lags(sequence_length: int) -> List[int]:
+    return [lag for lag in LAGS if lag <= sequence_length]
+
+
+def engineered_feature_names(sequence_length: int = 24) -> List[str]:
+    """Column names of ``engineer_features`` output, in order."""
+    names = [f"{col}_lag{lag}" for col in LAG_COLS for lag in _lags(sequence_length)]
+    names += [f"{col}_last" for col in DYNAMIC_COLS if col not in LAG_COLS]
+    names += [f"{col}_mean{SHORT_WINDOW}h" for col in DYNAMIC_COLS]
+    names += [f"{col}_mean{sequence_length}h" for col in DYNAMIC_COLS]
+    names += [f"{col}_max{sequence_length}h" for col in DYNAMIC_COLS]
+    names += STATIC_COLS
+    names += ["hour_of_day", "day_of_week"]
+    return names
+
+
+def engineer_features(windows: np.ndarray, origin_times: np.ndarray) -> np.ndarray:
+    """
+    Condense hourly windows into engineered tabular features.
+
+    Args:
+        windows: (n, sequence_length, len(FEATURE_COLS)) hourly rows, oldest
+            first, in FEATURE_COLS order
+        origin_times: Timestamp of each window's last observed hour (naive UTC
+            datetime64 or anything np.asarray converts to one)
+
+    Returns:
+        float32 array of shape (n, len(engineered_feature_names(sequence_length)))
+    """
+    n, sequence_length, _ = windows.shape
+    lag_cols = [FEATURE_COLS.index(col) for col in LAG_COLS]
+    last_cols = [FEATURE_COLS.index(col) for col in DYNAMIC_COLS if col not in LAG_COLS]
+    lags = _lags(sequence_length)
+
+    dynamic, static = split_static_inputs(windows)
+    short_window = min(SHORT_WINDOW, sequence_length)
+    parts = [
+        # (n, lag, col) -> col-major so names group by column
+        windows[:, [sequence_length - lag for lag in lags]][:, :, lag_cols]
+        .transpose(0, 2, 1).reshape(n, -1),
+        windows[:, -1, last_cols],
+        dynamic[:, -short_window:].mean(axis=1),
+        dynamic.mean(axis=1),
+        dynamic.max(axis=1),
+        static
+    ]
+
+    hours = np.atleast_1d(np.asarray(origin_times, dtype="datetime64[h]")).astype(np.int64)
+    # 1970-01-01 was a Thursday; Monday is 0
+    calendar = np.stack([hours % 24, (hours // 24 + 3) % 7], axis=1)
+    parts.append(np.broadcast_to(calendar, (n, 2)))
+
+    return np.concatenate(parts, axis=1, dtype=np.float32)
+
+
+def split_static_inputs(windows):
+    """
+    Split windows into time-series and static model inputs.
+
+    Args:
+        windows: (n, sequence_length, len(FEATURE_COLS)) array or tensor
+
+    Returns:
+        (n, sequence_length, len(DYNAMIC_COLS)) time series and
+        (n, len(STATIC_COLS)) static fields from the last row, same type as
+        the input
+    """
+    return windows[:, :, DYNAMIC_INDEX], windows[:, -1, STATIC_INDEX]
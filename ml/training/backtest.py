@@ -0,0 +1,316 @@
+"""
+Walk-forward backtesting for FestSafe AI models.
+
+Splits the timeline into consecutive test periods at the end of the data.
+For each fold, a model is trained only on windows whose target is observed
+before the test period, then evaluated on the windows whose target falls
+inside it. Every hospital is split at the same cutoffs, and errors are
+reported per fold and per hospital.
+
+Folds run in a process pool. Workers memory-map one saved copy of the
+dataset (the dataset cache entry, or a temporary entry in /dev/shm), so all
+folds share a single feature matrix instead of rebuilding or pickling it.
+
+Usage:
+    python backtest.py --config configs/baseline.yaml --data-dir data/synthetic \\
+        --folds 4 --test-days 7 --workers 4
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+import yaml
+
+from dataset import (
+    DYNAMIC_COLS,
+    STATIC_COLS,
+    HospitalForecastDataset,
+    create_dataloader,
+    load_dataset,
+    shared_dataset_path
+)
+from models.tabular_model import TabularForecastModel
+from models.nn_model import create_forecast_model, forward_batch, train_epoch
+
+
+# Dataset opened once per worker process by _init_worker
+_worker_dataset: Optional[HospitalForecastDataset] = None
+
+
+def make_folds(
+    target_times: np.ndarray,
+    n_folds: int,
+    test_hours: int,
+    train_hours: Optional[int] = None,
+    gap_hours: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Define walk-forward folds over sample target times.
+
+    The last ``n_folds * test_hours`` hours are cut into consecutive test
+    periods. Each fold trains on targets before its test period (minus
+    ``gap_hours``), either from the start of the data (expanding window) or
+    over the preceding ``train_hours`` (rolling window).
+
+    Args:
+        target_times: Target timestamp of every sample
+        n_folds: Number of folds
+        test_hours: Length of each test period
+        train_hours: Training window length (default: expanding)
+        gap_hours: Hours left out between training and test periods
+
+    Returns:
+        One dict per fold with datetime64 train_start/train_end/test_start/test_end
+        bounds (start inclusive, end exclusive)
+    """
+    hour = np.timedelta64(1, "h")
+    end = target_times.max() + hour
+
+    folds = []
+    for k in range(n_folds):
+        test_start = end - (n_folds - k) * test_hours * hour
+        train_end = test_start - gap_hours * hour
+        train_start = (
+            train_end - train_hours * hour if train_hours else target_times.min()
+        )
+        folds.append({
+            "fold": k,
+            "train_start": train_start,
+            "train_end": train_end,
+            "test_start": test_start,
+            "test_end": test_start + test_hours * hour
+        })
+    return folds
+
+
+def _init_worker(dataset_path: str, num_threads: int):
+    """Memory-map the shared dataset and cap torch threads in a worker."""
+    global _worker_dataset
+    torch.set_num_threads(num_threads)
+    _worker_dataset = HospitalForecastDataset.load(dataset_path)
+
+
+def _fit_predict_tabular(
+    dataset: HospitalForecastDataset,
+    train_idx: np.ndarray,
+    test_idx: np.ndarray,
+    config: dict
+) -> np.ndarray:
+    """Train a tabular model on one fold and predict its test windows."""
+    model = TabularForecastModel(
+        model_type=config.get("model_type", "gradient_boosting"),
+        **config.get("hyperparameters", {})
+    )
+    feature_set = config.get("feature_set", "window")
+    X_train, y_train = dataset.get_tabular_arrays(train_idx, feature_set)
+    model.train(X_train, y_train)
+    del X_train
+
+    X_test, _ = dataset.get_tabular_arrays(test_idx, feature_set)
+    return model.predict(X_test)
+
+
+def _fit_predict_nn(
+    dataset: HospitalForecastDataset,
+    train_idx: np.ndarray,
+    test_idx: np.ndarray,
+    config: dict
+) -> np.ndarray:
+    """Train a network on one fold and predict its test windows."""
+    device = torch.device("cpu")
+    batch_size = config.get("batch_size", 32)
+    split_static = config.get("architecture", "lstm") == "hybrid"
+    model = create_forecast_model(config, len(DYNAMIC_COLS), len(STATIC_COLS))
+    criterion = nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=config.get("learning_rate", 0.001))
+
+    train_loader = create_dataloader(
+        dataset, train_idx, batch_size=batch_size, shuffle=True, split_static=split_static
+    )
+    for _ in range(config.get("num_epochs", 50)):
+        train_epoch(model, train_loader, criterion, optimizer, device)
+
+    model.eval()
+    predictions = []
+    with torch.inference_mode():
+        for batch in np.array_split(test_idx, max(1, len(test_idx) // 1024)):
+            X_test, _ = dataset.get_batch(batch, split_static)
+            predictions.append(forward_batch(model, X_test, device).numpy().ravel())
+    return np.concatenate(predictions) if predictions else np.empty(0)
+
+
+def run_fold(fold: Dict[str, Any], model_type: str, config: dict) -> Dict[str, Any]:
+    """
+    Train and evaluate one fold in a worker.
+
+    Returns:
+        Fold metrics plus per-hospital absolute/squared error sums and counts
+        (indexed like ``dataset.hospital_ids``) for aggregation
+    """
+    dataset = _worker_dataset
+    target_times = dataset.get_target_timestamps()
+    train_idx = np.flatnonzero(
+        (target_times >= fold["train_start"]) & (target_times < fold["train_end"])
+    )
+    test_idx = np.flatnonzero(
+        (target_times >= fold["test_start"]) & (target_times < fold["test_end"])
+    )
+    if len(train_idx) == 0 or len(test_idx) == 0:
+        raise ValueError(
+            f"Fold {fold['fold']} has {len(train_idx)} training and "
+            f"{len(test_idx)} test windows"
+        )
+
+    if model_type == "tabular":
+        predictions = _fit_predict_tabular(dataset, train_idx, test_idx, config)
+    else:
+        predictions = _fit_predict_nn(dataset, train_idx, test_idx, config)
+
+    _, y_test = dataset.get_arrays(test_idx)
+    errors = predictions - y_test
+    hospitals = dataset.window_hospitals[test_idx]
+    n_hospitals = len(dataset.hospital_ids)
+
+    return {
+        **fold,
+        "n_train": len(train_idx),
+        "n_test": len(test_idx),
+        "mae": float(np.mean(np.abs(errors))),
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "abs_error": np.bincount(hospitals, weights=np.abs(errors), minlength=n_hospitals),
+        "sq_error": np.bincount(hospitals, weights=errors ** 2, minlength=n_hospitals),
+        "count": np.bincount(hospitals, minlength=n_hospitals)
+    }
+
+
+def run_backtest(
+    dataset: HospitalForecastDataset,
+    folds: List[Dict[str, Any]],
+    model_type: str,
+    config: dict,
+    workers: int = 1
+) -> Dict[str, pd.DataFrame]:
+    """
+    Run every fold in a process pool over a memory-mapped copy of the dataset.
+
+    Args:
+        dataset: Dataset to backtest; saved to shared memory unless it was
+            loaded from the dataset cache
+        folds: Folds from make_folds
+        model_type: "tabular" or "nn"
+        config: Model config section (``tabular`` or ``neural_network``)
+        workers: Worker processes
+
+    Returns:
+        "folds": one row per fold; "hospitals": one row per hospital with
+        MAE/RMSE over all its test windows
+    """
+    workers = max(1, min(workers, len(folds)))
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    with shared_dataset_path(dataset) as dataset_path:
+        results = []
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(str(dataset_path), num_threads)
+        ) as executor:
+            futures = [executor.submit(run_fold, fold, model_type, config) for fold in folds]
+            for future in as_completed(futures):
+                result = future.result()
+                print(f"Fold {result['fold']}: MAE {result['mae']:.2f}, "
+                      f"RMSE {result['rmse']:.2f} ({result['n_test']} test windows)")
+                results.append(result)
+
+    results.sort(key=lambda r: r["fold"])
+    fold_df = pd.DataFrame([
+        {k: v for k, v in r.items() if k not in ("abs_error", "sq_error", "count")}
+        for r in results
+    ])
+
+    abs_error = np.sum([r["abs_error"] for r in results], axis=0)
+    sq_error = np.sum([r["sq_error"] for r in results], axis=0)
+    count = np.sum([r["count"] for r in results], axis=0)
+    tested = count > 0
+    hospital_df = pd.DataFrame({
+        "hospital_id": dataset.hospital_ids[tested],
+        "n_test": count[tested],
+        "mae": abs_error[tested] / count[tested],
+        "rmse": np.sqrt(sq_error[tested] / count[tested])
+    })
+
+    return {"folds": fold_df, "hospitals": hospital_df}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of FestSafe AI models")
+    parser.add_argument("--config", type=str, required=True, help="Path to config YAML")
+    parser.add_argument("--data-dir", type=str, default="data/synthetic", help="Data directory")
+    parser.add_argument("--model-type", choices=["tabular", "nn"], default="tabular")
+    parser.add_argument("--folds", type=int, default=4, help="Number of folds")
+    parser.add_argument("--test-days", type=float, default=7, help="Test period per fold")
+    parser.add_argument("--train-days", type=float, default=None,
+                        help="Rolling training window (default: expanding)")
+    parser.add_argument("--gap-hours", type=int, default=0,
+                        help="Hours left out between training and test periods")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--output-dir", type=str, default=None,
+                        help="Write folds.csv and hospitals.csv here")
+
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+
+    print("Loading dataset...")
+    dataset = load_dataset(
+        args.data_dir,
+        config.get("sequence_length", 24),
+        config.get("forecast_horizon", 24),
+        cache_dir=config.get("dataset_cache_dir")
+    )
+
+    folds = make_folds(
+        dataset.get_target_timestamps(),
+        n_folds=args.folds,
+        test_hours=int(args.test_days * 24),
+        train_hours=int(args.train_days * 24) if args.train_days else None,
+        gap_hours=args.gap_hours
+    )
+
+    model_config = config.get("tabular" if args.model_type == "tabular" else "neural_network", {})
+    print(f"Backtesting {args.model_type} model: {len(folds)} folds, "
+          f"{len(dataset)} windows, {args.workers} workers")
+    results = run_backtest(dataset, folds, args.model_type, model_config, args.workers)
+
+    fold_df, hospital_df = results["folds"], results["hospitals"]
+    print("\nPer fold:")
+    print(fold_df[["fold", "test_start", "test_end", "n_train", "n_test", "mae", "rmse"]]
+          .to_string(index=False, float_format="%.2f"))
+    print("\nPer hospital:")
+    print(hospital_df.to_string(index=False, float_format="%.2f"))
+
+    total = hospital_df["n_test"].sum()
+    overall_mae = (hospital_df["mae"] * hospital_df["n_test"]).sum() / total
+    overall_rmse = np.sqrt((hospital_df["rmse"] ** 2 * hospital_df["n_test"]).sum() / total)
+    print(f"\nOverall MAE: {overall_mae:.2f}, RMSE: {overall_rmse:.2f}")
+
+    if args.output_dir:
+        output_dir = Path(args.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        fold_df.to_csv(output_dir / "folds.csv", index=False)
+        hospital_df.to_csv(output_dir / "hospitals.csv", index=False)
+        print(f"Wrote results to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
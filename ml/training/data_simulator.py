@@ -1,17 +1,221 @@
 """
 Data Simulator for FestSafe AI
 Generates synthetic hospital, event, and observation data for development and testing.
+
+With --stream, observations are generated and written in fixed-size chunks
+(NDJSON, CSV or Parquet), so memory does not grow with --days or --hospitals.
+With --workers N, hospitals are split into fixed-size shards that are
+simulated in a process pool, one observations file per shard plus a
+manifest.json; the output does not depend on N.
 """
 
 import argparse
 import json
+import multiprocessing as mp
 import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 import uuid
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Columns stored as timestamps rather than ISO strings in Parquet output
+TIMESTAMP_COLS = ["timestamp", "start_ts", "end_ts", "created_at"]
+
+# ICD-10 complaint codes (simplified)
+COMPLAINT_CODES = [
+    "R50.9",   # Fever
+    "R06.02",  # Shortness of breath
+    "R51",     # Headache
+    "R10.9",   # Abdominal pain
+    "I10",     # Hypertension
+    "E11.9",   # Type 2 diabetes
+    "J44.9",   # COPD
+    "I50.9",   # Heart failure
+]
+
+# Complaint codes listed per observation, at most
+MAX_COMPLAINTS = 5
+
+# Events further than this (in degrees, ~10km) do not affect a hospital
+EVENT_RADIUS_DEG = 0.1
+
+# Streamed output formats and the file extension of each
+STREAM_FORMATS = {"ndjson": "ndjson", "csv": "csv", "parquet": "parquet"}
+
+# Observation rows per streamed chunk
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Hospitals per shard of a sharded simulation
+DEFAULT_SHARD_HOSPITALS = 100
+
+# Events shared by every shard in a worker process, set by _init_shard_worker
+_shard_events: List[Dict[str, Any]] = []
+
+
+def _uuid4(rng: random.Random = random) -> str:
+    """A version-4 UUID drawn from ``rng``, so it is reproducible under a seed."""
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _uuid4_strings(rng: np.random.Generator, n: int) -> np.ndarray:
+    """``n`` version-4 UUID strings drawn from ``rng`` as an object array."""
+    raw = rng.integers(0, 256, (n, 16), dtype=np.uint8)
+    raw[:, 6] = raw[:, 6] & 0x0F | 0x40  # version 4
+    raw[:, 8] = raw[:, 8] & 0x3F | 0x80  # RFC 4122 variant
+    
+    # Two hex characters per byte, written around the dashes
+    hex_pairs = np.frombuffer(bytes(range(256)).hex().encode(), dtype=np.uint8).reshape(256, 2)
+    chars = np.full((n, 36), ord("-"), dtype=np.uint8)
+    digit_positions = [i for i in range(36) if i not in (8, 13, 18, 23)]
+    chars[:, digit_positions] = hex_pairs[raw].reshape(n, 32)
+    strings = pa.array(chars.view("S36").ravel(), type=pa.binary(36)).cast(pa.string())
+    return strings.to_numpy(zero_copy_only=False)
+
+
+def time_grid(start_date: datetime, days: int, interval_hours: int = 1) -> List[datetime]:
+    """Observation times from ``start_date`` (inclusive) over ``days`` days."""
+    end_date = start_date + timedelta(days=days)
+    times = []
+    current_date = start_date
+    while current_date < end_date:
+        times.append(current_date)
+        current_date += timedelta(hours=interval_hours)
+    return times
+
+
+def event_exposure(hospitals: List[Dict], events: List[Dict]) -> np.ndarray:
+    """
+    Hospital x event increments of the arrival multiplier.
+    
+    While an event runs, it adds ``expected_attendance / 100000`` to the
+    arrival multiplier of every hospital within EVENT_RADIUS_DEG of it.
+    """
+    hospital_loc = np.array(
+        [[h["location"]["lat"], h["location"]["lon"]] for h in hospitals], dtype=np.float64
+    ).reshape(-1, 2)
+    event_loc = np.array(
+        [[e["location"]["lat"], e["location"]["lon"]] for e in events], dtype=np.float64
+    ).reshape(-1, 2)
+    distance = np.hypot(
+        hospital_loc[:, None, 0] - event_loc[None, :, 0],
+        hospital_loc[:, None, 1] - event_loc[None, :, 1]
+    )
+    attendance = np.array([e["expected_attendance"] for e in events], dtype=np.float64)
+    return np.where(distance < EVENT_RADIUS_DEG, attendance / 100000, 0.0)
+
+
+def simulate_observations(
+    hospitals: List[Dict],
+    events: List[Dict],
+    times: List[datetime],
+    rng: np.random.Generator,
+    exposure: Optional[np.ndarray] = None
+) -> pd.DataFrame:
+    """
+    Simulate every hospital at every time with array operations.
+    
+    Draws the same distributions as DataSimulator.generate_observations, but
+    all at once from ``rng``: the event multiplier of each (time, hospital)
+    is one matrix product of the active-event mask with the exposure matrix,
+    and complaint lists are shared objects looked up per distinct list.
+    
+    Args:
+        hospitals: Hospitals from generate_hospitals
+        events: Events from generate_events
+        times: Observation times
+        rng: Random generator; equal generator states give equal frames
+        exposure: event_exposure(hospitals, events), if already computed
+    
+    Returns:
+        Flattened observations ordered by time, then hospital, in the
+        layout of DataSimulator._observations_frame
+    """
+    if exposure is None:
+        exposure = event_exposure(hospitals, events)
+    n_times, n_hospitals = len(times), len(hospitals)
+    n = n_times * n_hospitals
+    
+    time_values = np.array(times, dtype="datetime64[us]").reshape(-1)
+    starts = np.array(
+        [datetime.fromisoformat(e["start_ts"]) for e in events], dtype="datetime64[us]"
+    ).reshape(-1)
+    ends = np.array(
+        [datetime.fromisoformat(e["end_ts"]) for e in events], dtype="datetime64[us]"
+    ).reshape(-1)
+    active = (starts[None, :] <= time_values[:, None]) & (time_values[:, None] <= ends[None, :])
+    event_multiplier = (1.0 + active.astype(np.float64) @ exposure.T).ravel()
+    
+    # Environmental factors and their impact on arrivals
+    arrivals = rng.poisson(2, n).astype(np.float64)
+    aqi = rng.uniform(20, 150, n)
+    temperature = rng.uniform(15, 35, n)
+    humidity = rng.uniform(30, 90, n)
+    arrivals[aqi > 100] *= 1.2
+    arrivals[temperature > 30] *= 1.1
+    arrivals = np.maximum(0, (arrivals * event_multiplier).astype(np.int64))
+    
+    bed_count = np.array([h["bed_count"] for h in hospitals], dtype=np.float64)
+    current_patients = (
+        bed_count[None, :] * rng.uniform(0.4, 0.9, (n_times, n_hospitals))
+    ).astype(np.int64).ravel()
+    avg_age = rng.uniform(35, 75, n)
+    
+    # Up to MAX_COMPLAINTS distinct codes per row, one per arrival; each row's
+    # list is keyed in base len(COMPLAINT_CODES) + 1 (the top digit = unused)
+    n_codes = len(COMPLAINT_CODES)
+    order = rng.permuted(
+        np.broadcast_to(np.arange(n_codes, dtype=np.int8), (n, n_codes)), axis=1
+    )[:, :MAX_COMPLAINTS]
+    used = np.arange(MAX_COMPLAINTS) < np.minimum(arrivals, MAX_COMPLAINTS)[:, None]
+    digits = np.where(used, order, n_codes).astype(np.int64)
+    keys = digits @ (n_codes + 1) ** np.arange(MAX_COMPLAINTS - 1, -1, -1)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    complaint_lists = np.empty(len(first), dtype=object)
+    for i, row in enumerate(digits[first]):
+        complaint_lists[i] = [COMPLAINT_CODES[d] for d in row if d < n_codes]
+    
+    return pd.DataFrame({
+        "id": _uuid4_strings(rng, n),
+        "timestamp": np.repeat(np.array([t.isoformat() for t in times], dtype=object), n_hospitals),
+        "hospital_id": np.tile(np.array([h["id"] for h in hospitals], dtype=object), n_times),
+        "current_patients": current_patients,
+        "new_arrivals": arrivals,
+        "avg_age": avg_age.round(1),
+        "primary_complaint_codes": complaint_lists[inverse.ravel()],
+        "created_at": datetime.now().isoformat(),
+        "aqi": aqi.round(1),
+        "temperature": temperature.round(1),
+        "humidity": humidity.round(1)
+    })
+
+
+def observation_chunks(
+    hospitals: List[Dict],
+    events: List[Dict],
+    times: List[datetime],
+    rng: np.random.Generator,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """simulate_observations in frames of at most ``chunk_rows`` rows."""
+    exposure = event_exposure(hospitals, events)
+    hospital_step = max(1, min(len(hospitals), chunk_rows))
+    time_step = max(1, chunk_rows // hospital_step)
+    
+    for t in range(0, len(times), time_step):
+        for h in range(0, len(hospitals), hospital_step):
+            yield simulate_observations(
+                hospitals[h:h + hospital_step],
+                events,
+                times[t:t + time_step],
+                rng,
+                exposure[h:h + hospital_step]
+            )
 
 
 class DataSimulator:
@@ -20,9 +224,11 @@ class DataSimulator:
     def __init__(self, seed: int = 42):
         random.seed(seed)
         np.random.seed(seed)
+        self.rng = np.random.default_rng(seed)
         self.hospitals: List[Dict[str, Any]] = []
         self.events: List[Dict[str, Any]] = []
         self.observations: List[Dict[str, Any]] = []
+        self.observations_df: Optional[pd.DataFrame] = None
         
     def generate_hospitals(self, count: int, city_bounds: Dict[str, float] = None) -> List[Dict]:
         """Generate synthetic hospital data."""
@@ -35,7 +241,7 @@ class DataSimulator:
         hospitals = []
         for i in range(count):
             hospital = {
-                "id": str(uuid.uuid4()),
+                "id": _uuid4(),
                 "name": f"{random.choice(names)} {random.choice(hospital_types)} Hospital",
                 "location": {
                     "lat": random.uniform(city_bounds["lat_min"], city_bounds["lat_max"]),
@@ -74,7 +280,7 @@ class DataSimulator:
             event_end = event_start + timedelta(days=event_duration)
             
             event = {
-                "id": str(uuid.uuid4()),
+                "id": _uuid4(),
                 "name": random.choice(event_names),
                 "event_type": random.choice(event_types),
                 "location": {
@@ -103,17 +309,7 @@ class DataSimulator:
         current_date = start_date
         end_date = start_date + timedelta(days=days)
         
-        # ICD-10 complaint codes (simplified)
-        complaint_codes = [
-            "R50.9",  # Fever
-            "R06.02",  # Shortness of breath
-            "R51",     # Headache
-            "R10.9",   # Abdominal pain
-            "I10",     # Hypertension
-            "E11.9",   # Type 2 diabetes
-            "J44.9",   # COPD
-            "I50.9",   # Heart failure
-        ]
+        complaint_codes = COMPLAINT_CODES
         
         while current_date < end_date:
             for hospital in hospitals:
@@ -131,7 +327,7 @@ class DataSimulator:
                             (hospital["location"]["lat"] - event["location"]["lat"])**2 +
                             (hospital["location"]["lon"] - event["location"]["lon"])**2
                         )
-                        if distance < 0.1:  # Within ~10km
+                        if distance < EVENT_RADIUS_DEG:
                             event_multiplier += event["expected_attendance"] / 100000
                 
                 # Environmental factors
@@ -183,6 +379,82 @@ class DataSimulator:
         self.observations = observations
         return observations
     
+    def generate_observation_frame(
+        self,
+        hospitals: List[Dict],
+        start_date: datetime,
+        days: int,
+        interval_hours: int = 1
+    ) -> pd.DataFrame:
+        """
+        Vectorised generate_observations, returning the flattened frame.
+        
+        Deterministic under the simulator seed (see simulate_observations);
+        the save_to_* methods write this frame when it is set.
+        """
+        self.observations_df = simulate_observations(
+            hospitals, self.events, time_grid(start_date, days, interval_hours), self.rng
+        )
+        return self.observations_df
+    
+    def iter_observation_chunks(
+        self,
+        hospitals: List[Dict],
+        start_date: datetime,
+        days: int,
+        interval_hours: int = 1,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Generate flattened observations in frames of at most ``chunk_rows`` rows.
+        
+        Chunks cover consecutive blocks of hours (or slices of the hospitals
+        within one hour, if there are more hospitals than ``chunk_rows``), so
+        together they are ordered like generate_observation_frame. The draws,
+        and so the values, depend on the chunk size.
+        """
+        return observation_chunks(
+            hospitals,
+            self.events,
+            time_grid(start_date, days, interval_hours),
+            self.rng,
+            chunk_rows
+        )
+    
+    def stream_to_files(
+        self,
+        output_dir: Path,
+        fmt: str,
+        hospitals: List[Dict],
+        start_date: datetime,
+        days: int,
+        interval_hours: int = 1,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> int:
+        """
+        Generate observations chunk by chunk and write them as they arrive.
+        
+        Hospitals, events and observations go to ``<name>.<fmt>`` files (see
+        write_observation_chunks); only one chunk of observations is in
+        memory at a time. self.observations is left empty.
+        
+        Returns:
+            Observation rows written
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        _write_frame(self._hospitals_frame(), output_dir / f"hospitals.{STREAM_FORMATS[fmt]}", fmt)
+        _write_frame(self._events_frame(), output_dir / f"events.{STREAM_FORMATS[fmt]}", fmt)
+        
+        rows = write_observation_chunks(
+            self.iter_observation_chunks(hospitals, start_date, days, interval_hours, chunk_rows),
+            output_dir / f"observations.{STREAM_FORMATS[fmt]}",
+            fmt
+        )
+        print(f"Streamed {len(self.hospitals)} hospitals, {len(self.events)} events, "
+              f"and {rows} observations to {output_dir}")
+        return rows
+    
     def save_to_json(self, output_dir: Path):
         """Save generated data to JSON files."""
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -193,22 +465,23 @@ class DataSimulator:
         with open(output_dir / "events.json", "w") as f:
             json.dump(self.events, f, indent=2)
         
+        observations = self.observations
+        if self.observations_df is not None:
+            observations = _observation_records(self.observations_df)
+        
         # Save observations in chunks (can be large)
         chunk_size = 10000
-        for i in range(0, len(self.observations), chunk_size):
-            chunk = self.observations[i:i + chunk_size]
+        for i in range(0, len(observations), chunk_size):
+            chunk = observations[i:i + chunk_size]
             filename = output_dir / f"observations_chunk_{i // chunk_size}.json"
             with open(filename, "w") as f:
                 json.dump(chunk, f, indent=2)
         
         print(f"Saved {len(self.hospitals)} hospitals, {len(self.events)} events, "
-              f"and {len(self.observations)} observations to {output_dir}")
+              f"and {len(observations)} observations to {output_dir}")
     
-    def save_to_csv(self, output_dir: Path):
-        """Save generated data to CSV files."""
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Flatten hospital data
+    def _hospitals_frame(self) -> pd.DataFrame:
+        """Flatten hospital data into one row per hospital."""
         hospitals_df = pd.DataFrame([
             {
                 **h,
@@ -219,10 +492,10 @@ class DataSimulator:
             }
             for h in self.hospitals
         ])
-        hospitals_df = hospitals_df.drop(columns=["location", "staff_count", "contact_info"])
-        hospitals_df.to_csv(output_dir / "hospitals.csv", index=False)
-        
-        # Flatten event data
+        return hospitals_df.drop(columns=["location", "staff_count", "contact_info"])
+    
+    def _events_frame(self) -> pd.DataFrame:
+        """Flatten event data into one row per event."""
         events_df = pd.DataFrame([
             {
                 **e,
@@ -231,10 +504,13 @@ class DataSimulator:
             }
             for e in self.events
         ])
-        events_df = events_df.drop(columns=["location"])
-        events_df.to_csv(output_dir / "events.csv", index=False)
+        return events_df.drop(columns=["location"])
+    
+    def _observations_frame(self) -> pd.DataFrame:
+        """Flatten observations into one row per hospital-hour."""
+        if self.observations_df is not None:
+            return self.observations_df.copy()
         
-        # Flatten observations
         observations_data = []
         for obs in self.observations:
             env = obs["environmental_context"]
@@ -242,14 +518,279 @@ class DataSimulator:
                 **obs,
                 "aqi": env["aqi"],
                 "temperature": env["temperature"],
-                "humidity": env["humidity"],
-                "primary_complaint_codes": ",".join(obs["primary_complaint_codes"])
+                "humidity": env["humidity"]
             })
         observations_df = pd.DataFrame(observations_data)
-        observations_df = observations_df.drop(columns=["environmental_context"])
+        return observations_df.drop(columns=["environmental_context"])
+    
+    def save_to_csv(self, output_dir: Path):
+        """Save generated data to CSV files."""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        self._hospitals_frame().to_csv(output_dir / "hospitals.csv", index=False)
+        self._events_frame().to_csv(output_dir / "events.csv", index=False)
+        
+        observations_df = self._observations_frame()
+        observations_df["primary_complaint_codes"] = (
+            observations_df["primary_complaint_codes"].str.join(",")
+        )
         observations_df.to_csv(output_dir / "observations.csv", index=False)
         
         print(f"Saved CSV files to {output_dir}")
+    
+    def save_to_parquet(self, output_dir: Path):
+        """Save generated data to typed, dictionary-encoded Parquet files."""
+        write_parquet(
+            output_dir,
+            self._hospitals_frame(),
+            self._events_frame(),
+            self._observations_frame()
+        )
+        
+        print(f"Saved Parquet files to {output_dir}")
+
+
+def _observation_records(observations_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Nest a flattened observations frame back into generate_observations records."""
+    env_cols = ["aqi", "temperature", "humidity"]
+    records = observations_df.drop(columns=env_cols).to_dict("records")
+    for record, env in zip(records, observations_df[env_cols].to_dict("records")):
+        record["environmental_context"] = env
+    return records
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convert a flattened frame to Arrow with typed timestamps and dictionary IDs."""
+    df = df.copy()
+    for col in TIMESTAMP_COLS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    if "hospital_id" in df.columns:
+        df["hospital_id"] = df["hospital_id"].astype("category")
+    
+    codes = None
+    if "primary_complaint_codes" in df.columns:
+        codes = df.pop("primary_complaint_codes")
+    
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    
+    if codes is not None:
+        # list<dictionary<string>>: each distinct ICD-10 code is stored once
+        lengths = codes.map(len).to_numpy()
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int32)
+        flat = pa.array([code for row in codes for code in row], type=pa.string())
+        table = table.append_column(
+            "primary_complaint_codes",
+            pa.ListArray.from_arrays(pa.array(offsets), flat.dictionary_encode())
+        )
+    return table
+
+
+def _write_frame(df: pd.DataFrame, path: Path, fmt: str):
+    """Write a small flattened frame (hospitals, events) in a streamed format."""
+    if fmt == "ndjson":
+        df.to_json(path, orient="records", lines=True)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        pq.write_table(_to_arrow(df), path)
+
+
+def write_observation_chunks(chunks: Iterable[pd.DataFrame], path: Path, fmt: str) -> int:
+    """
+    Append flattened observation chunks to one file as they arrive.
+    
+    ``ndjson`` writes one flat JSON object per line, ``csv`` joins complaint
+    codes with commas (as save_to_csv does) and ``parquet`` writes each chunk
+    as a row group with the typed schema of write_parquet.
+    
+    Args:
+        chunks: Flattened observation frames
+        path: Output file
+        fmt: One of STREAM_FORMATS
+    
+    Returns:
+        Rows written
+    """
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"Unknown stream format {fmt!r}, expected one of {list(STREAM_FORMATS)}")
+    
+    rows = 0
+    writer = None
+    with open(path, "wb" if fmt == "parquet" else "w") as f:
+        try:
+            for chunk in chunks:
+                if fmt == "ndjson":
+                    f.write(chunk.to_json(orient="records", lines=True).rstrip("\n") + "\n")
+                elif fmt == "csv":
+                    chunk = chunk.assign(
+                        primary_complaint_codes=chunk["primary_complaint_codes"].str.join(",")
+                    )
+                    chunk.to_csv(f, header=rows == 0, index=False)
+                else:
+                    table = _to_arrow(chunk)
+                    if writer is None:
+                        writer = pq.ParquetWriter(f, table.schema)
+                    # Dictionary index widths can differ between chunks
+                    writer.write_table(table.cast(writer.schema))
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    return rows
+
+
+def _init_shard_worker(events: List[Dict[str, Any]]):
+    """Receive the event list once per worker process."""
+    global _shard_events
+    _shard_events = events
+
+
+def _simulate_shard(
+    shard: int,
+    hospitals: List[Dict],
+    seed: np.random.SeedSequence,
+    times: List[datetime],
+    path: Path,
+    fmt: str,
+    chunk_rows: int
+) -> Dict[str, Any]:
+    """Simulate one shard of hospitals into its own observations file."""
+    rows = write_observation_chunks(
+        observation_chunks(hospitals, _shard_events, times, np.random.default_rng(seed), chunk_rows),
+        path,
+        fmt
+    )
+    return {
+        "shard": shard,
+        "file": path.name,
+        "seed_spawn_key": list(seed.spawn_key),
+        "hospitals": len(hospitals),
+        "first_hospital_id": hospitals[0]["id"],
+        "rows": rows
+    }
+
+
+def simulate_sharded(
+    simulator: "DataSimulator",
+    output_dir: Path,
+    fmt: str,
+    start_date: datetime,
+    days: int,
+    seed: int,
+    workers: int = 1,
+    shard_hospitals: int = DEFAULT_SHARD_HOSPITALS,
+    interval_hours: int = 1,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Dict[str, Any]:
+    """
+    Simulate the simulator's hospitals shard by shard in a process pool.
+    
+    Hospitals are cut into consecutive shards of ``shard_hospitals``, and
+    shard ``i`` draws from ``SeedSequence(seed).spawn(n)[i]``. Neither depends
+    on ``workers``, so any worker count writes the same observations (apart
+    from created_at). Each shard streams to ``observations-<i>.<fmt>``;
+    hospitals and events are written once, and manifest.json lists the
+    shard files.
+    
+    Args:
+        simulator: Simulator with hospitals and events generated
+        output_dir: Output directory
+        fmt: One of STREAM_FORMATS
+        start_date: First observation time
+        days: Days to simulate
+        seed: Base seed of the shard seeds
+        workers: Worker processes
+        shard_hospitals: Hospitals per shard
+        interval_hours: Hours between observations
+        chunk_rows: Observation rows per streamed chunk
+    
+    Returns:
+        The manifest
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    ext = STREAM_FORMATS[fmt]
+    _write_frame(simulator._hospitals_frame(), output_dir / f"hospitals.{ext}", fmt)
+    _write_frame(simulator._events_frame(), output_dir / f"events.{ext}", fmt)
+    
+    hospitals = simulator.hospitals
+    shards = [
+        hospitals[i:i + shard_hospitals] for i in range(0, len(hospitals), shard_hospitals)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(shards))
+    times = time_grid(start_date, days, interval_hours)
+    tasks = [
+        (i, shard, seeds[i], times, output_dir / f"observations-{i:05d}.{ext}", fmt, chunk_rows)
+        for i, shard in enumerate(shards)
+    ]
+    
+    workers = max(1, min(workers, len(shards)))
+    if workers == 1:
+        _init_shard_worker(simulator.events)
+        results = [_simulate_shard(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_shard_worker,
+            initargs=(simulator.events,)
+        ) as executor:
+            futures = [executor.submit(_simulate_shard, *task) for task in tasks]
+            results = [future.result() for future in futures]
+    
+    manifest = {
+        "format": fmt,
+        "seed": seed,
+        "start_date": start_date.isoformat(),
+        "days": days,
+        "interval_hours": interval_hours,
+        "shard_hospitals": shard_hospitals,
+        "chunk_rows": chunk_rows,
+        "hospitals_file": f"hospitals.{ext}",
+        "events_file": f"events.{ext}",
+        "n_hospitals": len(hospitals),
+        "n_events": len(simulator.events),
+        "rows": sum(r["rows"] for r in results),
+        "shards": results
+    }
+    with open(output_dir / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    
+    print(f"Simulated {len(shards)} shards of up to {shard_hospitals} hospitals "
+          f"({manifest['rows']} observations) with {workers} workers to {output_dir}")
+    return manifest
+
+
+def write_parquet(
+    output_dir: Path,
+    hospitals_df: pd.DataFrame,
+    events_df: pd.DataFrame,
+    observations_df: pd.DataFrame
+):
+    """
+    Write hospitals, events and observations as Parquet files.
+    
+    Timestamp columns are stored as Arrow timestamps rather than ISO strings,
+    and hospital IDs and complaint codes are dictionary-encoded, so readers
+    get typed columns back and can project just the columns they need.
+    
+    Args:
+        output_dir: Output directory
+        hospitals_df: Flattened hospitals, one row per hospital
+        events_df: Flattened events, one row per event
+        observations_df: Flattened observations; primary_complaint_codes
+            (if present) holds a list of codes per row
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    for name, df in [
+        ("hospitals", hospitals_df),
+        ("events", events_df),
+        ("observations", observations_df)
+    ]:
+        pq.write_table(_to_arrow(df), output_dir / f"{name}.parquet")
 
 
 def main():
@@ -258,10 +799,30 @@ def main():
     parser.add_argument("--events", type=int, default=10, help="Number of events")
     parser.add_argument("--days", type=int, default=90, help="Days of historical data")
     parser.add_argument("--output-dir", type=str, default="data/synthetic", help="Output directory")
-    parser.add_argument("--format", choices=["json", "csv", "both"], default="both", help="Output format")
+    parser.add_argument(
+        "--format",
+        choices=["json", "ndjson", "csv", "parquet", "both"],
+        default="both",
+        help="Output format (both = json and csv; ndjson is always streamed)"
+    )
+    parser.add_argument("--stream", action="store_true",
+                        help="Write observations chunk by chunk with bounded memory "
+                             "(ndjson, csv or parquet)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Observation rows per streamed chunk")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Simulate hospital shards in this many processes "
+                             "(streamed, one file per shard plus manifest.json)")
+    parser.add_argument("--shard-hospitals", type=int, default=DEFAULT_SHARD_HOSPITALS,
+                        help="Hospitals per shard with --workers")
     parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--start-date", type=datetime.fromisoformat, default=None,
+                        help="First observation time (default: --days before now)")
     
     args = parser.parse_args()
+    stream = args.stream or args.format == "ndjson" or args.workers is not None
+    if stream and args.format not in STREAM_FORMATS:
+        parser.error(f"--stream and --workers support --format {', '.join(STREAM_FORMATS)}")
     
     simulator = DataSimulator(seed=args.seed)
     output_dir = Path(args.output_dir)
@@ -270,22 +831,49 @@ def main():
     hospitals = simulator.generate_hospitals(args.hospitals)
     
     print("Generating events...")
-    start_date = datetime.now() - timedelta(days=args.days)
+    start_date = args.start_date or datetime.now() - timedelta(days=args.days)
     events = simulator.generate_events(args.events, start_date, days_ahead=args.days)
     
-    print("Generating observations...")
-    observations = simulator.generate_observations(
-        hospitals, 
-        start_date, 
-        days=args.days,
-        interval_hours=1
-    )
-    
-    if args.format in ["json", "both"]:
-        simulator.save_to_json(output_dir)
-    
-    if args.format in ["csv", "both"]:
-        simulator.save_to_csv(output_dir)
+    if args.workers is not None:
+        print("Generating observations in shards...")
+        simulate_sharded(
+            simulator,
+            output_dir,
+            args.format,
+            start_date,
+            days=args.days,
+            seed=args.seed,
+            workers=args.workers,
+            shard_hospitals=args.shard_hospitals,
+            chunk_rows=args.chunk_rows
+        )
+    elif stream:
+        print("Generating and streaming observations...")
+        simulator.stream_to_files(
+            output_dir,
+            args.format,
+            hospitals,
+            start_date,
+            days=args.days,
+            chunk_rows=args.chunk_rows
+        )
+    else:
+        print("Generating observations...")
+        simulator.generate_observation_frame(
+            hospitals,
+            start_date,
+            days=args.days,
+            interval_hours=1
+        )
+        
+        if args.format in ["json", "both"]:
+            simulator.save_to_json(output_dir)
+        
+        if args.format in ["csv", "both"]:
+            simulator.save_to_csv(output_dir)
+        
+        if args.format == "parquet":
+            simulator.save_to_parquet(output_dir)
     
     print("Data generation complete!")
 
@@ -4,10 +4,14 @@ Neural network models for hospital forecasting.
 
 import torch
 import torch.nn as nn
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Union
 import numpy as np
 
 
+# Values of the neural_network ``architecture`` config key
+ARCHITECTURES = ["lstm", "hybrid"]
+
+
 class LSTMForecastModel(nn.Module):
     """LSTM-based model for time-series forecasting."""
     
@@ -117,6 +121,98 @@ class HybridForecastModel(nn.Module):
         return output
 
 
+def create_forecast_model(
+    config: Dict[str, Any],
+    time_series_features: int,
+    static_features: int
+) -> nn.Module:
+    """
+    Build the network selected by ``config["architecture"]``.
+    
+    "lstm" (the default) runs every column, static ones included, through the
+    LSTM at every timestep. "hybrid" runs only the time-series columns
+    through the LSTM and encodes the static columns once per sample.
+    """
+    architecture = config.get("architecture", "lstm")
+    if architecture == "lstm":
+        return LSTMForecastModel(
+            input_size=time_series_features + static_features,
+            hidden_size=config.get("hidden_size", 64),
+            num_layers=config.get("num_layers", 2),
+            dropout=config.get("dropout", 0.2)
+        )
+    if architecture == "hybrid":
+        return HybridForecastModel(
+            time_series_features=time_series_features,
+            static_features=static_features,
+            lstm_hidden=config.get("hidden_size", 64),
+            mlp_hidden=config.get("mlp_hidden", 32),
+            num_layers=config.get("num_layers", 2),
+            dropout=config.get("dropout", 0.2)
+        )
+    raise ValueError(f"Unknown architecture: {architecture}")
+
+
+def forward_batch(
+    model: nn.Module,
+    features: Union[torch.Tensor, Tuple[torch.Tensor, ...]],
+    device: torch.device
+) -> torch.Tensor:
+    """Run a model on a window batch or a (time_series, static) batch."""
+    if isinstance(features, (tuple, list)):
+        return model(*(x.to(device) for x in features))
+    return model(features.to(device))
+
+
+def export_torchscript(
+    model: nn.Module,
+    path: str,
+    sequence_length: int,
+    input_size: int,
+    static_size: int = 0
+) -> torch.jit.ScriptModule:
+    """
+    Trace, freeze and save a model as a TorchScript serving artifact.
+    
+    ``static_size > 0`` traces a HybridForecastModel with
+    (time_series, static) inputs of widths input_size and static_size.
+    """
+    model = model.cpu().eval()
+    example = torch.zeros(1, sequence_length, input_size)
+    if static_size:
+        example = (example, torch.zeros(1, static_size))
+    
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    frozen = torch.jit.freeze(traced)
+    torch.jit.save(frozen, path)
+    
+    return frozen
+
+
+def quantize_dynamic(model: nn.Module) -> nn.Module:
+    """Apply dynamic int8 quantization to LSTM and Linear layers (CPU only)."""
+    model = model.cpu().eval()
+    return torch.ao.quantization.quantize_dynamic(
+        model,
+        {nn.LSTM, nn.Linear},
+        dtype=torch.qint8
+    )
+
+
+def passes_quantization_gate(
+    fp32_metrics: Dict[str, float],
+    int8_metrics: Dict[str, float],
+    max_relative_increase: float = 0.05
+) -> bool:
+    """Check that int8 MAE and RMSE stay within a relative bound of fp32."""
+    for metric in ("mae", "rmse"):
+        limit = fp32_metrics[metric] * (1 + max_relative_increase)
+        if int8_metrics[metric] > limit:
+            return False
+    return True
+
+
 def train_epoch(
     model: nn.Module,
     dataloader: torch.utils.data.DataLoader,
@@ -129,11 +225,10 @@ def train_epoch(
     total_loss = 0.0
     
     for features, targets in dataloader:
-        features = features.to(device)
         targets = targets.to(device)
         
         optimizer.zero_grad()
-        outputs = model(features)
+        outputs = forward_batch(model, features, device)
         loss = criterion(outputs, targets)
         loss.backward()
         optimizer.step()
@@ -157,10 +252,9 @@ def evaluate(
     
     with torch.no_grad():
         for features, targets in dataloader:
-            features = features.to(device)
             targets = targets.to(device)
             
-            outputs = model(features)
+            outputs = forward_batch(model, features, device)
             loss = criterion(outputs, targets)
             
             total_loss += loss.item()
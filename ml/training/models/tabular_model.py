@@ -3,7 +3,11 @@ Tabular models for hospital forecasting.
 """
 
 import numpy as np
-from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.ensemble import (
+    GradientBoostingRegressor,
+    HistGradientBoostingRegressor,
+    RandomForestRegressor
+)
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 from typing import Dict, Any, Tuple
@@ -15,7 +19,8 @@ class TabularForecastModel:
     def __init__(self, model_type: str = "gradient_boosting", **kwargs):
         """
         Args:
-            model_type: "gradient_boosting" or "random_forest"
+            model_type: "gradient_boosting", "hist_gradient_boosting" or
+                "random_forest"
             **kwargs: Model hyperparameters
         """
         if model_type == "gradient_boosting":
@@ -25,6 +30,20 @@ class TabularForecastModel:
                 learning_rate=kwargs.get("learning_rate", 0.1),
                 random_state=kwargs.get("random_state", 42)
             )
+        elif model_type == "hist_gradient_boosting":
+            # Multi-threaded, bins features into at most max_bins buckets and
+            # stops early once a held-out score stops improving
+            self.model = HistGradientBoostingRegressor(
+                max_iter=kwargs.get("max_iter", kwargs.get("n_estimators", 100)),
+                max_depth=kwargs.get("max_depth"),
+                max_leaf_nodes=kwargs.get("max_leaf_nodes", 31),
+                learning_rate=kwargs.get("learning_rate", 0.1),
+                max_bins=kwargs.get("max_bins", 255),
+                early_stopping=kwargs.get("early_stopping", "auto"),
+                validation_fraction=kwargs.get("validation_fraction", 0.1),
+                n_iter_no_change=kwargs.get("n_iter_no_change", 10),
+                random_state=kwargs.get("random_state", 42)
+            )
         elif model_type == "random_forest":
             self.model = RandomForestRegressor(
                 n_estimators=kwargs.get("n_estimators", 100),
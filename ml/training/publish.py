@@ -0,0 +1,122 @@
+"""
+Publish trained models to the model registry.
+
+Each published version holds the serving artifact (compiled trees or a
+TorchScript module) and the trainable source model it was exported from,
+and records the training cutoff: the newest target time the model has
+learned from. refresh.py loads the source model and continues training it
+on observations after the cutoff.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+
+sys.path.append(str(Path(__file__).parent.parent / "inference"))
+
+from compiled_trees import compile_ensemble
+from registry import ModelRegistry, ModelVersion
+from models.nn_model import HybridForecastModel, export_torchscript
+
+
+# Trainable source model stored next to each serving artifact
+SOURCE_FILES = {"tabular": "source.joblib", "nn": "source.pt"}
+
+
+def export_serving_artifact(
+    model: Any,
+    model_type: str,
+    output_dir: Path,
+    sequence_length: int
+) -> Path:
+    """Write the artifact ModelInferenceService serves for a trained model."""
+    if model_type == "tabular":
+        path = output_dir / "model.npz"
+        compile_ensemble(model).save(path)
+        return path
+
+    path = output_dir / "model.torchscript"
+    static_size = 0
+    if isinstance(model, HybridForecastModel):
+        static_size = model.static_encoder[0].in_features
+    export_torchscript(model, str(path), sequence_length, model.lstm.input_size, static_size)
+    return path
+
+
+def publish_model(
+    registry_dir: Union[str, Path],
+    version: str,
+    model_type: str,
+    model: Any,
+    sequence_length: int,
+    training_cutoff: np.datetime64,
+    metadata: Optional[Dict[str, Any]] = None,
+    activate: bool = False
+) -> ModelVersion:
+    """
+    Publish a trained model with its source model and training cutoff.
+
+    Args:
+        registry_dir: Registry root
+        version: New version name
+        model_type: "tabular" (a fitted sklearn estimator) or "nn" (an
+            eager torch module)
+        model: Trained model
+        sequence_length: Input window length, for the TorchScript export
+        training_cutoff: Newest target time (naive UTC) the model was trained on
+        metadata: Extra metadata (metrics, feature set, ...)
+        activate: Make the new version active
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        artifact = export_serving_artifact(model, model_type, tmp, sequence_length)
+
+        source = tmp / SOURCE_FILES[model_type]
+        if model_type == "tabular":
+            joblib.dump(model, source)
+        else:
+            torch.save(model.cpu(), source)
+
+        return ModelRegistry(registry_dir).publish(
+            artifact,
+            version,
+            model_type,
+            metadata={
+                **(metadata or {}),
+                "sequence_length": sequence_length,
+                "training_cutoff": pd.Timestamp(training_cutoff).isoformat(),
+                "source_artifact": source.name
+            },
+            activate=activate,
+            extra_files=[source]
+        )
+
+
+def load_source_model(entry: ModelVersion) -> Union[Any, nn.Module]:
+    """Load the trainable model stored with a published version."""
+    name = entry.metadata.get("source_artifact")
+    if name is None:
+        raise ValueError(
+            f"Model version {entry.version} has no source model; "
+            f"publish a full training run with train.py --publish first"
+        )
+
+    path = Path(entry.path).parent / name
+    if entry.model_type == "tabular":
+        return joblib.load(path)
+    return torch.load(path, map_location="cpu", weights_only=False)
+
+
+def next_version(version: str) -> str:
+    """Bump the last numeric part of a version name, e.g. 1.2.9 -> 1.2.10."""
+    head, _, last = version.rpartition(".")
+    if not last.isdigit():
+        raise ValueError(f"Cannot derive the next version from {version!r}")
+    return f"{head}.{int(last) + 1}" if head else str(int(last) + 1)
@@ -0,0 +1,243 @@
+"""
+Incremental model refresh for FestSafe AI.
+
+Updates a published model with the observations ingested since its
+training cutoff instead of retraining from the full history:
+- tabular models get ``extra_estimators`` more trees through warm start,
+  fitted on the new windows only (GradientBoosting stages fit the current
+  model's residuals, RandomForest trees join the average)
+- networks are fine-tuned for a few epochs at a lower learning rate
+
+Only observations after the cutoff (plus one window of context) are read
+from the backend database. The newest ``holdout_hours`` of targets are held
+out, and the refreshed model is published as the next version only if its
+holdout MAE and RMSE are no worse than the current model's (within
+``max_relative_increase``).
+
+Usage:
+    python refresh.py --config configs/baseline.yaml --activate
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+import yaml
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+sys.path.append(str(Path(__file__).parent.parent / "inference"))
+
+from dataset import HospitalForecastDataset, create_dataloader
+from models.nn_model import HybridForecastModel, forward_batch, train_epoch
+from publish import load_source_model, next_version, publish_model
+from registry import ModelRegistry
+
+
+def split_new_windows(
+    dataset: HospitalForecastDataset,
+    cutoff: np.datetime64,
+    holdout_hours: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pick the windows whose target is newer than the training cutoff.
+
+    Returns:
+        Update indices, and holdout indices for the newest ``holdout_hours``
+        of target times
+    """
+    target_times = dataset.get_target_timestamps()
+    if len(target_times) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    holdout_start = target_times.max() - np.timedelta64(holdout_hours - 1, "h")
+    new = target_times > cutoff
+    return (
+        np.flatnonzero(new & (target_times < holdout_start)),
+        np.flatnonzero(new & (target_times >= holdout_start))
+    )
+
+
+def predict(
+    model: Any,
+    model_type: str,
+    dataset: HospitalForecastDataset,
+    indices: np.ndarray,
+    feature_set: str = "window"
+) -> np.ndarray:
+    """Predict the given windows with a source model."""
+    if model_type == "tabular":
+        X, _ = dataset.get_tabular_arrays(indices, feature_set)
+        return model.predict(X)
+
+    split_static = isinstance(model, HybridForecastModel)
+    device = torch.device("cpu")
+    model.eval()
+    predictions = []
+    with torch.inference_mode():
+        for batch in np.array_split(indices, max(1, len(indices) // 1024)):
+            X, _ = dataset.get_batch(batch, split_static)
+            predictions.append(forward_batch(model, X, device).numpy().ravel())
+    return np.concatenate(predictions) if predictions else np.empty(0)
+
+
+def holdout_metrics(
+    model: Any,
+    model_type: str,
+    dataset: HospitalForecastDataset,
+    indices: np.ndarray,
+    feature_set: str = "window"
+) -> Dict[str, float]:
+    """MAE and RMSE of a model on the holdout windows."""
+    _, y = dataset.get_arrays(indices)
+    errors = predict(model, model_type, dataset, indices, feature_set) - y
+    return {
+        "mae": float(np.mean(np.abs(errors))),
+        "rmse": float(np.sqrt(np.mean(errors ** 2)))
+    }
+
+
+def refresh_tabular(
+    model: Any,
+    dataset: HospitalForecastDataset,
+    indices: np.ndarray,
+    feature_set: str,
+    config: dict
+) -> Any:
+    """Add trees fitted on the new windows to a tree ensemble (in place)."""
+    if isinstance(model, HistGradientBoostingRegressor):
+        # HGB re-bins its inputs on every fit, so older trees would read
+        # different bins; it has to be retrained from scratch
+        raise ValueError(
+            "HistGradientBoostingRegressor cannot be refreshed with warm start; "
+            "retrain it with train.py"
+        )
+
+    n_estimators = len(model.estimators_) + config.get("extra_estimators", 20)
+    model.set_params(warm_start=True, n_estimators=n_estimators)
+    X, y = dataset.get_tabular_arrays(indices, feature_set)
+    model.fit(X, y)
+    return model
+
+
+def refresh_nn(
+    model: nn.Module,
+    dataset: HospitalForecastDataset,
+    indices: np.ndarray,
+    config: dict
+) -> nn.Module:
+    """Fine-tune a network on the new windows (in place)."""
+    device = torch.device("cpu")
+    loader = create_dataloader(
+        dataset,
+        indices,
+        batch_size=config.get("batch_size", 32),
+        shuffle=True,
+        split_static=isinstance(model, HybridForecastModel)
+    )
+    criterion = nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=config.get("learning_rate", 0.0002))
+
+    for epoch in range(config.get("num_epochs", 3)):
+        loss = train_epoch(model, loader, criterion, optimizer, device)
+        print(f"Fine-tune epoch {epoch + 1}: train loss {loss:.4f}")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh a published model with new observations")
+    parser.add_argument("--config", type=str, required=True, help="Path to config YAML")
+    parser.add_argument("--database-url", type=str, default=os.getenv("DATABASE_URL"),
+                        help="Backend database URL (default: $DATABASE_URL)")
+    parser.add_argument("--base-version", type=str, default=None,
+                        help="Version to refresh (default: the active one)")
+    parser.add_argument("--version", type=str, default=None,
+                        help="Version to publish (default: the base version, bumped)")
+    parser.add_argument("--activate", action="store_true", help="Activate the refreshed version")
+
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    refresh_config = config.get("refresh", {})
+    registry_dir = config.get("registry_dir", "models/registry")
+
+    base = ModelRegistry(registry_dir).get(args.base_version)
+    if "training_cutoff" not in base.metadata:
+        raise ValueError(f"Model version {base.version} has no training_cutoff")
+    cutoff = np.datetime64(base.metadata["training_cutoff"])
+    sequence_length = base.metadata.get("sequence_length", config.get("sequence_length", 24))
+    forecast_horizon = base.metadata.get("forecast_horizon", config.get("forecast_horizon", 24))
+    feature_set = base.metadata.get("feature_set", "window")
+
+    # One window of context before the cutoff lets the first new target form
+    since = cutoff - np.timedelta64(sequence_length + forecast_horizon - 1, "h")
+    print(f"Refreshing {base.version} ({base.model_type}) with observations after {since}")
+    dataset = HospitalForecastDataset.from_database(
+        args.database_url,
+        sequence_length=sequence_length,
+        forecast_horizon=forecast_horizon,
+        since=since
+    )
+
+    update_idx, holdout_idx = split_new_windows(
+        dataset, cutoff, refresh_config.get("holdout_hours", 24)
+    )
+    min_new_windows = refresh_config.get("min_new_windows", 100)
+    if len(update_idx) < min_new_windows or len(holdout_idx) == 0:
+        print(f"Only {len(update_idx)} new training and {len(holdout_idx)} holdout "
+              f"windows (need {min_new_windows}); nothing to do")
+        return
+
+    model = load_source_model(base)
+    base_metrics = holdout_metrics(model, base.model_type, dataset, holdout_idx, feature_set)
+
+    if base.model_type == "tabular":
+        refresh_tabular(model, dataset, update_idx, feature_set, refresh_config.get("tabular", {}))
+    else:
+        refresh_nn(model, dataset, update_idx, refresh_config.get("neural_network", {}))
+    metrics = holdout_metrics(model, base.model_type, dataset, holdout_idx, feature_set)
+
+    print(f"{len(update_idx)} new training windows, {len(holdout_idx)} holdout windows")
+    print(f"Holdout MAE {base_metrics['mae']:.3f} -> {metrics['mae']:.3f}, "
+          f"RMSE {base_metrics['rmse']:.3f} -> {metrics['rmse']:.3f}")
+
+    max_increase = refresh_config.get("max_relative_increase", 0.0)
+    regressed = [
+        name for name in ("mae", "rmse")
+        if metrics[name] > base_metrics[name] * (1 + max_increase)
+    ]
+    if regressed:
+        print(f"Refreshed model is worse on holdout {', '.join(regressed)}; not published")
+        return
+
+    entry = publish_model(
+        registry_dir,
+        args.version or next_version(base.version),
+        base.model_type,
+        model,
+        sequence_length=sequence_length,
+        training_cutoff=dataset.get_target_timestamps(update_idx).max(),
+        metadata={
+            **{k: base.metadata[k] for k in ("feature_set", "architecture") if k in base.metadata},
+            "forecast_horizon": forecast_horizon,
+            "base_version": base.version,
+            "n_refresh_windows": int(len(update_idx)),
+            "holdout_mae": metrics["mae"],
+            "holdout_rmse": metrics["rmse"],
+            "base_holdout_mae": base_metrics["mae"],
+            "base_holdout_rmse": base_metrics["rmse"]
+        },
+        activate=args.activate
+    )
+    print(f"Published {entry.version} to {entry.path}")
+
+
+if __name__ == "__main__":
+    main()
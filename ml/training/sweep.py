@@ -0,0 +1,402 @@
+"""
+Parallel hyperparameter search for FestSafe AI models.
+
+Searches the ``sweep.tabular`` or ``sweep.neural_network`` space from the
+config with Optuna. Trials run in a process pool that shares one Optuna
+study through a journal file and one memory-mapped copy of the dataset.
+LSTM trials report val_loss after every epoch, and the median pruner stops
+trials that fall behind. Results are logged to MLflow at the end with
+one log_batch call per trial, so workers never contend on the tracking
+store.
+
+Trials are scored on a time-based holdout: the last ``sweep.val_days`` of
+targets, after training only on earlier targets.
+
+Usage:
+    python sweep.py --config configs/baseline.yaml --data-dir data/synthetic \\
+        --model-type nn --n-trials 40 --workers 4
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import mlflow
+import numpy as np
+import optuna
+import torch
+import torch.nn as nn
+import yaml
+from mlflow.entities import Metric, Param, RunStatus
+from mlflow.tracking import MlflowClient
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID, MLFLOW_RUN_NAME
+from optuna.storages import JournalStorage
+from optuna.storages.journal import JournalFileBackend
+from optuna.study import MaxTrialsCallback
+
+from backtest import make_folds
+from dataset import (
+    DYNAMIC_COLS,
+    STATIC_COLS,
+    HospitalForecastDataset,
+    create_dataloader,
+    load_dataset,
+    shared_dataset_path
+)
+from models.tabular_model import TabularForecastModel
+from models.nn_model import create_forecast_model, train_epoch, evaluate
+from train import MLFLOW_BATCH_METRICS
+
+
+# MLflow status for each finished trial state (pruned trials were stopped early)
+TRIAL_RUN_STATUS = {
+    optuna.trial.TrialState.COMPLETE: RunStatus.FINISHED,
+    optuna.trial.TrialState.PRUNED: RunStatus.KILLED,
+    optuna.trial.TrialState.FAIL: RunStatus.FAILED
+}
+
+
+def suggest_params(trial: optuna.Trial, space: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Sample one value per parameter of a search space.
+
+    Each entry is either ``{choices: [...]}`` or ``{low, high, log}``; ranges
+    whose bounds are both integers are sampled as integers.
+    """
+    params = {}
+    for name, spec in space.items():
+        if "choices" in spec:
+            params[name] = trial.suggest_categorical(name, spec["choices"])
+        elif isinstance(spec["low"], int) and isinstance(spec["high"], int):
+            params[name] = trial.suggest_int(
+                name, spec["low"], spec["high"], log=spec.get("log", False)
+            )
+        else:
+            params[name] = trial.suggest_float(
+                name, float(spec["low"]), float(spec["high"]), log=spec.get("log", False)
+            )
+    return params
+
+
+def _journal_storage(path: str) -> JournalStorage:
+    return JournalStorage(JournalFileBackend(path))
+
+
+def _holdout_split(
+    dataset: HospitalForecastDataset,
+    val_days: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Train on targets before the last ``val_days``, validate on the rest."""
+    target_times = dataset.get_target_timestamps()
+    fold = make_folds(target_times, n_folds=1, test_hours=int(val_days * 24))[0]
+    train_idx = np.flatnonzero(target_times < fold["train_end"])
+    val_idx = np.flatnonzero(target_times >= fold["test_start"])
+    if len(train_idx) == 0 or len(val_idx) == 0:
+        raise ValueError(
+            f"Holdout of {val_days} days leaves {len(train_idx)} training and "
+            f"{len(val_idx)} validation windows"
+        )
+    return train_idx, val_idx
+
+
+def _tabular_objective(dataset, train_idx, val_idx, config, space):
+    """Build the tabular objective; the split is gathered once per worker."""
+    feature_set = config.get("feature_set", "window")
+    X_train, y_train = dataset.get_tabular_arrays(train_idx, feature_set)
+    X_val, y_val = dataset.get_tabular_arrays(val_idx, feature_set)
+
+    def objective(trial: optuna.Trial) -> float:
+        params = suggest_params(trial, space)
+        model = TabularForecastModel(
+            model_type=config.get("model_type", "gradient_boosting"),
+            **{**config.get("hyperparameters", {}), **params}
+        )
+        model.train(X_train, y_train)
+        metrics = model.evaluate(X_val, y_val)
+
+        trial.set_user_attr("val_mae", float(metrics["mae"]))
+        trial.set_user_attr("val_rmse", float(metrics["rmse"]))
+        return float(metrics["rmse"] ** 2)
+
+    return objective
+
+
+def _nn_objective(dataset, train_idx, val_idx, config, space):
+    """Build the network objective, reporting val_loss per epoch for pruning."""
+    device = torch.device("cpu")
+    split_static = config.get("architecture", "lstm") == "hybrid"
+
+    def objective(trial: optuna.Trial) -> float:
+        params = {**config, **suggest_params(trial, space)}
+        model = create_forecast_model(params, len(DYNAMIC_COLS), len(STATIC_COLS))
+        criterion = nn.MSELoss()
+        optimizer = torch.optim.Adam(model.parameters(), lr=params.get("learning_rate", 0.001))
+        batch_size = params.get("batch_size", 32)
+        train_loader = create_dataloader(
+            dataset, train_idx, batch_size=batch_size, shuffle=True, split_static=split_static
+        )
+        val_loader = create_dataloader(
+            dataset, val_idx, batch_size=batch_size, split_static=split_static
+        )
+
+        best = None
+        for epoch in range(params.get("num_epochs", 50)):
+            train_epoch(model, train_loader, criterion, optimizer, device)
+            val_metrics = evaluate(model, val_loader, criterion, device)
+
+            if best is None or val_metrics["loss"] < best["loss"]:
+                best = val_metrics
+            trial.report(val_metrics["loss"], epoch)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+
+        trial.set_user_attr("val_mae", float(best["mae"]))
+        trial.set_user_attr("val_rmse", float(best["rmse"]))
+        return float(best["loss"])
+
+    return objective
+
+
+def _run_worker(
+    study_name: str,
+    journal_path: str,
+    dataset_path: str,
+    model_type: str,
+    config: dict,
+    sweep_config: dict,
+    n_trials: int,
+    num_threads: int,
+    seed: int
+):
+    """Pull trials from the shared study until it has ``n_trials`` trials."""
+    torch.set_num_threads(num_threads)
+    torch.manual_seed(seed)
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+    dataset = HospitalForecastDataset.load(dataset_path)
+    train_idx, val_idx = _holdout_split(dataset, sweep_config.get("val_days", 7))
+
+    pruning = sweep_config.get("pruning", {})
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=_journal_storage(journal_path),
+        sampler=optuna.samplers.TPESampler(seed=seed),
+        pruner=optuna.pruners.MedianPruner(
+            n_startup_trials=pruning.get("n_startup_trials", 4),
+            n_warmup_steps=pruning.get("n_warmup_steps", 3)
+        )
+    )
+
+    if model_type == "tabular":
+        objective = _tabular_objective(
+            dataset, train_idx, val_idx, config, sweep_config["tabular"]
+        )
+    else:
+        num_epochs = sweep_config.get("num_epochs", config.get("num_epochs", 50))
+        nn_config = {**config, "num_epochs": num_epochs}
+        objective = _nn_objective(
+            dataset, train_idx, val_idx, nn_config, sweep_config["neural_network"]
+        )
+
+    # optimize always starts a trial, so a resumed journal that already holds
+    # n_trials would otherwise run one more per worker
+    if len(study.get_trials(deepcopy=False)) >= n_trials:
+        return
+
+    # Counting every state caps the total across workers, including running
+    # and failed trials. A trial that raises is recorded as FAIL instead of
+    # killing the worker (and with it the pool)
+    study.optimize(
+        objective,
+        catch=(Exception,),
+        callbacks=[MaxTrialsCallback(n_trials, states=None)]
+    )
+
+
+def run_sweep(
+    dataset: HospitalForecastDataset,
+    model_type: str,
+    config: dict,
+    sweep_config: dict,
+    n_trials: int,
+    workers: int = 1,
+    journal_path: Optional[str] = None,
+    study_name: Optional[str] = None,
+    seed: int = 42
+) -> optuna.Study:
+    """
+    Run a sweep across a process pool.
+
+    Args:
+        dataset: Dataset to search on; saved to shared memory unless it was
+            loaded from the dataset cache
+        model_type: "tabular" or "nn"
+        config: Model config section (``tabular`` or ``neural_network``)
+        sweep_config: The ``sweep`` config section
+        n_trials: Total trials across all workers
+        workers: Worker processes
+        journal_path: Optuna journal file; reuse it to resume a sweep
+        study_name: Study name (default: "<model_type>-sweep")
+        seed: Base seed; worker i samples with seed + i
+
+    Returns:
+        The finished study
+    """
+    study_name = study_name or f"{model_type}-sweep"
+    workers = max(1, min(workers, n_trials))
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_path = journal_path or str(Path(tmp) / "sweep.journal")
+        storage = _journal_storage(journal_path)
+        optuna.create_study(
+            study_name=study_name,
+            storage=storage,
+            direction="minimize",
+            load_if_exists=True
+        )
+
+        with shared_dataset_path(dataset) as dataset_path, ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _run_worker, study_name, journal_path, str(dataset_path), model_type,
+                    config, sweep_config, n_trials, num_threads, seed + i
+                )
+                for i in range(workers)
+            ]
+            for future in futures:
+                future.result()
+
+        # Copy out of the journal, which may live in the temporary directory
+        results = optuna.storages.InMemoryStorage()
+        optuna.copy_study(
+            from_study_name=study_name,
+            from_storage=storage,
+            to_storage=results
+        )
+        return optuna.load_study(study_name=study_name, storage=results)
+
+
+def log_study_to_mlflow(study: optuna.Study, model_type: str):
+    """Log a parent run for the sweep and one child run per trial in batch."""
+    client = MlflowClient()
+
+    with mlflow.start_run(run_name=f"{model_type}_sweep") as parent:
+        completed = study.get_trials(deepcopy=False, states=[optuna.trial.TrialState.COMPLETE])
+        pruned = study.get_trials(deepcopy=False, states=[optuna.trial.TrialState.PRUNED])
+        mlflow.log_params({"model_type": model_type, "n_trials": len(study.trials)})
+        mlflow.log_metrics({"n_complete": len(completed), "n_pruned": len(pruned)})
+        if completed:
+            mlflow.log_params({f"best_{k}": v for k, v in study.best_params.items()})
+            mlflow.log_metric("best_val_loss", study.best_value)
+
+        experiment_id = parent.info.experiment_id
+        for trial in study.get_trials(deepcopy=False):
+            run = client.create_run(experiment_id, tags={
+                MLFLOW_PARENT_RUN_ID: parent.info.run_id,
+                MLFLOW_RUN_NAME: f"trial_{trial.number}",
+                "trial_state": trial.state.name
+            })
+
+            finished = trial.datetime_complete or trial.datetime_start
+            timestamp = int((finished.timestamp() if finished else time.time()) * 1000)
+            metrics = [
+                Metric("val_loss", value, timestamp, step)
+                for step, value in sorted(trial.intermediate_values.items())
+            ]
+            if trial.value is not None:
+                metrics.append(Metric("objective", trial.value, timestamp, 0))
+            metrics.extend(
+                Metric(key, value, timestamp, 0) for key, value in trial.user_attrs.items()
+            )
+            params = [Param(key, str(value)) for key, value in trial.params.items()]
+
+            for i in range(0, max(len(metrics), 1), MLFLOW_BATCH_METRICS):
+                client.log_batch(
+                    run.info.run_id,
+                    metrics=metrics[i:i + MLFLOW_BATCH_METRICS],
+                    params=params if i == 0 else []
+                )
+
+            client.set_terminated(
+                run.info.run_id,
+                status=RunStatus.to_string(TRIAL_RUN_STATUS.get(trial.state, RunStatus.KILLED))
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep for FestSafe AI models")
+    parser.add_argument("--config", type=str, required=True, help="Path to config YAML")
+    parser.add_argument("--data-dir", type=str, default="data/synthetic", help="Data directory")
+    parser.add_argument("--model-type", choices=["tabular", "nn"], default="tabular")
+    parser.add_argument("--n-trials", type=int, default=None, help="Total trials (default: sweep.n_trials)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--journal", type=str, default=None, help="Optuna journal file, to resume a sweep")
+    parser.add_argument("--study-name", type=str, default=None)
+    parser.add_argument("--no-mlflow", action="store_true", help="Skip logging to MLflow")
+
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    sweep_config = config.get("sweep", {})
+    section = "tabular" if args.model_type == "tabular" else "neural_network"
+    if section not in sweep_config:
+        raise ValueError(f"Config has no sweep.{section} search space")
+
+    print("Loading dataset...")
+    dataset = load_dataset(
+        args.data_dir,
+        config.get("sequence_length", 24),
+        config.get("forecast_horizon", 24),
+        cache_dir=config.get("dataset_cache_dir")
+    )
+
+    n_trials = args.n_trials or sweep_config.get("n_trials", 20)
+    print(f"Sweeping {args.model_type} model: {n_trials} trials, {args.workers} workers")
+    start = time.perf_counter()
+    study = run_sweep(
+        dataset,
+        args.model_type,
+        config.get(section, {}),
+        sweep_config,
+        n_trials,
+        workers=args.workers,
+        journal_path=args.journal,
+        study_name=args.study_name
+    )
+    elapsed = time.perf_counter() - start
+
+    states = [trial.state.name for trial in study.trials]
+    print(f"\n{len(states)} trials in {elapsed:.0f}s: {states.count('COMPLETE')} complete, "
+          f"{states.count('PRUNED')} pruned, {states.count('FAIL')} failed")
+
+    if not args.no_mlflow:
+        mlflow.set_tracking_uri(config.get("mlflow_uri", "http://localhost:5000"))
+        mlflow.set_experiment(config.get("experiment_name", "festsafe-forecast"))
+        log_study_to_mlflow(study, args.model_type)
+
+    if "COMPLETE" not in states:
+        print("No trial completed; see the failed trials' errors above")
+        return
+
+    best = study.best_trial
+    print(f"Best trial {best.number}: val_loss {best.value:.4f}, "
+          f"MAE {best.user_attrs.get('val_mae', float('nan')):.2f}, "
+          f"RMSE {best.user_attrs.get('val_rmse', float('nan')):.2f}")
+    key = "hyperparameters" if args.model_type == "tabular" else None
+    print(f"\nBest {section} config:")
+    print(yaml.safe_dump({section: {key: best.params} if key else best.params},
+                         default_flow_style=False))
+
+
+if __name__ == "__main__":
+    main()
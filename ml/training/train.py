@@ -3,20 +3,54 @@ Training script for FestSafe AI models.
 """
 
 import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
 import yaml
 import mlflow
 import mlflow.pytorch
 import mlflow.sklearn
+from mlflow.entities import Metric
+from mlflow.tracking import MlflowClient
 from pathlib import Path
 import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
 import torch.nn as nn
-from torch.utils.data import DataLoader
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader, Subset
 import numpy as np
 from sklearn.model_selection import train_test_split
 
-from dataset import HospitalForecastDataset, load_data
+# Add inference directory to path for the compiled predictor
+sys.path.append(str(Path(__file__).parent.parent / "inference"))
+
+from compiled_trees import compile_ensemble
+from dataset import (
+    DYNAMIC_COLS,
+    STATIC_COLS,
+    HospitalForecastDataset,
+    create_dataloader,
+    load_dataset,
+    shared_dataset_path
+)
 from models.tabular_model import TabularForecastModel
-from models.nn_model import LSTMForecastModel, train_epoch, evaluate
+from models.nn_model import (
+    create_forecast_model,
+    export_torchscript,
+    passes_quantization_gate,
+    quantize_dynamic,
+    train_epoch,
+    evaluate
+)
+from publish import publish_model
+
+
+# MLflow accepts at most this many metrics per log_batch call
+MLFLOW_BATCH_METRICS = 1000
 
 
 def train_tabular_model(
@@ -35,9 +69,18 @@ def train_tabular_model(
     with mlflow.start_run(run_name="tabular_model"):
         # Log parameters
         mlflow.log_params(config.get("hyperparameters", {}))
+        mlflow.log_param("model_type", config.get("model_type", "gradient_boosting"))
+        mlflow.log_param("feature_set", config.get("feature_set", "window"))
+        mlflow.log_param("n_features", X_train.shape[1])
         
         # Train
+        fit_start = time.perf_counter()
         model.train(X_train, y_train)
+        mlflow.log_metric("fit_seconds", time.perf_counter() - fit_start)
+        
+        # Boosting iterations actually used after early stopping
+        if hasattr(model.model, "n_iter_"):
+            mlflow.log_metric("n_iter", model.model.n_iter_)
         
         # Evaluate
         train_metrics = model.evaluate(X_train, y_train)
@@ -52,6 +95,13 @@ def train_tabular_model(
         # Log model
         mlflow.sklearn.log_model(model.model, "model")
         
+        # Export compiled artifact for serving
+        compiled_path = config.get("compiled_path")
+        if compiled_path:
+            Path(compiled_path).parent.mkdir(parents=True, exist_ok=True)
+            compile_ensemble(model.model).save(compiled_path)
+            mlflow.log_artifact(compiled_path, "compiled")
+        
         print(f"Validation MAE: {val_metrics['mae']:.2f}")
         print(f"Validation RMSE: {val_metrics['rmse']:.2f}")
         print(f"Validation R2: {val_metrics['r2']:.2f}")
@@ -60,35 +110,64 @@ def train_tabular_model(
 
 
 def train_nn_model(
-    train_dataset: HospitalForecastDataset,
-    val_dataset: HospitalForecastDataset,
+    train_dataset: Subset,
+    val_dataset: Subset,
     config: dict,
-    device: torch.device
-) -> LSTMForecastModel:
-    """Train a neural network model."""
-    # Create data loaders
-    train_loader = DataLoader(
-        train_dataset,
-        batch_size=config.get("batch_size", 32),
-        shuffle=True
+    device: torch.device,
+    rank: int = 0,
+    world_size: int = 1
+) -> nn.Module:
+    """
+    Train a neural network model.
+    
+    Training stops once val_loss has not improved by ``min_delta`` for
+    ``patience`` epochs (``patience: 0`` always runs ``num_epochs``). The
+    best weights are kept in memory, restored at the end, and logged to
+    MLflow once; per-epoch metrics are sent after training, in log_batch calls
+    of at most MLFLOW_BATCH_METRICS.
+    
+    With ``world_size > 1`` this runs in one of several data-parallel
+    processes (see train_nn_model_distributed): each process trains on its
+    shard of the training windows under DistributedDataParallel, every
+    process evaluates the full validation set (so all reach the same
+    early-stopping decision), and only rank 0 logs and exports.
+    """
+    architecture = config.get("architecture", "lstm")
+    hybrid = architecture == "hybrid"
+    
+    # Create data loaders that gather whole batches from the feature matrix
+    loader_options = {
+        "batch_size": config.get("batch_size", 32),
+        "num_workers": config.get("num_workers", 0),
+        "prefetch_factor": config.get("prefetch_factor", 2),
+        "pin_memory": device.type == "cuda",
+        "split_static": hybrid
+    }
+    train_loader = create_dataloader(
+        train_dataset.dataset,
+        train_dataset.indices,
+        shuffle=True,
+        num_replicas=world_size,
+        rank=rank,
+        **loader_options
     )
-    val_loader = DataLoader(
-        val_dataset,
-        batch_size=config.get("batch_size", 32),
-        shuffle=False
+    val_loader = create_dataloader(
+        val_dataset.dataset, val_dataset.indices, shuffle=False, **loader_options
     )
     
-    # Get input size from first sample
-    sample_features, _ = train_dataset[0]
-    input_size = sample_features.shape[1]
+    # The hybrid LSTM sees only the time-series columns; the plain LSTM
+    # sees every column at every step
+    sequence_length = train_dataset.dataset.sequence_length
+    static_size = len(STATIC_COLS) if hybrid else 0
+    input_size = len(DYNAMIC_COLS) if hybrid else len(DYNAMIC_COLS) + len(STATIC_COLS)
     
     # Create model
-    model = LSTMForecastModel(
-        input_size=input_size,
-        hidden_size=config.get("hidden_size", 64),
-        num_layers=config.get("num_layers", 2),
-        dropout=config.get("dropout", 0.2)
-    ).to(device)
+    model = create_forecast_model(config, len(DYNAMIC_COLS), len(STATIC_COLS)).to(device)
+    
+    # DDP all-reduces gradients during backward; evaluation uses the plain module
+    distributed = world_size > 1
+    is_main = rank == 0
+    train_model = DistributedDataParallel(model) if distributed else model
     
     # Loss and optimizer
     criterion = nn.MSELoss()
@@ -97,50 +176,263 @@ def train_nn_model(
         lr=config.get("learning_rate", 0.001)
     )
     
-    with mlflow.start_run(run_name="lstm_model"):
+    with mlflow.start_run(run_name="lstm_model") if is_main else nullcontext():
         # Log parameters
-        mlflow.log_params({
-            "hidden_size": config.get("hidden_size", 64),
-            "num_layers": config.get("num_layers", 2),
-            "dropout": config.get("dropout", 0.2),
-            "learning_rate": config.get("learning_rate", 0.001),
-            "batch_size": config.get("batch_size", 32)
-        })
+        if is_main:
+            mlflow.log_params({
+                "architecture": architecture,
+                "hidden_size": config.get("hidden_size", 64),
+                "num_layers": config.get("num_layers", 2),
+                "dropout": config.get("dropout", 0.2),
+                "learning_rate": config.get("learning_rate", 0.001),
+                "batch_size": config.get("batch_size", 32),
+                "num_workers": config.get("num_workers", 0),
+                "prefetch_factor": config.get("prefetch_factor", 2),
+                "patience": config.get("patience", 0),
+                "min_delta": config.get("min_delta", 0.0),
+                "num_processes": world_size
+            })
         
         # Training loop
         num_epochs = config.get("num_epochs", 50)
+        patience = config.get("patience", 0)
+        min_delta = config.get("min_delta", 0.0)
         best_val_loss = float("inf")
+        best_epoch = 0
+        best_state = None
+        epoch_metrics = []
+        epochs_run = 0
         
         for epoch in range(num_epochs):
-            train_loss = train_epoch(model, train_loader, criterion, optimizer, device)
+            epochs_run = epoch + 1
+            epoch_start = time.perf_counter()
+            train_loss = train_epoch(train_model, train_loader, criterion, optimizer, device)
+            if distributed:
+                train_loss = _mean_across_processes(train_loss)
+            samples_per_sec = len(train_dataset) / (time.perf_counter() - epoch_start)
             val_metrics = evaluate(model, val_loader, criterion, device)
             
-            mlflow.log_metric("train_loss", train_loss, step=epoch)
-            mlflow.log_metric("val_loss", val_metrics["loss"], step=epoch)
-            mlflow.log_metric("val_mae", val_metrics["mae"], step=epoch)
-            mlflow.log_metric("val_rmse", val_metrics["rmse"], step=epoch)
+            timestamp = int(time.time() * 1000)
+            epoch_metrics.extend(
+                Metric(key, float(value), timestamp, epoch)
+                for key, value in {
+                    "train_loss": train_loss,
+                    "train_samples_per_sec": samples_per_sec,
+                    "val_loss": val_metrics["loss"],
+                    "val_mae": val_metrics["mae"],
+                    "val_rmse": val_metrics["rmse"]
+                }.items()
+            )
             
-            if val_metrics["loss"] < best_val_loss:
+            if val_metrics["loss"] < best_val_loss - min_delta:
                 best_val_loss = val_metrics["loss"]
-                mlflow.pytorch.log_model(model, "model")
+                best_epoch = epoch
+                # Copy to host memory; the live weights keep training
+                best_state = {
+                    name: tensor.detach().to("cpu", copy=True)
+                    for name, tensor in model.state_dict().items()
+                }
             
-            if (epoch + 1) % 10 == 0:
+            if is_main and (epoch + 1) % 10 == 0:
                 print(f"Epoch {epoch+1}/{num_epochs}")
                 print(f"  Train Loss: {train_loss:.4f}")
                 print(f"  Val Loss: {val_metrics['loss']:.4f}")
                 print(f"  Val MAE: {val_metrics['mae']:.2f}")
                 print(f"  Val RMSE: {val_metrics['rmse']:.2f}")
+                print(f"  Throughput: {samples_per_sec:.0f} samples/s")
+            
+            if patience and epoch - best_epoch >= patience:
+                if is_main:
+                    print(f"Early stopping at epoch {epoch+1}: no val_loss improvement "
+                          f"since epoch {best_epoch+1}")
+                break
+        
+        # Restore the best weights
+        if best_state is not None:
+            model.load_state_dict(best_state)
+        if not is_main:
+            return model
+        
+        run_id = mlflow.active_run().info.run_id
+        client = MlflowClient()
+        for i in range(0, len(epoch_metrics), MLFLOW_BATCH_METRICS):
+            client.log_batch(run_id, metrics=epoch_metrics[i:i + MLFLOW_BATCH_METRICS])
+        mlflow.log_metrics({
+            "best_val_loss": best_val_loss,
+            "best_epoch": best_epoch,
+            "epochs_run": epochs_run
+        })
+        
+        # Log the best weights once
+        mlflow.pytorch.log_model(model, "model")
+        
+        # Export TorchScript artifact for serving
+        torchscript_path = config.get("torchscript_path")
+        if torchscript_path:
+            Path(torchscript_path).parent.mkdir(parents=True, exist_ok=True)
+            export_torchscript(
+                model, torchscript_path, sequence_length, input_size, static_size
+            )
+            mlflow.log_artifact(torchscript_path, "torchscript")
+            model.to(device)
+        
+        # Dynamic int8 quantization for CPU serving
+        quant_config = config.get("quantization", {})
+        if quant_config.get("enabled", False):
+            quantize_nn_model(
+                model, val_loader, criterion, quant_config,
+                (sequence_length, input_size, static_size)
+            )
+            model.to(device)
     
     return model
 
 
+def _mean_across_processes(value: float) -> float:
+    """Average a scalar over all data-parallel processes."""
+    tensor = torch.tensor([value], dtype=torch.float64)
+    dist.all_reduce(tensor)
+    return tensor.item() / dist.get_world_size()
+
+
+def _free_port() -> int:
+    """Pick an unused local TCP port for the process group rendezvous."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _nn_worker(
+    rank: int,
+    world_size: int,
+    dataset_path: str,
+    train_indices: np.ndarray,
+    val_indices: np.ndarray,
+    config: dict,
+    mlflow_config: dict,
+    output_path: str
+):
+    """Train in one data-parallel process; rank 0 logs and saves the model."""
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    try:
+        if rank == 0:
+            mlflow.set_tracking_uri(mlflow_config["uri"])
+            mlflow.set_experiment(mlflow_config["experiment_name"])
+        
+        dataset = HospitalForecastDataset.load(dataset_path)
+        model = train_nn_model(
+            Subset(dataset, train_indices),
+            Subset(dataset, val_indices),
+            config,
+            torch.device("cpu"),
+            rank=rank,
+            world_size=world_size
+        )
+        if rank == 0:
+            torch.save(model, output_path)
+    finally:
+        dist.destroy_process_group()
+
+
+def train_nn_model_distributed(
+    dataset: HospitalForecastDataset,
+    train_indices: np.ndarray,
+    val_indices: np.ndarray,
+    config: dict,
+    num_processes: int,
+    mlflow_config: dict
+) -> nn.Module:
+    """
+    Train a neural network with CPU data parallelism.
+    
+    Spawns ``num_processes`` processes joined by a gloo process group. Each
+    memory-maps one saved copy of the dataset, trains on its shard of
+    ``train_indices`` with DistributedDataParallel and uses
+    ``cpu_count / num_processes`` intra-op threads.
+    
+    Args:
+        dataset: Full dataset
+        train_indices: Training sample indices
+        val_indices: Validation sample indices
+        config: ``neural_network`` config section
+        num_processes: Data-parallel processes
+        mlflow_config: MLflow tracking "uri" and "experiment_name" for rank 0
+    
+    Returns:
+        The trained model from rank 0
+    """
+    os.environ.setdefault("MASTER_ADDR", "127.0.0.1")
+    os.environ.setdefault("MASTER_PORT", str(_free_port()))
+    
+    with shared_dataset_path(dataset) as dataset_path, tempfile.TemporaryDirectory() as tmp:
+        output_path = str(Path(tmp) / "model.pt")
+        mp.spawn(
+            _nn_worker,
+            args=(
+                num_processes, str(dataset_path), np.asarray(train_indices),
+                np.asarray(val_indices), config, mlflow_config, output_path
+            ),
+            nprocs=num_processes,
+            join=True
+        )
+        return torch.load(output_path, weights_only=False)
+
+
+def quantize_nn_model(
+    model: nn.Module,
+    val_loader: DataLoader,
+    criterion: nn.Module,
+    config: dict,
+    input_shape: tuple
+):
+    """Quantize a trained model and export it if it passes the accuracy gate."""
+    cpu = torch.device("cpu")
+    fp32_metrics = evaluate(model.cpu(), val_loader, criterion, cpu)
+    quantized = quantize_dynamic(model)
+    int8_metrics = evaluate(quantized, val_loader, criterion, cpu)
+    
+    mlflow.log_metrics({
+        "fp32_val_mae": fp32_metrics["mae"],
+        "fp32_val_rmse": fp32_metrics["rmse"],
+        "int8_val_mae": int8_metrics["mae"],
+        "int8_val_rmse": int8_metrics["rmse"]
+    })
+    
+    print(f"fp32 Val MAE: {fp32_metrics['mae']:.2f}, RMSE: {fp32_metrics['rmse']:.2f}")
+    print(f"int8 Val MAE: {int8_metrics['mae']:.2f}, RMSE: {int8_metrics['rmse']:.2f}")
+    
+    max_increase = config.get("max_relative_increase", 0.05)
+    if not passes_quantization_gate(fp32_metrics, int8_metrics, max_increase):
+        mlflow.set_tag("int8_gate", "failed")
+        print(f"int8 model exceeds {max_increase:.0%} accuracy budget, not exported")
+        return
+    
+    mlflow.set_tag("int8_gate", "passed")
+    output_path = config.get("output_path", "models/lstm_model.int8.torchscript")
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    export_torchscript(quantized, output_path, *input_shape)
+    mlflow.log_artifact(output_path, "torchscript")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Train FestSafe AI models")
     parser.add_argument("--config", type=str, required=True, help="Path to config YAML")
     parser.add_argument("--data-dir", type=str, default="data/synthetic", help="Data directory")
     parser.add_argument("--model-type", choices=["tabular", "nn", "both"], default="both")
+    parser.add_argument("--no-cache", action="store_true", help="Rebuild the dataset, ignoring dataset_cache_dir")
+    parser.add_argument("--publish", type=str, default=None, metavar="VERSION",
+                        help="Publish the trained model to registry_dir as this version")
+    parser.add_argument("--activate", action="store_true", help="Activate the published version")
+    parser.add_argument("--database-url", type=str, default=None,
+                        help="Train on the backend database instead of --data-dir CSVs")
+    parser.add_argument("--nproc", type=int, default=None,
+                        help="Data-parallel processes for NN training "
+                             "(default: neural_network.num_processes or 1)")
     
     args = parser.parse_args()
+    if args.publish and args.model_type == "both":
+        parser.error("--publish needs --model-type tabular or nn")
     
     # Load config
     with open(args.config, "r") as f:
@@ -150,19 +442,22 @@ def main():
     mlflow.set_tracking_uri(config.get("mlflow_uri", "http://localhost:5000"))
     mlflow.set_experiment(config.get("experiment_name", "festsafe-forecast"))
     
-    # Load data
-    print("Loading data...")
-    observations_df, hospitals_df, events_df = load_data(args.data_dir)
-    
-    # Create datasets
-    print("Creating datasets...")
-    full_dataset = HospitalForecastDataset(
-        observations_df,
-        hospitals_df,
-        events_df,
-        sequence_length=config.get("sequence_length", 24),
-        forecast_horizon=config.get("forecast_horizon", 24)
-    )
+    # Load data and create datasets
+    cache_dir = None if args.no_cache else config.get("dataset_cache_dir")
+    print("Loading dataset...")
+    if args.database_url:
+        full_dataset = HospitalForecastDataset.from_database(
+            args.database_url,
+            sequence_length=config.get("sequence_length", 24),
+            forecast_horizon=config.get("forecast_horizon", 24)
+        )
+    else:
+        full_dataset = load_dataset(
+            args.data_dir,
+            sequence_length=config.get("sequence_length", 24),
+            forecast_horizon=config.get("forecast_horizon", 24),
+            cache_dir=cache_dir
+        )
     
     # Split train/val
     train_size = int(0.8 * len(full_dataset))
@@ -172,12 +467,6 @@ def main():
         [train_size, val_size]
     )
     
-    # Prepare data for tabular model
-    X_train = np.array([train_dataset[i][0].numpy() for i in range(len(train_dataset))])
-    y_train = np.array([train_dataset[i][1].item() for i in range(len(train_dataset))])
-    X_val = np.array([val_dataset[i][0].numpy() for i in range(len(val_dataset))])
-    y_val = np.array([val_dataset[i][1].item() for i in range(len(val_dataset))])
-    
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     print(f"Using device: {device}")
     
@@ -185,12 +474,48 @@ def main():
     if args.model_type in ["tabular", "both"]:
         print("\nTraining tabular model...")
         tabular_config = config.get("tabular", {})
-        train_tabular_model(X_train, y_train, X_val, y_val, tabular_config)
+        
+        # Gather the split straight from the shared feature matrix
+        feature_set = tabular_config.get("feature_set", "window")
+        X_train, y_train = full_dataset.get_tabular_arrays(train_dataset.indices, feature_set)
+        X_val, y_val = full_dataset.get_tabular_arrays(val_dataset.indices, feature_set)
+        model = train_tabular_model(X_train, y_train, X_val, y_val, tabular_config).model
+        metadata = {"feature_set": feature_set}
+        del X_train, X_val
     
     if args.model_type in ["nn", "both"]:
         print("\nTraining neural network model...")
         nn_config = config.get("neural_network", {})
-        train_nn_model(train_dataset, val_dataset, nn_config, device)
+        num_processes = args.nproc or nn_config.get("num_processes", 1)
+        if num_processes > 1:
+            print(f"Training with {num_processes} data-parallel processes (gloo)")
+            model = train_nn_model_distributed(
+                full_dataset,
+                train_dataset.indices,
+                val_dataset.indices,
+                nn_config,
+                num_processes,
+                {
+                    "uri": config.get("mlflow_uri", "http://localhost:5000"),
+                    "experiment_name": config.get("experiment_name", "festsafe-forecast")
+                }
+            )
+        else:
+            model = train_nn_model(train_dataset, val_dataset, nn_config, device)
+        metadata = {"architecture": nn_config.get("architecture", "lstm")}
+    
+    if args.publish:
+        entry = publish_model(
+            config.get("registry_dir", "models/registry"),
+            args.publish,
+            args.model_type,
+            model,
+            sequence_length=full_dataset.sequence_length,
+            training_cutoff=full_dataset.get_target_timestamps().max(),
+            metadata={**metadata, "forecast_horizon": full_dataset.forecast_horizon},
+            activate=args.activate
+        )
+        print(f"\nPublished {entry.version} to {entry.path}")
     
     print("\nTraining complete!")
 
@@ -0,0 +1,504 @@
+"""
+Replay simulator output against a running backend to reproduce festival-day load.
+
+Observations are read from a data_simulator.py output directory (single
+files or --workers shards, in NDJSON, CSV or Parquet) in timestamp order and
+replayed as /agents/ask requests, mixed with /predict and list requests. An
+async HTTP client sends them at a fixed rate with bounded concurrency, and
+throughput, error rate and latency percentiles are reported per endpoint.
+
+The backend has no observation ingest route, so --setup seeds its database
+directly (like seed_data.py): a load-test user, the simulated hospitals, and
+the first --history-hours of observations shifted to end now, so /predict
+finds recent data. Run it with the backend's DATABASE_URL, e.g. against a
+local SQLite backend:
+
+    export DATABASE_URL=sqlite:///./loadtest.db
+    (cd backend && uvicorn app.main:app --port 8000) &
+    python scripts/replay_load.py --data-dir data/scale --setup \\
+        --rate 200 --concurrency 32 --duration 60
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+
+# Observation columns replayed, as written by data_simulator.py
+OBSERVATION_COLS = [
+    "timestamp", "hospital_id", "current_patients", "new_arrivals",
+    "avg_age", "aqi", "temperature", "humidity"
+]
+
+# File formats read, in order of preference
+FORMATS = ["parquet", "ndjson", "csv"]
+
+# Default share of each request type
+DEFAULT_MIX = "ask=0.6,predict=0.2,list=0.2"
+
+# GET endpoints drawn for "list" requests
+LIST_ENDPOINTS = ["list_hospitals", "list_events", "list_forecasts"]
+
+API_PREFIX = "/api/v1"
+
+# Observations read ahead of the replay
+PREFETCH_ROWS = 10_000
+
+# Marks the end of the prefetched observations
+_END = object()
+
+
+def _read_chunks(path: Path, columns: Optional[List[str]], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Read a data file in frames of at most ``chunk_rows`` rows."""
+    if path.suffix == ".parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    elif path.suffix == ".ndjson":
+        with pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=False) as reader:
+            for chunk in reader:
+                yield chunk[columns] if columns else chunk
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def _table_path(data_dir: Path, name: str) -> Path:
+    """Find ``<name>.<format>`` in a simulator output directory."""
+    for fmt in FORMATS:
+        path = data_dir / f"{name}.{fmt}"
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No {name} file ({', '.join(FORMATS)}) in {data_dir}")
+
+
+def observation_files(data_dir: Path) -> List[Path]:
+    """Observation files of a simulator output directory (shards from manifest.json)."""
+    manifest_path = data_dir / "manifest.json"
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        return [data_dir / shard["file"] for shard in manifest["shards"]]
+    return [_table_path(data_dir, "observations")]
+
+
+def load_hospitals(data_dir: Path) -> pd.DataFrame:
+    """Read the simulated hospitals (small; read whole)."""
+    return pd.concat(_read_chunks(_table_path(data_dir, "hospitals"), None, 100_000))
+
+
+def iter_observations(data_dir: Path, chunk_rows: int = 10_000) -> Iterator[Dict[str, Any]]:
+    """
+    Stream observation records in timestamp order.
+
+    Each file is already time ordered, so shards are merged lazily; only one
+    chunk per file is held at a time.
+    """
+    def records(path: Path) -> Iterator[Dict[str, Any]]:
+        for chunk in _read_chunks(path, OBSERVATION_COLS, chunk_rows):
+            chunk["timestamp"] = pd.to_datetime(chunk["timestamp"])
+            chunk["hospital_id"] = chunk["hospital_id"].astype(str)
+            yield from chunk.to_dict("records")
+
+    yield from heapq.merge(
+        *(records(path) for path in observation_files(data_dir)),
+        key=lambda record: record["timestamp"]
+    )
+
+
+def ask_payload(observation: Dict[str, Any]) -> Dict[str, Any]:
+    """/agents/ask body for one replayed observation."""
+    return {
+        "observation": {
+            "hospital_id": observation["hospital_id"],
+            "current_metrics": {
+                "current_patients": int(observation["current_patients"]),
+                "new_arrivals": int(observation["new_arrivals"]),
+                "avg_age": float(observation["avg_age"])
+            },
+            "environmental_context": {
+                "aqi": float(observation["aqi"]),
+                "temperature": float(observation["temperature"]),
+                "humidity": float(observation["humidity"])
+            }
+        }
+    }
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "ask=0.6,predict=0.2,list=0.2" into normalised weights."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("ask", "predict", "list"):
+            raise ValueError(f"Unknown request type {name!r} in --mix")
+        weights[name] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("--mix weights must sum to more than 0")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def setup_backend(
+    data_dir: Path,
+    email: str,
+    password: str,
+    history_hours: int
+) -> datetime:
+    """
+    Seed the backend database for a replay.
+
+    Creates the load-test user and any missing simulated hospitals (keeping
+    their IDs), then inserts each hospital's first ``history_hours`` of
+    observations shifted to end now.
+
+    Returns:
+        Simulated time at which the replay starts
+    """
+    sys.path.append(str(Path(__file__).parent.parent / "backend"))
+    from app.core.security import get_password_hash
+    from app.db import crud, models
+    from app.db.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if not crud.get_user_by_email(db, email):
+            crud.create_user(db, {
+                "email": email,
+                "hashed_password": get_password_hash(password),
+                "full_name": "Load Test",
+                "role": "Admin"
+            })
+
+        hospitals_df = load_hospitals(data_dir)
+        added = 0
+        for h in hospitals_df.to_dict("records"):
+            hospital_id = uuid.UUID(str(h["id"]))
+            if db.get(models.Hospital, hospital_id) is None:
+                db.add(models.Hospital(
+                    id=hospital_id,
+                    name=h["name"],
+                    latitude=h["lat"],
+                    longitude=h["lon"],
+                    bed_count=int(h["bed_count"]),
+                    icu_count=int(h["icu_count"]),
+                    oxygen_capacity=int(h["oxygen_capacity"]),
+                    doctors_count=int(h["doctors"]),
+                    nurses_count=int(h["nurses"])
+                ))
+                added += 1
+        db.commit()
+
+        observations = iter_observations(data_dir)
+        first = next(observations, None)
+        if first is None:
+            raise ValueError(f"No observations in {data_dir}")
+        replay_start = first["timestamp"] + timedelta(hours=history_hours)
+        shift = datetime.utcnow() - replay_start.to_pydatetime()
+
+        inserted = 0
+        for observation in heapq.merge([first], observations, key=lambda r: r["timestamp"]):
+            if observation["timestamp"] >= replay_start:
+                break
+            db.add(models.Observation(
+                hospital_id=uuid.UUID(observation["hospital_id"]),
+                timestamp=observation["timestamp"].to_pydatetime() + shift,
+                current_patients=int(observation["current_patients"]),
+                new_arrivals=int(observation["new_arrivals"]),
+                avg_age=float(observation["avg_age"]),
+                aqi=float(observation["aqi"]),
+                temperature=float(observation["temperature"]),
+                humidity=float(observation["humidity"])
+            ))
+            inserted += 1
+            if inserted % 10_000 == 0:
+                db.commit()
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"Setup: {added} hospitals added, {inserted} history observations inserted")
+    return replay_start.to_pydatetime()
+
+
+class ObservationPrefetcher:
+    """
+    Read observations in a background thread.
+
+    File reads and the shard merge run off the event loop, so they never
+    stall in-flight requests or the send schedule; the loop only takes
+    records from a bounded queue.
+    """
+
+    def __init__(self, observations: Iterator[Dict[str, Any]], size: int = PREFETCH_ROWS):
+        self._queue = queue.Queue(size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._fill, args=(observations,), name="observation-prefetch", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fill(self, observations: Iterator[Dict[str, Any]]):
+        try:
+            for observation in observations:
+                if not self._put(observation):
+                    return
+        except Exception as e:
+            # Re-raised in the event loop by next()
+            self._put(e)
+            return
+        self._put(_END)
+
+    async def next(self) -> Optional[Dict[str, Any]]:
+        """The next observation, or None once all have been read."""
+        try:
+            item = self._queue.get_nowait()
+        except queue.Empty:
+            item = await asyncio.to_thread(self._queue.get)
+        if isinstance(item, Exception):
+            raise item
+        return None if item is _END else item
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class LoadStats:
+    """Latencies and errors per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.status_codes: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, seconds: float, status: str, ok: bool):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + (not ok)
+        codes = self.status_codes.setdefault(endpoint, {})
+        codes[status] = codes.get(status, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        """Throughput, error rate and latency percentiles (ms) per endpoint and overall."""
+        groups = {**self.latencies, "total": sum(self.latencies.values(), [])}
+        summary = {}
+        for endpoint, latencies in sorted(groups.items()):
+            if not latencies:
+                continue
+            ms = np.asarray(latencies) * 1000
+            errors = sum(self.errors.values()) if endpoint == "total" else self.errors[endpoint]
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            summary[endpoint] = {
+                "requests": len(ms),
+                "throughput": len(ms) / elapsed,
+                "error_rate": errors / len(ms),
+                "p50_ms": p50,
+                "p90_ms": p90,
+                "p99_ms": p99,
+                "max_ms": ms.max(),
+                **({} if endpoint == "total" else {"status_codes": self.status_codes[endpoint]})
+            }
+        return summary
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    stats: LoadStats,
+    endpoint: str,
+    method: str,
+    url: str,
+    body: Optional[Dict[str, Any]] = None
+):
+    try:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, json=body)
+            stats.record(endpoint, time.perf_counter() - start, str(response.status_code),
+                         response.status_code < 400)
+        except httpx.HTTPError as e:
+            stats.record(endpoint, time.perf_counter() - start, type(e).__name__, False)
+    finally:
+        semaphore.release()
+
+
+async def replay(
+    base_url: str,
+    data_dir: Path,
+    email: str,
+    password: str,
+    rate: float,
+    concurrency: int,
+    duration: Optional[float],
+    max_requests: Optional[int],
+    mix: Dict[str, float],
+    replay_start: Optional[datetime] = None,
+    seed: int = 0,
+    timeout: float = 30.0
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Send the replay load and collect per-endpoint statistics.
+
+    Requests start on an open-loop schedule of ``rate`` per second (0 = as
+    fast as ``concurrency`` allows); when all ``concurrency`` slots are busy
+    the schedule slips, which shows up as throughput below ``rate``.
+    Latency is measured from send to response. The run ends after
+    ``duration`` seconds, ``max_requests`` requests, or the last observation.
+    """
+    rng = random.Random(seed)
+    hospital_ids = load_hospitals(data_dir)["id"].astype(str).tolist()
+    kinds, weights = list(mix), list(mix.values())
+
+    observations = ObservationPrefetcher(
+        observation for observation in iter_observations(data_dir)
+        if replay_start is None or observation["timestamp"] >= replay_start
+    )
+    stats = LoadStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+            response = await client.post(
+                f"{API_PREFIX}/auth/login", json={"email": email, "password": password}
+            )
+            response.raise_for_status()
+            client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+            tasks = set()
+            sent = 0
+            start = time.perf_counter()
+            while max_requests is None or sent < max_requests:
+                now = time.perf_counter() - start
+                if duration is not None and now >= duration:
+                    break
+                if rate > 0 and sent / rate > now:
+                    await asyncio.sleep(sent / rate - now)
+
+                kind = rng.choices(kinds, weights)[0]
+                if kind == "ask":
+                    observation = await observations.next()
+                    if observation is None:
+                        break
+                    request = (
+                        "ask", "POST", f"{API_PREFIX}/agents/ask", ask_payload(observation)
+                    )
+                elif kind == "predict":
+                    hospital_url = f"{API_PREFIX}/forecasts/hospital/{rng.choice(hospital_ids)}"
+                    request = ("predict", "POST", f"{hospital_url}/predict", None)
+                else:
+                    endpoint = rng.choice(LIST_ENDPOINTS)
+                    if endpoint == "list_hospitals":
+                        url = f"{API_PREFIX}/hospitals/"
+                    elif endpoint == "list_events":
+                        url = f"{API_PREFIX}/events/"
+                    else:
+                        url = f"{API_PREFIX}/forecasts/hospital/{rng.choice(hospital_ids)}"
+                    request = (endpoint, "GET", url, None)
+
+                await semaphore.acquire()
+                task = asyncio.create_task(_send(client, semaphore, stats, *request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                sent += 1
+
+            if tasks:
+                await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+    finally:
+        observations.close()
+
+    return stats.summary(elapsed)
+
+
+def print_summary(summary: Dict[str, Dict[str, Any]]):
+    print(f"\n{'endpoint':>15} {'requests':>9} {'req/s':>8} {'errors':>7} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, s in summary.items():
+        print(f"{endpoint:>15} {s['requests']:>9} {s['throughput']:>8.1f} "
+              f"{s['error_rate']:>6.1%} {s['p50_ms']:>8.1f} {s['p90_ms']:>8.1f} "
+              f"{s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}")
+    for endpoint, s in summary.items():
+        if endpoint != "total":
+            codes = ", ".join(f"{code}: {count}" for code, count in sorted(s["status_codes"].items()))
+            print(f"  {endpoint} status codes: {codes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay simulated observations against the API")
+    parser.add_argument("--data-dir", type=str, required=True, help="data_simulator.py output directory")
+    parser.add_argument("--base-url", type=str, default="http://localhost:8000", help="Backend URL")
+    parser.add_argument("--email", type=str, default="loadtest@festsafe.ai", help="Load-test user")
+    parser.add_argument("--password", type=str, default="loadtest", help="Load-test password")
+    parser.add_argument("--setup", action="store_true",
+                        help="Seed the user, hospitals and observation history into "
+                             "the backend database ($DATABASE_URL) first")
+    parser.add_argument("--history-hours", type=int, default=24,
+                        help="Observation hours inserted by --setup and skipped by the replay")
+    parser.add_argument("--rate", type=float, default=100, help="Requests per second (0 = unpaced)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run (0 = no limit)")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests")
+    parser.add_argument("--mix", type=str, default=DEFAULT_MIX,
+                        help="Share of ask, predict and list requests")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for request mix and targets")
+    parser.add_argument("--output", type=str, default=None, help="Write the summary as JSON")
+
+    args = parser.parse_args()
+    data_dir = Path(args.data_dir)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    replay_start = None
+    if args.setup:
+        replay_start = setup_backend(data_dir, args.email, args.password, args.history_hours)
+
+    print(f"Replaying {data_dir} against {args.base_url}: {args.rate or 'unpaced'} req/s, "
+          f"concurrency {args.concurrency}, mix {args.mix}")
+    summary = asyncio.run(replay(
+        args.base_url,
+        data_dir,
+        args.email,
+        args.password,
+        rate=args.rate,
+        concurrency=args.concurrency,
+        duration=args.duration or None,
+        max_requests=args.requests,
+        mix=mix,
+        replay_start=replay_start,
+        seed=args.seed
+    ))
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2, default=float)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()